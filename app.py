@@ -6,11 +6,14 @@ import pandas as pd
 import folium
 from folium.plugins import MarkerCluster
 import io
+import mimetypes
 from pathlib import Path
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_caching import Cache
+import cv2
 
 from src.database import Database, RoadIssue
+from src.evidence import context_path, annotate_crop, annotate_context, frame_stem, unused_evidence
 
 def get_date_range(date_range: str) -> tuple[datetime, datetime]:
     """
@@ -261,6 +264,8 @@ def get_road_issue(issue_id):
                 'notes': issue.notes,
                 'image_path': issue.image_path
             }
+            if issue.image_path and context_path(issue.image_path):
+                issue_dict['context_url'] = url_for('get_road_issue_context', issue_id=issue.id)
             return jsonify(issue_dict)
     except Exception as e:
         print(f"Error in get_road_issue: {str(e)}")  # Add server-side logging
@@ -281,10 +286,54 @@ def get_road_issue_image(issue_id):
             if not os.path.exists(image_path):
                 return jsonify({'error': 'Image file not found'}), 404
                 
-            return send_file(image_path, mimetype='image/jpeg')
+            # Compact evidence crops are stored unannotated, draw the bbox now
+            if context_path(issue.image_path) and issue.bbox:
+                image = annotate_crop(cv2.imread(image_path), issue.bbox, issue_label(issue))
+                return send_annotated(image, image_path)
+                
+            return send_file(image_path, mimetype=image_mimetype(image_path))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/road_issue/context/<int:issue_id>')
+@login_required
+def get_road_issue_context(issue_id):
+    try:
+        with Database(app.config['DB_PATH']) as db:
+            issue = db.get_issue(issue_id)
+            if not issue or not issue.image_path or not context_path(issue.image_path):
+                return jsonify({'error': 'Context image not found'}), 404
+                
+            image_path = os.path.join('src', 'src', 'detected_issues', context_path(issue.image_path))
+            
+            if not os.path.exists(image_path):
+                return jsonify({'error': 'Image file not found'}), 404
+                
+            image = cv2.imread(image_path)
+            if issue.bbox:
+                annotate_context(image, [issue.bbox], [issue_label(issue)])
+            return send_annotated(image, image_path)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def issue_label(issue: RoadIssue) -> str:
+    """Label drawn next to the bbox of an issue."""
+    return f"{issue.issue_type}: {issue.confidence:.2f}"
+
+def image_mimetype(image_path: str) -> str:
+    """Content type of a stored image, from its extension."""
+    # Older mimetypes tables do not know WebP
+    if image_path.lower().endswith('.webp'):
+        return 'image/webp'
+    return mimetypes.guess_type(image_path)[0] or 'application/octet-stream'
+
+def send_annotated(image, image_path: str):
+    """Send an image annotated at serve time in the format of the stored image."""
+    ok, buffer = cv2.imencode(os.path.splitext(image_path)[1], image)
+    if not ok:
+        return jsonify({'error': 'Could not encode image'}), 500
+    return send_file(io.BytesIO(buffer.tobytes()), mimetype=image_mimetype(image_path))
+
 @app.route('/road_issue/<int:issue_id>/update', methods=['POST'])
 @login_required
 def update_road_issue(issue_id):
@@ -321,17 +370,22 @@ def delete_issue(issue_id):
         if not issue:
             return jsonify({'error': 'Issue not found'}), 404
             
-        # Delete image file if it exists
-        if issue.image_path:
-            try:
-                os.remove(os.path.join('src', 'src', 'detected_issues', issue.image_path))
-            except OSError:
-                pass
-                
         if db.delete_issue(issue_id):
+            remove_issue_images(db, [issue.image_path])
             return jsonify({'message': 'Issue deleted successfully'})
         return jsonify({'error': 'Failed to delete issue'}), 500
 
+def remove_issue_images(db: Database, image_paths):
+    """Remove the image files of deleted issues that no remaining issue refers to."""
+    remaining = []
+    for stem in {frame_stem(image_path) for image_path in image_paths if image_path}:
+        remaining.extend(db.get_image_paths_with_prefix(stem))
+    for image_path in unused_evidence(image_paths, remaining):
+        try:
+            os.remove(os.path.join('src', 'src', 'detected_issues', image_path))
+        except OSError:
+            pass
+
 @app.route('/api/dashboard_stats')
 @login_required
 def get_dashboard_stats():
@@ -862,13 +916,8 @@ def bulk_delete_issues():
             # Delete issues in a single transaction
             db.bulk_delete_issues(issue_ids)
             
-            # Delete image files
-            for image_path in image_paths:
-                if image_path:
-                    try:
-                        os.remove(os.path.join('src', 'src', 'detected_issues', image_path))
-                    except OSError:
-                        pass
+            # Delete image files, including context images no remaining crop uses
+            remove_issue_images(db, image_paths)
                 
         return jsonify({'message': f'Deleted {len(issue_ids)} issues'})
     except Exception as e:
@@ -0,0 +1,577 @@
+import argparse
+import cv2
+import numpy as np
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import List, Tuple, Dict, Optional
+
+# Supported inference backends for RoadDamageDetector
+BACKENDS = ('pytorch', 'onnx', 'openvino', 'onnx-int8')
+
+# Image types picked up from a calibration folder
+CALIBRATION_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+# Padding value used by the ultralytics letterbox
+PAD_VALUE = 114
+
+def export_model(model_path: str, backend: str, imgsz: int) -> str:
+    """
+    Export a YOLO model for a CPU runtime, reusing a previous export if present.
+    
+    Args:
+        model_path: Path to the PyTorch YOLO weights
+        backend: Target backend ('onnx' or 'openvino')
+        imgsz: Square input size the model is exported for
+    
+    Returns:
+        Path to the exported ONNX file or OpenVINO model directory
+    """
+    weights = Path(model_path)
+    if backend == 'onnx':
+        target = weights.with_name(f"{weights.stem}_{imgsz}.onnx")
+    elif backend == 'openvino':
+        target = weights.with_name(f"{weights.stem}_{imgsz}_openvino_model")
+    else:
+        raise ValueError(f"Cannot export for backend: {backend}")
+    
+    if target.exists():
+        return str(target)
+    
+    from ultralytics import YOLO
+    
+    # Dynamic axes keep the batch dimension free for detect_batch
+    exported = YOLO(str(weights)).export(format=backend, imgsz=imgsz, dynamic=True)
+    Path(exported).rename(target)
+    return str(target)
+
+class OnnxRuntimeBackend:
+    """Runs an exported YOLO model through ONNX Runtime on the CPU."""
+    
+    def __init__(self, model_path: str, num_threads: int = 0):
+        """
+        Create the ONNX Runtime session.
+        
+        Args:
+            model_path: Path to the ONNX file
+            num_threads: Intra-op thread count, 0 lets the runtime decide
+        """
+        import onnxruntime as ort
+        
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+            options.inter_op_num_threads = 1
+        
+        self.session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+    
+    def __call__(self, blob: np.ndarray) -> np.ndarray:
+        """Run the model on an (N, 3, H, W) float32 blob."""
+        return self.session.run(None, {self.input_name: blob})[0]
+
+class OpenVINOBackend:
+    """Runs an exported YOLO model through OpenVINO on the CPU."""
+    
+    def __init__(self, model_dir: str, num_threads: int = 0):
+        """
+        Compile the OpenVINO model.
+        
+        Args:
+            model_dir: Directory produced by the OpenVINO export
+            num_threads: Inference thread count, 0 lets the runtime decide
+        """
+        import openvino as ov
+        
+        core = ov.Core()
+        model = core.read_model(str(next(Path(model_dir).glob('*.xml'))))
+        config = {'PERFORMANCE_HINT': 'LATENCY'}
+        if num_threads:
+            config['INFERENCE_NUM_THREADS'] = num_threads
+        
+        self.compiled_model = core.compile_model(model, 'CPU', config)
+        self.output = self.compiled_model.output(0)
+    
+    def __call__(self, blob: np.ndarray) -> np.ndarray:
+        """Run the model on an (N, 3, H, W) float32 blob."""
+        return self.compiled_model(blob)[self.output]
+
+class FrameCalibrationReader:
+    """Feeds letterboxed sample frames to the ONNX Runtime static quantizer."""
+    
+    def __init__(self, calibration_dir: str, input_name: str, imgsz: int, max_images: int = 200):
+        """
+        Collect calibration images.
+        
+        Args:
+            calibration_dir: Folder of sample frames
+            input_name: Name of the model input
+            imgsz: Square input size
+            max_images: Maximum number of frames used for calibration
+        """
+        self.input_name = input_name
+        self.letterbox = Letterbox(imgsz)
+        self.paths = sorted(
+            path for path in Path(calibration_dir).rglob('*')
+            if path.suffix.lower() in CALIBRATION_EXTENSIONS
+        )[:max_images]
+        
+        if not self.paths:
+            raise ValueError(f"No calibration images found in: {calibration_dir}")
+        
+        self._iterator = iter(self.paths)
+    
+    def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+        """Return the next calibration sample or None when exhausted."""
+        for path in self._iterator:
+            frame = cv2.imread(str(path))
+            if frame is None:
+                continue
+            blob, _ = self.letterbox.blob([frame])
+            return {self.input_name: blob.copy()}
+        return None
+
+def quantize_model(model_path: str, imgsz: int, calibration_dir: Optional[str] = None,
+                   max_images: int = 200) -> str:
+    """
+    Build an INT8 ONNX model with post-training static quantization.
+    
+    The quantized model is cached next to the weights, so a calibration
+    folder is only needed the first time.
+    
+    Args:
+        model_path: Path to the PyTorch YOLO weights
+        imgsz: Square input size
+        calibration_dir: Folder of sample frames used to calibrate activation ranges
+        max_images: Maximum number of calibration frames
+    
+    Returns:
+        Path to the quantized ONNX file
+    """
+    weights = Path(model_path)
+    target = weights.with_name(f"{weights.stem}_{imgsz}_int8.onnx")
+    if target.exists():
+        return str(target)
+    
+    if calibration_dir is None:
+        raise ValueError(f"No INT8 model at {target}; a calibration folder is required to build it")
+    
+    import onnxruntime as ort
+    from onnxruntime.quantization import quantize_static, QuantFormat, QuantType, CalibrationMethod
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+    
+    fp32_path = export_model(model_path, 'onnx', imgsz)
+    input_name = ort.InferenceSession(fp32_path, providers=['CPUExecutionProvider']).get_inputs()[0].name
+    
+    # Shape inference and graph cleanup give the quantizer a fully typed graph
+    preprocessed = weights.with_name(f"{weights.stem}_{imgsz}_preprocessed.onnx")
+    quant_pre_process(fp32_path, str(preprocessed))
+    
+    try:
+        quantize_static(
+            str(preprocessed),
+            str(target),
+            FrameCalibrationReader(calibration_dir, input_name, imgsz, max_images),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=True,
+            calibrate_method=CalibrationMethod.MinMax
+        )
+    finally:
+        preprocessed.unlink(missing_ok=True)
+    
+    return str(target)
+
+def create_backend(model_path: str, backend: str, imgsz: int, num_threads: int = 0,
+                   calibration_dir: Optional[str] = None):
+    """
+    Export (if needed) and load a model for an exported-runtime backend.
+    
+    Args:
+        model_path: Path to the PyTorch YOLO weights
+        backend: 'onnx', 'openvino' or 'onnx-int8'
+        imgsz: Square input size
+        num_threads: Runtime thread count, 0 lets the runtime decide
+        calibration_dir: Sample frames for building the INT8 model
+    
+    Returns:
+        Callable taking an (N, 3, H, W) blob and returning raw model output
+    """
+    if backend == 'onnx-int8':
+        return OnnxRuntimeBackend(quantize_model(model_path, imgsz, calibration_dir), num_threads)
+    
+    exported = export_model(model_path, backend, imgsz)
+    if backend == 'onnx':
+        return OnnxRuntimeBackend(exported, num_threads)
+    return OpenVINOBackend(exported, num_threads)
+
+@dataclass
+class LetterboxMeta:
+    """Geometry needed to map boxes from a letterboxed canvas back to the frame."""
+    scale: float
+    x_offset: int
+    y_offset: int
+    width: int  # letterboxed image width
+    height: int  # letterboxed image height
+    crop_x: int = 0  # position of the letterboxed image in the frame when a ROI crop was applied
+    crop_y: int = 0
+    
+    def to_frame(self, data: np.ndarray) -> np.ndarray:
+        """
+        Map x1, y1, x2, y2 columns of box rows from canvas to frame coordinates in place.
+        
+        Args:
+            data: (N, 4+) array of boxes in canvas coordinates
+        
+        Returns:
+            The same array, now in frame coordinates
+        """
+        data[:, [0, 2]] = ((data[:, [0, 2]] - self.x_offset) / self.scale).clip(0, self.width) + self.crop_x
+        data[:, [1, 3]] = ((data[:, [1, 3]] - self.y_offset) / self.scale).clip(0, self.height) + self.crop_y
+        return data
+
+class Letterbox:
+    """
+    Aspect-preserving resize into reusable, preallocated canvases.
+    
+    Canvas, resize and blob buffers are allocated once per frame geometry and
+    reused on every call, so only the resized pixels are written per frame.
+    Returned canvases and blobs are overwritten by the next call for the
+    same slot and must be consumed before then.
+    """
+    
+    def __init__(self, imgsz: int, stride: int = 0, pad_value: int = PAD_VALUE):
+        """
+        Initialize the letterbox.
+        
+        Args:
+            imgsz: Longest side of the model input
+            stride: If set, pad only up to the next multiple of stride instead of a square
+            pad_value: Gray level of the padding
+        """
+        self.imgsz = imgsz
+        self.stride = stride
+        self.pad_value = pad_value
+        self._canvases: Dict[int, np.ndarray] = {}
+        self._metas: Dict[int, LetterboxMeta] = {}
+        self._resized: Dict[Tuple[int, int], np.ndarray] = {}
+        self._blob: Optional[np.ndarray] = None
+    
+    def _plan(self, width: int, height: int) -> Tuple[LetterboxMeta, Tuple[int, int], Tuple[int, int]]:
+        """Compute the geometry for a frame size."""
+        scale = min(self.imgsz / width, self.imgsz / height)
+        new_width = int(round(width * scale))
+        new_height = int(round(height * scale))
+        
+        if self.stride:
+            canvas_width = -(-new_width // self.stride) * self.stride
+            canvas_height = -(-new_height // self.stride) * self.stride
+        else:
+            canvas_width = canvas_height = self.imgsz
+        
+        meta = LetterboxMeta(
+            scale=scale,
+            x_offset=(canvas_width - new_width) // 2,
+            y_offset=(canvas_height - new_height) // 2,
+            width=width,
+            height=height
+        )
+        return meta, (new_width, new_height), (canvas_width, canvas_height)
+    
+    def __call__(self, frame: np.ndarray, slot: int = 0) -> Tuple[np.ndarray, LetterboxMeta]:
+        """
+        Letterbox a frame into the canvas of the given slot.
+        
+        Args:
+            frame: Input BGR frame
+            slot: Canvas index, use one slot per frame of a batch
+        
+        Returns:
+            Tuple of (canvas, metadata)
+        """
+        height, width = frame.shape[:2]
+        meta, (new_width, new_height), (canvas_width, canvas_height) = self._plan(width, height)
+        
+        canvas = self._canvases.get(slot)
+        if canvas is None or canvas.shape[:2] != (canvas_height, canvas_width):
+            canvas = np.empty((canvas_height, canvas_width, 3), dtype=np.uint8)
+            self._canvases[slot] = canvas
+            self._metas.pop(slot, None)
+        
+        # Padding only needs repainting when the geometry changes
+        if self._metas.get(slot) != meta:
+            canvas[:] = self.pad_value
+            self._metas[slot] = meta
+        
+        region = canvas[meta.y_offset:meta.y_offset+new_height, meta.x_offset:meta.x_offset+new_width]
+        if (new_width, new_height) == (width, height):
+            region[:] = frame
+        else:
+            resized = self._resized.get((new_width, new_height))
+            if resized is None:
+                resized = np.empty((new_height, new_width, 3), dtype=np.uint8)
+                self._resized[(new_width, new_height)] = resized
+            cv2.resize(frame, (new_width, new_height), dst=resized, interpolation=cv2.INTER_LINEAR)
+            region[:] = resized
+        
+        return canvas, meta
+    
+    def batch(self, frames: List[np.ndarray], roi=None) -> Tuple[List[np.ndarray], List[LetterboxMeta]]:
+        """
+        Letterbox a batch of frames, one slot per frame.
+        
+        Args:
+            frames: Input BGR frames
+            roi: Optional RoadROI cropped out of each frame before letterboxing
+        
+        Returns:
+            Tuple of (canvases, metadata)
+        """
+        canvases, metas = [], []
+        for slot, frame in enumerate(frames):
+            if roi is None:
+                canvas, meta = self(frame, slot)
+            else:
+                # The ROI output is only valid until the next apply, so letterbox it right away
+                road, (crop_x, crop_y) = roi.apply(frame)
+                canvas, meta = self(road, slot)
+                meta = replace(meta, crop_x=crop_x, crop_y=crop_y)
+            canvases.append(canvas)
+            metas.append(meta)
+        return canvases, metas
+    
+    def blob(self, frames: List[np.ndarray], roi=None) -> Tuple[np.ndarray, List[LetterboxMeta]]:
+        """
+        Letterbox frames into a normalized RGB (N, 3, H, W) float32 blob.
+        
+        Args:
+            frames: Input BGR frames of the same size
+            roi: Optional RoadROI cropped out of each frame before letterboxing
+        
+        Returns:
+            Tuple of (blob, metadata)
+        """
+        canvases, metas = self.batch(frames, roi)
+        return self.to_blob(canvases), metas
+    
+    def to_blob(self, canvases: List[np.ndarray]) -> np.ndarray:
+        """
+        Convert canvases of the same size into a normalized RGB (N, 3, H, W) float32 blob.
+        
+        Args:
+            canvases: Letterboxed BGR canvases
+        
+        Returns:
+            View of the reused blob buffer
+        """
+        shape = (len(canvases), 3) + canvases[0].shape[:2]
+        if self._blob is None or self._blob.shape[0] < shape[0] or self._blob.shape[1:] != shape[1:]:
+            self._blob = np.empty(shape, dtype=np.float32)
+        
+        blob = self._blob[:shape[0]]
+        for i, canvas in enumerate(canvases):
+            np.multiply(canvas[..., ::-1].transpose(2, 0, 1), np.float32(1 / 255), out=blob[i])
+        return blob
+
+def non_max_suppression(boxes: np.ndarray, scores: np.ndarray, class_ids: np.ndarray,
+                        iou_threshold: float) -> np.ndarray:
+    """
+    Class-aware greedy non-maximum suppression.
+    
+    Args:
+        boxes: (N, 4) array of x1, y1, x2, y2 boxes
+        scores: (N,) confidence scores
+        class_ids: (N,) class ids, boxes of different classes never suppress each other
+        iou_threshold: Overlap above which the lower-scoring box is dropped
+    
+    Returns:
+        Indices of the kept boxes, highest score first
+    """
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.int64)
+    
+    # Shift each class into its own coordinate range
+    shifted = boxes + (class_ids.astype(np.float32) * (boxes.max() + 1))[:, None]
+    x1, y1, x2, y2 = shifted.T
+    areas = (x2 - x1) * (y2 - y1)
+    
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        
+        inter_w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        inter_h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = inter_w * inter_h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    
+    return np.array(keep, dtype=np.int64)
+
+def decode_predictions(output: np.ndarray, conf_threshold: float, iou_threshold: float,
+                       max_det: int = 300) -> np.ndarray:
+    """
+    Decode raw YOLOv8 output for one image into boxes.
+    
+    Args:
+        output: (4 + num_classes, num_anchors) raw output for one image
+        conf_threshold: Minimum class confidence
+        iou_threshold: NMS overlap threshold
+        max_det: Maximum number of boxes to keep
+    
+    Returns:
+        (N, 6) float32 array of x1, y1, x2, y2, confidence, class_id in input coordinates
+    """
+    predictions = output.T
+    class_scores = predictions[:, 4:]
+    class_ids = class_scores.argmax(axis=1)
+    confidences = class_scores[np.arange(len(class_ids)), class_ids]
+    
+    mask = confidences >= conf_threshold
+    xywh = predictions[mask, :4]
+    confidences = confidences[mask]
+    class_ids = class_ids[mask]
+    
+    boxes = np.empty_like(xywh)
+    boxes[:, :2] = xywh[:, :2] - xywh[:, 2:] / 2
+    boxes[:, 2:] = xywh[:, :2] + xywh[:, 2:] / 2
+    
+    keep = non_max_suppression(boxes, confidences, class_ids, iou_threshold)[:max_det]
+    return np.column_stack([boxes[keep], confidences[keep], class_ids[keep]]).astype(np.float32)
+
+def compare_detections(reference: List[np.ndarray], candidate: List[np.ndarray],
+                       iou_threshold: float = 0.5) -> Dict[str, float]:
+    """
+    Compare per-frame detections of two backends.
+    
+    Boxes are matched greedily per frame when they share a class and overlap
+    by at least iou_threshold.
+    
+    Args:
+        reference: Per-frame DETECTION_DTYPE arrays from the reference backend
+        candidate: Per-frame DETECTION_DTYPE arrays from the backend under test
+        iou_threshold: Minimum IoU for two boxes to match
+    
+    Returns:
+        Dictionary with match counts, mean IoU and maximum confidence difference
+    """
+    matched = missing = extra = 0
+    ious = []
+    max_conf_diff = 0.0
+    
+    for ref, cand in zip(reference, candidate):
+        matches = match_frame(ref, cand, iou_threshold)
+        for i, (j, iou) in enumerate(matches):
+            if j is None:
+                missing += 1
+                continue
+            
+            matched += 1
+            ious.append(iou)
+            max_conf_diff = max(max_conf_diff, abs(float(ref[i]['confidence']) - float(cand[j]['confidence'])))
+        
+        extra += len(cand) - sum(j is not None for j, _ in matches)
+    
+    return {
+        'matched': matched,
+        'missing': missing,
+        'extra': extra,
+        'mean_iou': float(np.mean(ious)) if ious else 0.0,
+        'max_confidence_diff': max_conf_diff
+    }
+
+def match_frame(reference: np.ndarray, candidate: np.ndarray,
+                iou_threshold: float = 0.5) -> List[Tuple[Optional[int], float]]:
+    """
+    Greedily match one frame's candidate boxes to its reference boxes.
+    
+    Args:
+        reference: DETECTION_DTYPE array from the reference model
+        candidate: DETECTION_DTYPE array from the model under test
+        iou_threshold: Minimum IoU for two boxes of the same class to match
+    
+    Returns:
+        For each reference box, the matched candidate index (or None) and the IoU
+    """
+    used = set()
+    matches = []
+    for r in reference:
+        best, best_iou = None, iou_threshold
+        for j, c in enumerate(candidate):
+            if j in used or c['class_id'] != r['class_id']:
+                continue
+            iou = box_iou(
+                (r['x1'], r['y1'], r['x2'], r['y2']),
+                (c['x1'], c['y1'], c['x2'], c['y2'])
+            )
+            if iou >= best_iou:
+                best, best_iou = j, iou
+        
+        if best is not None:
+            used.add(best)
+        matches.append((best, best_iou if best is not None else 0.0))
+    
+    return matches
+
+def box_iou(a: Tuple[float, float, float, float], b: Tuple[float, float, float, float]) -> float:
+    """Intersection over union of two x1, y1, x2, y2 boxes."""
+    inter_w = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    inter_h = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = inter_w * inter_h
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return float(inter / union) if union > 0 else 0.0
+
+def check_parity(model_path: str, video_path: str, backend: str, num_frames: int = 50,
+                 conf_threshold: float = 0.5, imgsz: int = 640, num_threads: int = 0) -> Dict[str, float]:
+    """
+    Run the PyTorch backend and another backend on the same frames and compare them.
+    
+    Args:
+        model_path: Path to the PyTorch YOLO weights
+        video_path: Video to sample frames from
+        backend: Backend under test ('onnx' or 'openvino')
+        num_frames: Number of frames to compare
+        conf_threshold: Confidence threshold for both backends
+        imgsz: Model input size for both backends
+        num_threads: Thread count for the backend under test
+    
+    Returns:
+        Comparison summary from compare_detections
+    """
+    from detector import RoadDamageDetector
+    
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video file: {video_path}")
+    
+    frames = []
+    while len(frames) < num_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    
+    reference = RoadDamageDetector(model_path, conf_threshold, imgsz=imgsz)
+    candidate = RoadDamageDetector(model_path, conf_threshold, backend=backend,
+                                   num_threads=num_threads, imgsz=imgsz)
+    return compare_detections(reference.detect_arrays(frames), candidate.detect_arrays(frames))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check detection parity of a CPU backend against PyTorch")
+    parser.add_argument("model", help="Path to the PyTorch YOLO weights")
+    parser.add_argument("video", help="Video to sample frames from")
+    parser.add_argument("--backend", choices=BACKENDS[1:], default='onnx')
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--conf", type=float, default=0.5)
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--threads", type=int, default=0)
+    args = parser.parse_args()
+    
+    summary = check_parity(args.model, args.video, args.backend, args.frames,
+                           args.conf, args.imgsz, args.threads)
+    for key, value in summary.items():
+        print(f"{key}: {value}")
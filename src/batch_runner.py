@@ -0,0 +1,226 @@
+import argparse
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from backends import BACKENDS
+from database import Database
+from evidence import EVIDENCE_MODES
+from image_sink import IMAGE_FORMATS
+from roi import load_camera_profiles
+from timing import StageTimer, format_summary
+from video_processor import DEDUPLICATION_MODES, VideoProcessor
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv')
+NMEA_EXTENSIONS = ('.nmea',)
+
+def discover_pairs(root: str) -> List[Tuple[str, str]]:
+    """
+    Find matching video/NMEA pairs in a directory tree.
+    
+    A video is paired with the NMEA file of the same name in its directory.
+    If a directory holds exactly one video and one NMEA file they are paired
+    regardless of their names, which covers cameras that name the two
+    differently.
+    
+    Args:
+        root: Directory to search
+    
+    Returns:
+        Sorted list of (video_path, nmea_path) tuples
+    """
+    pairs = []
+    for directory, _, files in os.walk(root):
+        videos = sorted(f for f in files if f.lower().endswith(VIDEO_EXTENSIONS))
+        nmeas = sorted(f for f in files if f.lower().endswith(NMEA_EXTENSIONS))
+        nmea_by_stem = {Path(f).stem: f for f in nmeas}
+        
+        if len(videos) == 1 and len(nmeas) == 1:
+            pairs.append((os.path.join(directory, videos[0]), os.path.join(directory, nmeas[0])))
+            continue
+        
+        for video in videos:
+            nmea = nmea_by_stem.get(Path(video).stem)
+            if nmea is None:
+                print(f"Skipping {os.path.join(directory, video)}: no matching NMEA file")
+                continue
+            pairs.append((os.path.join(directory, video), os.path.join(directory, nmea)))
+    return sorted(pairs)
+
+def image_prefix(video_path: str, root: str) -> str:
+    """Unique image name prefix for a video, derived from its path below the root."""
+    relative = os.path.splitext(os.path.relpath(video_path, root))[0]
+    return re.sub(r'[^A-Za-z0-9_-]+', '_', relative) + '_'
+
+def process_pair(video_path: str, nmea_path: str, model_path: str, db_path: str, prefix: str,
+                 checkpoint_path: str, resume: bool, processor_options: Dict) -> Dict:
+    """
+    Process one video/NMEA pair in a worker process.
+    
+    Args:
+        video_path: Path to the video file
+        nmea_path: Path to the NMEA file
+        model_path: Path to the YOLO model
+        db_path: Path to the shared SQLite database
+        prefix: Image name prefix of the video
+        checkpoint_path: Checkpoint file of the video
+        resume: Continue from the checkpoint if there is one
+        processor_options: Further VideoProcessor arguments
+    
+    Returns:
+        Dictionary with the frames and issues processed and stored by this run,
+        its wall time and the StageTimer of the video
+    """
+    start = time.perf_counter()
+    with VideoProcessor(video_path, nmea_path, model_path, db_path, image_prefix=prefix,
+                        checkpoint_path=checkpoint_path, resume=resume, **processor_options) as processor:
+        first_frame = processor.current_frame
+        issue_count = processor.process_video()
+        frames = processor.current_frame - first_frame
+    return {
+        'video': video_path,
+        'frames': frames,
+        'issues': issue_count,
+        'wall_time': time.perf_counter() - start,
+        'timer': processor.timer
+    }
+
+def run_batch(root: str, model_path: str, db_path: str = "road_issues.db", jobs: int = 2,
+              resume: bool = False, **processor_options) -> List[Dict]:
+    """
+    Process every video/NMEA pair below a directory into one database.
+    
+    Args:
+        root: Directory to search for video/NMEA pairs
+        model_path: Path to the YOLO model
+        db_path: Path to the shared SQLite database
+        jobs: Number of videos processed at the same time
+        resume: Continue interrupted videos from their checkpoints, finished videos are skipped
+        **processor_options: Further VideoProcessor arguments
+    
+    Returns:
+        One result dictionary per video, see process_pair; failed videos carry an 'error' entry
+    """
+    pairs = discover_pairs(root)
+    print(f"Found {len(pairs)} video/NMEA pairs in {root}")
+    if not pairs:
+        return []
+    
+    # Concurrent writers need write-ahead logging, and it is stored in the database file
+    with Database(db_path) as db:
+        db.enable_wal()
+    
+    # Each video checkpoints next to the database so an interrupted batch can be resumed
+    checkpoint_dir = Path(f"{db_path}.checkpoints")
+    checkpoint_dir.mkdir(exist_ok=True)
+    
+    # Split the CPUs between the jobs unless a thread count was given
+    if not processor_options.get('num_threads'):
+        processor_options['num_threads'] = max(1, (os.cpu_count() or 1) // jobs)
+    
+    results = []
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=context) as pool:
+        futures = {}
+        for video, nmea in pairs:
+            prefix = image_prefix(video, root)
+            checkpoint_path = str(checkpoint_dir / f"{prefix}checkpoint.json")
+            future = pool.submit(process_pair, video, nmea, model_path, db_path, prefix, checkpoint_path,
+                                 resume, processor_options)
+            futures[future] = video
+        for future in as_completed(futures):
+            video = futures[future]
+            try:
+                result = future.result()
+                print(f"Finished {video}: {result['frames']} frames, {result['issues']} issues "
+                      f"in {result['wall_time']:.1f} s")
+            except Exception as e:
+                result = {'video': video, 'frames': 0, 'issues': 0, 'wall_time': 0.0, 'error': str(e)}
+                print(f"Failed {video}: {e}")
+            results.append(result)
+    
+    return sorted(results, key=lambda result: result['video'])
+
+def print_summary(results: List[Dict], wall_time: float) -> None:
+    """Print a throughput summary of a batch run and the stage timings of all videos."""
+    width = max([len(result['video']) for result in results] + [5]) + 2
+    print()
+    print(f"{'Video':<{width}}{'Frames':>10}{'FPS':>10}{'Issues':>10}{'Wall (s)':>12}")
+    for result in results:
+        if 'error' in result:
+            print(f"{result['video']:<{width}}  failed: {result['error']}")
+            continue
+        fps = result['frames'] / result['wall_time'] if result['wall_time'] else 0.0
+        print(f"{result['video']:<{width}}{result['frames']:>10}{fps:>10.1f}{result['issues']:>10}"
+              f"{result['wall_time']:>12.1f}")
+    
+    total_frames = sum(result['frames'] for result in results)
+    total_issues = sum(result['issues'] for result in results)
+    fps = total_frames / wall_time if wall_time else 0.0
+    print(f"{'Total':<{width}}{total_frames:>10}{fps:>10.1f}{total_issues:>10}{wall_time:>12.1f}")
+    
+    # Stage timings of all videos together show which stage to scale
+    timer = StageTimer()
+    for result in results:
+        if 'timer' in result:
+            timer.merge(result['timer'])
+    print()
+    print(format_summary(timer.summary(), "Stage timings of all videos:"))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Process all video/NMEA pairs in a directory tree")
+    parser.add_argument("root", help="Directory with the recordings, e.g. an SD card")
+    parser.add_argument("model", help="Path to the YOLO model")
+    parser.add_argument("--db", default="road_issues.db", help="SQLite database shared by all videos")
+    parser.add_argument("--jobs", type=int, default=2, help="Videos processed at the same time")
+    parser.add_argument("--conf", type=float, default=0.5)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--backend", choices=BACKENDS, default='pytorch')
+    parser.add_argument("--threads", type=int, default=0, help="Inference threads per job, 0 splits the CPUs")
+    parser.add_argument("--profiles", help="Camera profiles JSON file")
+    parser.add_argument("--profile", help="Camera profile applied to all videos")
+    parser.add_argument("--sample-distance", type=float, default=0.0, help="Metres of road between analysed frames")
+    parser.add_argument("--frame-stride", type=int, default=1, help="Only analyse every n-th frame")
+    parser.add_argument("--pipelined", action='store_true', help="Overlap decode, inference and saving")
+    parser.add_argument("--model-server", help="Address of a shared model server")
+    parser.add_argument("--gps-interpolation", action='store_true', help="Interpolate positions between GPS fixes")
+    parser.add_argument("--image-format", choices=list(IMAGE_FORMATS), default='jpg', help="Format of the saved images")
+    parser.add_argument("--image-quality", type=int, default=95, help="JPEG/WebP quality or PNG compression level")
+    parser.add_argument("--evidence-mode", choices=EVIDENCE_MODES, default='frame',
+                        help="'compact' saves detection crops and a downscaled context frame")
+    parser.add_argument("--deduplication", choices=DEDUPLICATION_MODES, default='cooldown',
+                        help="'tracker' stores each defect once on its most confident frame")
+    parser.add_argument("--resume", action='store_true', help="Continue an interrupted batch from its checkpoints")
+    args = parser.parse_args()
+    
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    
+    roi = None
+    if args.profile:
+        if not args.profiles:
+            parser.error("--profile needs --profiles")
+        try:
+            profiles = load_camera_profiles(args.profiles)
+        except (OSError, ValueError) as e:
+            parser.error(f"could not load camera profiles from {args.profiles}: {e}")
+        if args.profile not in profiles:
+            parser.error(f"unknown camera profile {args.profile!r}, expected one of {sorted(profiles)}")
+        roi = profiles[args.profile]
+
+    start = time.perf_counter()
+    results = run_batch(
+        args.root, args.model, args.db, args.jobs, args.resume,
+        conf_threshold=args.conf, batch_size=args.batch_size, backend=args.backend,
+        num_threads=args.threads, roi=roi, sample_distance=args.sample_distance,
+        frame_stride=args.frame_stride, pipelined=args.pipelined, model_server=args.model_server,
+        gps_interpolation=args.gps_interpolation, image_format=args.image_format,
+        image_quality=args.image_quality, evidence_mode=args.evidence_mode,
+        deduplication=args.deduplication
+    )
+    if results:
+        print_summary(results, time.perf_counter() - start)
@@ -1,4 +1,5 @@
 import sqlite3
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import List, Optional, Tuple
@@ -39,17 +40,23 @@ class RoadSegment:
     issue_count: int = 0
     average_speed: float = None
     distance: float = None  # in meters
+    source: Optional[str] = None  # video the segment was cut from
+
+def _like_literal(text: str) -> str:
+    """Escape a string for LIKE ... ESCAPE '\\', where '_' and '%' are wildcards."""
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
 
 class Database:
-    def __init__(self, db_path: str = "road_issues.db"):
+    def __init__(self, db_path: str = "road_issues.db", timeout: float = 30.0):
         """
         Initialize the database connection.
         
         Args:
             db_path: Path to the SQLite database file
+            timeout: Seconds to wait for a lock held by another connection
         """
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path)
+        self.conn = sqlite3.connect(db_path, timeout=timeout)
         self.conn.row_factory = sqlite3.Row
         self._create_tables()
         
@@ -94,10 +101,16 @@ class Database:
                 end_time DATETIME,
                 issue_count INTEGER DEFAULT 0,
                 average_speed REAL,
-                distance REAL
+                distance REAL,
+                source TEXT
             )
         """)
         
+        # Databases created before segments recorded their video lack the source column
+        cursor.execute("PRAGMA table_info(road_segments)")
+        if 'source' not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute("ALTER TABLE road_segments ADD COLUMN source TEXT")
+            
         # Create index on coordinates for faster spatial queries
         cursor.execute("""
             CREATE INDEX IF NOT EXISTS idx_coordinates 
@@ -528,6 +541,56 @@ class Database:
         )
         self.conn.commit()
         
+    def get_last_ids(self) -> Tuple[int, int]:
+        """
+        Get the highest issue and road segment IDs.
+        
+        Returns:
+            Tuple of (last issue ID, last road segment ID), 0 for empty tables
+        """
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM road_issues")
+        issue_id = cursor.fetchone()[0]
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM road_segments")
+        return issue_id, cursor.fetchone()[0]
+        
+    def delete_rows_after(self, issue_id: int, segment_id: int, start_time: datetime,
+                          end_time: datetime, source: str, image_prefix: str = "") -> Tuple[int, int]:
+        """
+        Delete issues and road segments of one video that were added after given IDs.
+        
+        Used when resuming an interrupted run, so rows written after its last
+        checkpoint are not stored twice. Rows of other videos are kept by
+        matching issues on the video's time range and image names, and road
+        segments on their source.
+        
+        Args:
+            issue_id: Last issue ID to keep
+            segment_id: Last road segment ID to keep
+            start_time: Start of the video's time range
+            end_time: End of the video's time range
+            source: Video the road segments were cut from
+            image_prefix: Image name prefix of the video
+            
+        Returns:
+            Tuple of (deleted issues, deleted road segments)
+        """
+        pattern = _like_literal(image_prefix) + 'issue\\_%'
+        
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            DELETE FROM road_issues
+            WHERE id > ? AND timestamp BETWEEN ? AND ? AND image_path LIKE ? ESCAPE '\\'
+        """, (issue_id, start_time, end_time, pattern))
+        deleted_issues = cursor.rowcount
+        cursor.execute("""
+            DELETE FROM road_segments
+            WHERE id > ? AND source = ?
+        """, (segment_id, source))
+        deleted_segments = cursor.rowcount
+        self.conn.commit()
+        return deleted_issues, deleted_segments
+        
     def get_issue_image_paths(self, issue_ids: List[int]) -> List[Optional[str]]:
         """
         Get image paths for multiple issues.
@@ -538,10 +601,29 @@ class Database:
         Returns:
             List of image paths (None for issues without images)
         """
+        if not issue_ids:
+            return []
         cursor = self.conn.cursor()
-        cursor.executemany(
-            "SELECT image_path FROM road_issues WHERE id = ?",
-            [(issue_id,) for issue_id in issue_ids]
+        cursor.execute(
+            f"SELECT image_path FROM road_issues WHERE id IN ({', '.join('?' * len(issue_ids))})",
+            list(issue_ids)
+        )
+        return [row[0] for row in cursor.fetchall()]
+        
+    def get_image_paths_with_prefix(self, prefix: str) -> List[str]:
+        """
+        Get the image paths of the stored issues whose image name starts with a prefix.
+        
+        Args:
+            prefix: Image name prefix, matched literally
+            
+        Returns:
+            List of image paths
+        """
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT image_path FROM road_issues WHERE image_path LIKE ? ESCAPE '\\'",
+            (_like_literal(prefix) + '%',)
         )
         return [row[0] for row in cursor.fetchall()]
         
@@ -600,13 +682,14 @@ class Database:
         cursor.execute("""
             INSERT INTO road_segments (
                 start_latitude, start_longitude, end_latitude, end_longitude,
-                start_time, end_time, issue_count, average_speed, distance
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                start_time, end_time, issue_count, average_speed, distance, source
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (
             segment.start_latitude, segment.start_longitude,
             segment.end_latitude, segment.end_longitude,
             segment.start_time, segment.end_time,
-            segment.issue_count, segment.average_speed, segment.distance
+            segment.issue_count, segment.average_speed, segment.distance,
+            segment.source
         ))
         self.conn.commit()
         return cursor.lastrowid
@@ -645,7 +728,8 @@ class Database:
                 end_time=datetime.fromisoformat(row[6]) if row[6] else None,
                 issue_count=row[7],
                 average_speed=row[8],
-                distance=row[9]
+                distance=row[9],
+                source=row[10]
             ))
             
         return segments
@@ -688,7 +772,8 @@ class Database:
                 end_time=datetime.fromisoformat(row[6]) if row[6] else None,
                 issue_count=row[7],
                 average_speed=row[8],
-                distance=row[9]
+                distance=row[9],
+                source=row[10]
             ))
         
         # Merge adjacent segments
@@ -727,6 +812,16 @@ class Database:
         
         return merged_segments
         
+    def enable_wal(self) -> None:
+        """
+        Switch the database file to write-ahead logging.
+        
+        Readers then no longer block the writer, which lets several processing
+        processes and the web app share one database. The mode is stored in
+        the file, so it only needs to be enabled once.
+        """
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        
     def close(self):
         """Close the database connection."""
         self.conn.close()
@@ -737,4 +832,167 @@ class Database:
         
     def __exit__(self, exc_type, exc_val, exc_tb):
         """Context manager exit."""
-        self.close() 
\ No newline at end of file
+        self.close() 
+
+class BufferedIssueWriter:
+    """
+    Buffers issue and road segment inserts and writes them in batched transactions.
+    
+    Database.add_issue commits every row, which costs a disk sync per
+    detection. The writer instead collects rows and inserts them with
+    executemany in a single transaction once max_rows are pending, once the
+    oldest pending row is max_delay seconds old, or when flushed explicitly.
+    
+    IDs are assigned explicitly inside a BEGIN IMMEDIATE transaction,
+    continuing after both the AUTOINCREMENT sequence and the highest
+    existing ID, so several processes can share one database file. The IDs
+    are set on the buffered objects when they are written.
+    """
+    
+    def __init__(self, db: Database, max_rows: int = 100, max_delay: float = 2.0):
+        """
+        Initialize the writer.
+        
+        Args:
+            db: Database to write to
+            max_rows: Number of pending rows that triggers a flush
+            max_delay: Seconds the oldest pending row may wait before a flush
+        """
+        self.db = db
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.issues: List[RoadIssue] = []
+        self.segments: List[RoadSegment] = []
+        self.oldest_pending: Optional[float] = None
+        
+    def pending(self) -> int:
+        """Number of rows waiting to be written."""
+        return len(self.issues) + len(self.segments)
+        
+    def add_issue(self, issue: RoadIssue) -> None:
+        """
+        Queue an issue for insertion; its id is set when it is written.
+        
+        Args:
+            issue: RoadIssue object containing the issue data
+        """
+        self.issues.append(issue)
+        self._mark_pending()
+        
+    def add_road_segments(self, segments: List[RoadSegment]) -> None:
+        """
+        Queue road segments for insertion; their ids are set when they are written.
+        
+        Args:
+            segments: List of RoadSegment objects to add
+        """
+        self.segments.extend(segments)
+        self._mark_pending()
+        
+    def _mark_pending(self):
+        """Start the delay clock at the first pending row."""
+        if self.oldest_pending is None:
+            self.oldest_pending = time.monotonic()
+            
+    def maybe_flush(self) -> List[int]:
+        """
+        Flush if max_rows or max_delay has been reached.
+        
+        Returns:
+            IDs of the issues written, empty if nothing was flushed
+        """
+        if not self.pending():
+            return []
+        if self.pending() >= self.max_rows or time.monotonic() - self.oldest_pending >= self.max_delay:
+            return self.flush()
+        return []
+        
+    def flush(self) -> List[int]:
+        """
+        Write all pending rows in one transaction.
+        
+        Returns:
+            IDs of the issues written, in the order they were added
+        """
+        if not self.pending():
+            return []
+            
+        conn = self.db.conn
+        if conn.in_transaction:
+            conn.commit()
+            
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            issue_ids = self._insert_issues(cursor)
+            self._insert_segments(cursor)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            for issue in self.issues:
+                issue.id = None
+            for segment in self.segments:
+                segment.id = None
+            raise
+            
+        self.issues = []
+        self.segments = []
+        self.oldest_pending = None
+        return issue_ids
+        
+    def _next_id(self, cursor: sqlite3.Cursor, table: str) -> int:
+        """First free ID of a table, never reusing IDs of deleted rows."""
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,))
+        row = cursor.fetchone()
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+        return max(row[0] if row else 0, cursor.fetchone()[0]) + 1
+        
+    def _insert_issues(self, cursor: sqlite3.Cursor) -> List[int]:
+        """Insert the pending issues with explicit IDs."""
+        if not self.issues:
+            return []
+            
+        first_id = self._next_id(cursor, 'road_issues')
+        for offset, issue in enumerate(self.issues):
+            issue.id = first_id + offset
+            
+        cursor.executemany("""
+            INSERT INTO road_issues (
+                id, timestamp, latitude, longitude, issue_type, confidence,
+                image_path, status, notes, bbox, speed, fix_quality,
+                num_satellites, hdop, city, district, street
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [(
+            issue.id, issue.timestamp, issue.latitude, issue.longitude,
+            issue.issue_type, issue.confidence, issue.image_path,
+            issue.status, issue.notes, json.dumps(issue.bbox) if issue.bbox else None,
+            issue.speed, issue.fix_quality, issue.num_satellites,
+            issue.hdop, issue.city, issue.district, issue.street
+        ) for issue in self.issues])
+        return [issue.id for issue in self.issues]
+        
+    def _insert_segments(self, cursor: sqlite3.Cursor):
+        """Insert the pending road segments with explicit IDs."""
+        if not self.segments:
+            return
+            
+        first_id = self._next_id(cursor, 'road_segments')
+        for offset, segment in enumerate(self.segments):
+            segment.id = first_id + offset
+            
+        cursor.executemany("""
+            INSERT INTO road_segments (
+                id, start_latitude, start_longitude, end_latitude, end_longitude,
+                start_time, end_time, issue_count, average_speed, distance, source
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [(
+            segment.id, segment.start_latitude, segment.start_longitude,
+            segment.end_latitude, segment.end_longitude,
+            segment.start_time, segment.end_time,
+            segment.issue_count, segment.average_speed, segment.distance,
+            segment.source
+        ) for segment in self.segments])
+        
+    def close(self):
+        """Write everything that is still pending."""
+        self.flush()
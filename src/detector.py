@@ -1,8 +1,9 @@
 import cv2
 import numpy as np
-from typing import List, Tuple, Optional
-from dataclasses import dataclass
-from ultralytics import YOLO
+from typing import List, Tuple, Optional, Sequence, Union
+from dataclasses import dataclass, replace
+from backends import BACKENDS, Letterbox, LetterboxMeta, create_backend, decode_predictions, non_max_suppression
+from roi import RoadROI
 
 @dataclass
 class Detection:
@@ -12,101 +13,379 @@ class Detection:
     class_id: int
     class_name: str
 
+# Compact array-backed detection record, one row per box
+DETECTION_DTYPE = np.dtype([
+    ('x1', np.int32),
+    ('y1', np.int32),
+    ('x2', np.int32),
+    ('y2', np.int32),
+    ('confidence', np.float32),
+    ('class_id', np.int32)
+])
+
+# Road damage classes of the model, indexed by class ID
+CLASS_NAMES = [
+    'Alligator Cracks',
+    'Longitudinal Cracks',
+    'Manhole Covers',
+    'Patchy Road Sections',
+    'Potholes',
+    'Transverse Cracks'
+]
+
 class RoadDamageDetector:
-    def __init__(self, model_path: str, conf_threshold: float = 0.5):
+    def __init__(self, model_path: str, conf_threshold: float = 0.5, batch_size: int = 8,
+                 backend: str = 'pytorch', num_threads: int = 0, imgsz: int = 640,
+                 calibration_dir: Optional[str] = None, roi: Optional[RoadROI] = None,
+                 cascade_imgsz: int = 0, cascade_conf: float = 0.25, tile_size: int = 0,
+                 tile_overlap: float = 0.2):
         """
         Initialize the road damage detector.
         
         Args:
             model_path: Path to the YOLO model
             conf_threshold: Confidence threshold for detections
+            batch_size: Maximum number of frames sent to the model in one call
+            backend: Inference runtime, one of 'pytorch', 'onnx', 'openvino' or 'onnx-int8'
+            num_threads: CPU threads used by the runtime, 0 keeps the runtime default
+            imgsz: Model input size
+            calibration_dir: Sample frames used to build the INT8 model on first use
+            roi: Road region cropped out of each frame before inference
+            cascade_imgsz: Input size of a low-resolution screening pass, 0 disables the cascade
+            cascade_conf: Confidence a screening candidate needs to escalate its frame
+            tile_size: Side of square full-resolution tiles, 0 runs whole frames
+            tile_overlap: Fraction of a tile shared with its neighbour
         """
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be at least 1, got {batch_size}")
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}. Expected one of {', '.join(BACKENDS)}")
+        if not 0.0 <= tile_overlap < 1.0:
+            raise ValueError(f"tile_overlap must be in [0, 1), got {tile_overlap}")
+            
         self.conf_threshold = conf_threshold
-        self.model = YOLO(model_path)
+        self.iou_threshold = 0.7
+        self.batch_size = batch_size
+        self.backend = backend
+        self.imgsz = imgsz
+        self.roi = roi
+        
+        if backend == 'pytorch':
+            from ultralytics import YOLO
+            
+            if num_threads:
+                import torch
+                torch.set_num_threads(num_threads)
+            self.model = YOLO(model_path)
+        else:
+            # Exported once next to the weights and reused on later runs
+            self.model = create_backend(model_path, backend, imgsz, num_threads, calibration_dir)
+            
+        # Exported models take a fixed square input; PyTorch only needs stride-aligned padding
+        stride = 32 if backend == 'pytorch' else 0
+        self.letterbox = Letterbox(imgsz, stride)
+        
+        # Cascade mode: screen every frame at low resolution, confirm candidates at full resolution
+        self.cascade_imgsz = cascade_imgsz
+        self.cascade_conf = cascade_conf
+        self.cascade_letterbox = Letterbox(cascade_imgsz, stride) if cascade_imgsz else None
+        self.frames_screened = 0
+        self.frames_escalated = 0
+        
+        # Tiled mode: overlapping tiles of the road area, merged with class-aware NMS
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+        self.tile_iou_threshold = 0.5
         
         # Define classes for road damage detection
-        self.classes = [
-            'Alligator Cracks',
-            'Longitudinal Cracks',
-            'Manhole Covers',
-            'Patchy Road Sections',
-            'Potholes',
-            'Transverse Cracks'
-        ]
+        self.classes = list(CLASS_NAMES)
         
-    def preprocess_frame(self, frame: np.ndarray) -> np.ndarray:
+    def preprocess_frame(self, frame: np.ndarray) -> Tuple[np.ndarray, LetterboxMeta]:
         """
         Preprocess the frame for detection.
         
+        The returned canvas is a reused buffer and is overwritten by the next call.
+        
         Args:
             frame: Input frame
             
         Returns:
-            Preprocessed frame
+            Tuple of (letterboxed road area, scale/offset metadata)
         """
-        # Resize frame to model input size (460x460)
-        height, width = frame.shape[:2]
-        scale = min(460/width, 460/height)
-        new_width = int(width * scale)
-        new_height = int(height * scale)
+        canvases, metas = self.letterbox.batch([frame], self.roi)
+        return canvases[0], metas[0]
         
-        # Create a black canvas
-        canvas = np.zeros((460, 460, 3), dtype=np.uint8)
+    def detect(self, frame: np.ndarray) -> List[Detection]:
+        """
+        Detect road issues in a frame.
         
-        # Resize and place the frame in the center
-        resized = cv2.resize(frame, (new_width, new_height))
-        x_offset = (460 - new_width) // 2
-        y_offset = (460 - new_height) // 2
-        canvas[y_offset:y_offset+new_height, x_offset:x_offset+new_width] = resized
+        Args:
+            frame: Input frame
+            
+        Returns:
+            List of detections
+        """
+        return self.detect_batch([frame])[0]
         
-        return canvas
+    def detect_batch(self, frames: Union[Sequence[np.ndarray], np.ndarray],
+                     batch_size: Optional[int] = None) -> List[List[Detection]]:
+        """
+        Detect road issues in several frames with batched model calls.
         
-    def detect(self, frame: np.ndarray) -> List[Detection]:
+        Args:
+            frames: List of frames or a stacked (N, H, W, C) array
+            batch_size: Override for the detector's batch size
+            
+        Returns:
+            One list of detections per input frame, in input order
         """
-        Detect road issues in a frame.
+        return [self.to_detections(array) for array in self.detect_arrays(frames, batch_size)]
+        
+    def detect_array(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Detect road issues in a frame and return them as a structured array.
         
         Args:
             frame: Input frame
             
+        Returns:
+            Array of DETECTION_DTYPE records
+        """
+        return self.detect_arrays([frame])[0]
+        
+    def detect_arrays(self, frames: Union[Sequence[np.ndarray], np.ndarray],
+                      batch_size: Optional[int] = None) -> List[np.ndarray]:
+        """
+        Detect road issues in several frames and return structured arrays.
+        
+        Args:
+            frames: List of frames or a stacked (N, H, W, C) array
+            batch_size: Override for the detector's batch size
+            
+        Returns:
+            One array of DETECTION_DTYPE records per input frame, in input order
+        """
+        batch_size = batch_size or self.batch_size
+        frames = list(frames)
+        
+        if not self.cascade_imgsz:
+            return self._detect_full(frames, batch_size)
+            
+        # Cheap low-resolution pass over every frame with a lower threshold
+        candidates = self._infer(frames, batch_size, self.cascade_letterbox, self.cascade_imgsz, self.cascade_conf)
+        escalated = [i for i, boxes in enumerate(candidates) if len(boxes)]
+        self.frames_screened += len(frames)
+        self.frames_escalated += len(escalated)
+        
+        # Full-resolution confirmation only for frames with candidates
+        arrays = [np.empty(0, dtype=DETECTION_DTYPE) for _ in frames]
+        confirmed = self._detect_full([frames[i] for i in escalated], batch_size)
+        for i, array in zip(escalated, confirmed):
+            arrays[i] = array
+            
+        return arrays
+        
+    def cascade_stats(self) -> dict:
+        """
+        Get screening statistics of the cascade mode.
+        
+        Returns:
+            Dictionary with screened and escalated frame counts and the escalation rate
+        """
+        return {
+            'frames_screened': self.frames_screened,
+            'frames_escalated': self.frames_escalated,
+            'escalation_rate': self.frames_escalated / self.frames_screened if self.frames_screened else 0.0
+        }
+        
+    def _detect_full(self, frames: List[np.ndarray], batch_size: int) -> List[np.ndarray]:
+        """
+        Run the full-resolution pass, whole frames or tiled.
+        
+        Args:
+            frames: Frames to run
+            batch_size: Maximum frames per model call
+            
+        Returns:
+            One array of DETECTION_DTYPE records per frame, in frame coordinates
+        """
+        if self.tile_size:
+            return [self._detect_tiled(frame) for frame in frames]
+        return self._infer(frames, batch_size, self.letterbox, self.imgsz, self.conf_threshold)
+        
+    def _infer(self, frames: List[np.ndarray], batch_size: int, letterbox: Letterbox, imgsz: int,
+               conf_threshold: float) -> List[np.ndarray]:
+        """
+        Run the model over frames in batches.
+        
+        Args:
+            frames: Frames to run
+            batch_size: Maximum frames per model call
+            letterbox: Preprocessor producing the model input
+            imgsz: Model input size
+            conf_threshold: Confidence threshold for this pass
+            
+        Returns:
+            One array of DETECTION_DTYPE records per frame, in frame coordinates
+        """
+        arrays = []
+        for start in range(0, len(frames), batch_size):
+            canvases, metas = letterbox.batch(frames[start:start + batch_size], self.roi)
+            arrays.extend(self._run_model(canvases, metas, letterbox, imgsz, conf_threshold))
+            
+        return arrays
+        
+    def tile_grid(self, width: int, height: int) -> List[Tuple[int, int, int, int]]:
+        """
+        Split an image into overlapping square tiles.
+        
+        The last row and column are shifted back to end at the image border so
+        every tile has the same size.
+        
+        Args:
+            width: Image width
+            height: Image height
+            
+        Returns:
+            List of (x, y, w, h) tile rectangles
+        """
+        step = max(1, int(self.tile_size * (1 - self.tile_overlap)))
+        
+        def starts(length: int) -> List[int]:
+            if length <= self.tile_size:
+                return [0]
+            positions = list(range(0, length - self.tile_size + 1, step))
+            if positions[-1] + self.tile_size < length:
+                positions.append(length - self.tile_size)
+            return positions
+            
+        tile_w = min(self.tile_size, width)
+        tile_h = min(self.tile_size, height)
+        return [(x, y, tile_w, tile_h) for y in starts(height) for x in starts(width)]
+        
+    def _detect_tiled(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Detect road issues on overlapping tiles of one frame.
+        
+        All tiles of the frame go through the model as one batch, and boxes
+        found twice along tile borders are merged with class-aware NMS.
+        
+        Args:
+            frame: Input frame
+            
+        Returns:
+            Array of DETECTION_DTYPE records in frame coordinates
+        """
+        road, (crop_x, crop_y) = self.roi.apply(frame) if self.roi is not None else (frame, (0, 0))
+        
+        canvases, metas = [], []
+        for slot, (x, y, w, h) in enumerate(self.tile_grid(road.shape[1], road.shape[0])):
+            canvas, meta = self.letterbox(road[y:y+h, x:x+w], slot)
+            canvases.append(canvas)
+            metas.append(replace(meta, crop_x=crop_x + x, crop_y=crop_y + y))
+            
+        merged = np.concatenate(self._run_model(canvases, metas, self.letterbox, self.imgsz, self.conf_threshold))
+        boxes = np.stack([merged['x1'], merged['y1'], merged['x2'], merged['y2']], axis=1).astype(np.float32)
+        keep = non_max_suppression(boxes, merged['confidence'], merged['class_id'], self.tile_iou_threshold)
+        return merged[keep]
+        
+    def _run_model(self, canvases: List[np.ndarray], metas: List[LetterboxMeta], letterbox: Letterbox,
+                   imgsz: int, conf_threshold: float) -> List[np.ndarray]:
+        """
+        Run the model on letterboxed canvases in a single call.
+        
+        Args:
+            canvases: Letterboxed images
+            metas: Letterbox metadata of each canvas
+            letterbox: Preprocessor that produced the canvases
+            imgsz: Model input size
+            conf_threshold: Confidence threshold for this pass
+            
+        Returns:
+            One array of DETECTION_DTYPE records per canvas, in frame coordinates
+        """
+        if self.backend == 'pytorch':
+            # Run YOLO inference on the letterboxed canvases
+            results = self.model(canvases, conf=conf_threshold, iou=self.iou_threshold, imgsz=imgsz)
+            return [self._result_to_array(result, meta) for result, meta in zip(results, metas)]
+            
+        output = self.model(letterbox.to_blob(canvases))
+        
+        arrays = []
+        for meta, prediction in zip(metas, output):
+            data = decode_predictions(prediction, conf_threshold, self.iou_threshold)
+            arrays.append(self._boxes_to_array(meta.to_frame(data)))
+            
+        return arrays
+        
+    def _result_to_array(self, result, meta: LetterboxMeta) -> np.ndarray:
+        """
+        Convert a single YOLO result into a structured detection array.
+        
+        Args:
+            result: Ultralytics result for one letterboxed frame
+            meta: Letterbox metadata of that frame
+            
+        Returns:
+            Array of DETECTION_DTYPE records in original frame coordinates
+        """
+        # Boxes, confidences and classes in a single device-to-host transfer
+        data = result.boxes.data.cpu().numpy()
+        return self._boxes_to_array(meta.to_frame(data))
+        
+    def _boxes_to_array(self, data: np.ndarray) -> np.ndarray:
+        """
+        Pack an (N, 6+) array of x1, y1, x2, y2, ..., confidence, class_id rows.
+        
+        Args:
+            data: Raw box rows
+            
+        Returns:
+            Array of DETECTION_DTYPE records
+        """
+        array = np.empty(len(data), dtype=DETECTION_DTYPE)
+        array['x1'] = data[:, 0]
+        array['y1'] = data[:, 1]
+        array['x2'] = data[:, 2]
+        array['y2'] = data[:, 3]
+        array['confidence'] = data[:, -2]
+        array['class_id'] = data[:, -1]
+        return array
+        
+    def to_detections(self, array: np.ndarray) -> List[Detection]:
+        """
+        Convert a structured detection array into Detection objects.
+        
+        Args:
+            array: Array of DETECTION_DTYPE records
+            
         Returns:
             List of detections
         """
-        # Run YOLO inference
-        results = self.model(frame, conf=self.conf_threshold)
-        
-        # Process detections
-        detections = []
-        for result in results:
-            for box in result.boxes:
-                # Get box coordinates
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
-                
-                # Get confidence and class
-                confidence = float(box.conf[0].cpu().numpy())
-                class_id = int(box.cls[0].cpu().numpy())
-                
-                # Create detection object
-                detections.append(Detection(
-                    confidence=confidence,
-                    bbox=(x1, y1, x2, y2),
-                    class_id=class_id,
-                    class_name=self.classes[class_id]
-                ))
-                
-        return detections
-        
-    def draw_detections(self, frame: np.ndarray, detections: List[Detection]) -> np.ndarray:
+        return [
+            Detection(
+                confidence=confidence,
+                bbox=(x1, y1, x2, y2),
+                class_id=class_id,
+                class_name=self.classes[class_id]
+            )
+            for x1, y1, x2, y2, confidence, class_id in array.tolist()
+        ]
+        
+    def draw_detections(self, frame: np.ndarray, detections: Union[List[Detection], np.ndarray]) -> np.ndarray:
         """
         Draw detections on the frame.
         
         Args:
             frame: Input frame
-            detections: List of detections
+            detections: List of detections or array of DETECTION_DTYPE records
             
         Returns:
             Frame with detections drawn
         """
+        if isinstance(detections, np.ndarray):
+            detections = self.to_detections(detections)
+            
         for detection in detections:
             x1, y1, x2, y2 = detection.bbox
             
@@ -125,4 +404,8 @@ class RoadDamageDetector:
                 2
             )
             
-        return frame 
\ No newline at end of file
+        return frame
+        
+    def close(self):
+        """Release model resources."""
+        self.model = None
@@ -0,0 +1,127 @@
+import os
+import re
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+# Evidence storage modes: the annotated full frame, or bbox crops plus a small context frame
+EVIDENCE_MODES = ('frame', 'compact')
+
+# Fixed so the web app can place stored bboxes on the images without extra metadata
+CROP_MARGIN = 48
+CONTEXT_SCALE = 0.25
+
+_CROP_NAME = re.compile(r'^(?P<stem>.+)_det\d+\.\w+$')
+
+def crop_name(stem: str, index: int) -> str:
+    """Name of the crop of the index-th detection of a frame, without extension."""
+    return f"{stem}_det{index}"
+
+def context_name(stem: str) -> str:
+    """Name of the downscaled context image of a frame, without extension."""
+    return f"{stem}_context"
+
+def context_path(image_path: str) -> Optional[str]:
+    """
+    Get the context image stored next to a crop.
+    
+    Args:
+        image_path: Stored image path of an issue
+    
+    Returns:
+        Path of the context image, None if image_path is not a compact crop
+    """
+    match = _CROP_NAME.match(image_path)
+    if not match:
+        return None
+    return f"{context_name(match.group('stem'))}{image_path[image_path.rfind('.'):]}"
+
+def frame_stem(image_path: str) -> str:
+    """Name of the frame a stored image belongs to, shared by all crops of the frame."""
+    match = _CROP_NAME.match(image_path)
+    return match.group('stem') if match else os.path.splitext(image_path)[0]
+
+def unused_evidence(deleted_paths: Iterable[Optional[str]], remaining_paths: Iterable[str]) -> List[str]:
+    """
+    Get the stored images no issue refers to any more after issues were deleted.
+    
+    The crops of a frame share its context image, and in frame mode the
+    issues of a frame share the annotated frame, so a file is only unused
+    once no remaining issue refers to it.
+    
+    Args:
+        deleted_paths: Image paths of the deleted issues
+        remaining_paths: Image paths of the stored issues of the same frames
+    
+    Returns:
+        Sorted image paths that can be removed
+    """
+    in_use = set()
+    for image_path in remaining_paths:
+        in_use.update((image_path, context_path(image_path)))
+    
+    unused = set()
+    for image_path in deleted_paths:
+        if image_path:
+            unused.update((image_path, context_path(image_path)))
+    unused.discard(None)
+    return sorted(unused - in_use)
+
+def crop_origin(bbox: Sequence[int]) -> Tuple[int, int]:
+    """Top-left corner of the crop of a bbox in frame coordinates."""
+    return max(int(bbox[0]) - CROP_MARGIN, 0), max(int(bbox[1]) - CROP_MARGIN, 0)
+
+def crop_detection(frame: np.ndarray, bbox: Sequence[int]) -> np.ndarray:
+    """
+    Cut a bbox plus CROP_MARGIN out of a frame at full resolution.
+    
+    Args:
+        frame: Unannotated frame
+        bbox: x1, y1, x2, y2 in frame coordinates
+    
+    Returns:
+        The crop, as a copy so the frame can be released
+    """
+    x1, y1 = crop_origin(bbox)
+    x2 = min(int(bbox[2]) + CROP_MARGIN, frame.shape[1])
+    y2 = min(int(bbox[3]) + CROP_MARGIN, frame.shape[0])
+    return frame[y1:y2, x1:x2].copy()
+
+def context_image(frame: np.ndarray) -> np.ndarray:
+    """Downscale a frame by CONTEXT_SCALE."""
+    return cv2.resize(frame, None, fx=CONTEXT_SCALE, fy=CONTEXT_SCALE, interpolation=cv2.INTER_AREA)
+
+def draw_bbox(image: np.ndarray, bbox: Sequence[int], label: Optional[str] = None,
+              origin: Tuple[int, int] = (0, 0), scale: float = 1.0) -> np.ndarray:
+    """
+    Draw a stored bbox on an evidence image, in the style of RoadDamageDetector.draw_detections.
+    
+    Args:
+        image: Crop or context image
+        bbox: x1, y1, x2, y2 in frame coordinates
+        label: Text drawn above the box
+        origin: Position of the image in the frame
+        scale: Size of the image relative to the frame
+    
+    Returns:
+        The image with the bbox drawn
+    """
+    x1, y1, x2, y2 = (
+        int(round((value - offset) * scale))
+        for value, offset in zip(bbox, (origin[0], origin[1], origin[0], origin[1]))
+    )
+    cv2.rectangle(image, (x1, y1), (x2, y2), (0, 255, 0), 2)
+    if label:
+        cv2.putText(image, label, (x1, max(y1 - 10, 12)), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+    return image
+
+def annotate_crop(image: np.ndarray, bbox: Sequence[int], label: Optional[str] = None) -> np.ndarray:
+    """Draw the bbox of an issue on its stored crop."""
+    return draw_bbox(image, bbox, label, origin=crop_origin(bbox))
+
+def annotate_context(image: np.ndarray, bboxes: List[Sequence[int]], labels: List[Optional[str]]) -> np.ndarray:
+    """Draw the bboxes of the issues of a frame on its stored context image."""
+    for bbox, label in zip(bboxes, labels):
+        draw_bbox(image, bbox, label, scale=CONTEXT_SCALE)
+    return image
@@ -0,0 +1,115 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import List, Optional, Set
+
+import cv2
+import numpy as np
+
+from timing import StageTimer
+
+# Supported formats and the OpenCV parameter that sets their quality
+IMAGE_FORMATS = {
+    'jpg': cv2.IMWRITE_JPEG_QUALITY,
+    'webp': cv2.IMWRITE_WEBP_QUALITY,
+    'png': cv2.IMWRITE_PNG_COMPRESSION
+}
+
+class ImageSink:
+    """
+    Encodes and writes evidence images on a thread pool.
+    
+    save() hands a frame to a worker thread and returns immediately, so
+    encoding overlaps decoding and inference. At most max_pending images
+    wait at any time; save() blocks beyond that, which bounds the memory
+    held by queued frames. A frame must not be modified after it is saved.
+    """
+    
+    def __init__(self, output_dir: Path, image_format: str = 'jpg', quality: int = 95,
+                 workers: int = 2, max_pending: int = 8, timer: Optional[StageTimer] = None):
+        """
+        Initialize the image sink.
+        
+        Args:
+            output_dir: Directory images are written to
+            image_format: One of 'jpg', 'webp' or 'png'
+            quality: JPEG/WebP quality (0-100), or PNG compression level (0-9)
+            workers: Number of encoding threads
+            max_pending: Maximum number of images queued or being written
+            timer: Records the encode and write time of each image as image_write
+        """
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError(f"Unsupported image format: {image_format}, expected one of {list(IMAGE_FORMATS)}")
+        
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.extension = image_format
+        self.params = [IMAGE_FORMATS[image_format], quality]
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-sink')
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.pending: Set[Future] = set()
+        self.errors: List[BaseException] = []
+        self.lock = threading.Lock()
+        self.timer = timer
+    
+    def save(self, frame: np.ndarray, name: str) -> str:
+        """
+        Queue a frame for encoding and writing.
+        
+        Args:
+            frame: Image to write
+            name: File name relative to output_dir, without extension
+        
+        Returns:
+            File name with extension, relative to output_dir, as stored in the database
+        """
+        self._raise_errors()
+        file_name = f"{name}.{self.extension}"
+        
+        self.slots.acquire()
+        future = self.pool.submit(self._write, frame, self.output_dir / file_name)
+        with self.lock:
+            self.pending.add(future)
+        future.add_done_callback(self._done)
+        return file_name
+    
+    def _write(self, frame: np.ndarray, path: Path):
+        """Encode and write one image."""
+        start = time.perf_counter()
+        ok, buffer = cv2.imencode(f".{self.extension}", frame, self.params)
+        if not ok:
+            raise RuntimeError(f"Could not encode {path}")
+        buffer.tofile(str(path))
+        if self.timer is not None:
+            self.timer.add('image_write', time.perf_counter() - start)
+    
+    def _done(self, future: Future):
+        """Release the slot of a finished write and keep its error."""
+        with self.lock:
+            self.pending.discard(future)
+            if future.exception() is not None:
+                self.errors.append(future.exception())
+        self.slots.release()
+    
+    def _raise_errors(self):
+        """Raise the first failed write, if any."""
+        with self.lock:
+            if self.errors:
+                error = self.errors[0]
+                self.errors = []
+                raise RuntimeError(f"Writing an evidence image failed: {error}") from error
+    
+    def flush(self):
+        """Wait until every queued image is written."""
+        with self.lock:
+            pending = list(self.pending)
+        wait(pending)
+        self._raise_errors()
+    
+    def close(self):
+        """Write the remaining images and stop the worker threads."""
+        try:
+            self.flush()
+        finally:
+            self.pool.shutdown(wait=True)
@@ -0,0 +1,541 @@
+import argparse
+import os
+import socket
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from backends import BACKENDS
+from nmea_parser import NMEAParser, GPSData
+from timeline import GPSTimeline
+from timing import StageStats, format_summary
+from video_processor import VideoProcessor, FrameRecord, FrameResult
+
+# NMEA timestamps are UTC wall-clock times
+EPOCH = datetime(1970, 1, 1)
+
+class LiveCapture:
+    """
+    Reads frames from a capture device, stream URL or video file on a background thread.
+    
+    Only the newest frame is kept: a frame that is not taken before the next
+    one arrives is dropped, so a consumer slower than the camera always
+    works on a recent frame instead of falling further behind. Video files
+    are read at their own frame rate, standing in for a camera.
+    """
+    
+    def __init__(self, source: str, realtime: Optional[bool] = None):
+        """
+        Open the source and start reading.
+        
+        Args:
+            source: Device index such as "0", stream URL or video file
+            realtime: Pace reading to the frame rate, by default only for files
+        """
+        self.cap = cv2.VideoCapture(int(source) if source.isdigit() else source)
+        if not self.cap.isOpened():
+            raise ValueError(f"Could not open capture source: {source}")
+        
+        # Properties are read before the reader thread owns the capture
+        fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.fps = fps if fps and fps > 0 else 25.0
+        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.realtime = os.path.isfile(source) if realtime is None else realtime
+        
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.finished = False
+        self._latest: Optional[Tuple[int, np.ndarray, float]] = None
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='live-capture', daemon=True)
+        self._thread.start()
+    
+    def _run(self):
+        """Read frames until the source ends or the capture is released."""
+        start = time.monotonic()
+        frame_number = 0
+        while not self._stopped.is_set():
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+            capture_time = time.time()
+            
+            with self._condition:
+                if self._latest is not None:
+                    self.frames_dropped += 1
+                self._latest = (frame_number, frame, capture_time)
+                self.frames_captured += 1
+                self._condition.notify()
+            frame_number += 1
+            
+            if self.realtime:
+                delay = start + frame_number / self.fps - time.monotonic()
+                if delay > 0:
+                    self._stopped.wait(delay)
+        
+        with self._condition:
+            self.finished = True
+            self._condition.notify()
+    
+    def read_latest(self, timeout: float = 1.0) -> Optional[Tuple[int, np.ndarray, float]]:
+        """
+        Take the newest frame.
+        
+        Args:
+            timeout: Seconds to wait for a frame
+        
+        Returns:
+            (frame number, frame, capture time) tuple, None on timeout or at the end of the source
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._latest is not None or self.finished, timeout)
+            latest, self._latest = self._latest, None
+            return latest
+    
+    def get(self, prop: int) -> float:
+        """Capture property, mirroring cv2.VideoCapture.get; a live source has no frame count."""
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return 0
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.width
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.height
+        return 0
+    
+    def release(self):
+        """Stop reading and release the source."""
+        self._stopped.set()
+        self._thread.join(timeout=5.0)
+        self.cap.release()
+
+class LiveNMEAFeed:
+    """
+    Parses NMEA sentences incrementally as they arrive on a background thread.
+    
+    Sources are a serial port ("serial:/dev/ttyUSB0:4800", needs pyserial),
+    a UDP socket ("udp:0.0.0.0:10110") or a file that is being appended to.
+    The arrival time of each fix relates the GPS clock to the local clock,
+    so frames stamped with the local capture time can be matched to fixes.
+    """
+    
+    def __init__(self, source: str, interpolate: bool = False, window: int = 120):
+        """
+        Start reading the source.
+        
+        Args:
+            source: Serial port, UDP address or file, see above
+            interpolate: Interpolate between fixes instead of returning the closest one
+            window: Number of recent fixes used for lookups and clock matching
+        """
+        self.source = source
+        self.interpolate = interpolate
+        self.parser = NMEAParser()
+        self.fixes: List[GPSData] = []
+        self._offsets = deque(maxlen=window)  # GPS minus local clock per fix, in seconds
+        self._window = window
+        self._version = 0
+        self._timeline: Optional[GPSTimeline] = None
+        self._timeline_version = -1
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='live-nmea', daemon=True)
+        self._thread.start()
+    
+    def _run(self):
+        """Feed lines from the source to the parser until closed."""
+        try:
+            for line in self._lines():
+                self.add_line(line, time.time())
+        except Exception as e:
+            print(f"NMEA feed {self.source} stopped: {e}")
+    
+    def _lines(self) -> Iterator[str]:
+        """Lines of the configured source."""
+        if self.source.startswith('serial:'):
+            return self._serial_lines(*self.source[len('serial:'):].rsplit(':', 1))
+        if self.source.startswith('udp:'):
+            host, port = self.source[len('udp:'):].rsplit(':', 1)
+            return self._udp_lines(host, int(port))
+        return self._file_lines(self.source)
+    
+    def _serial_lines(self, port: str, baudrate: str = '4800') -> Iterator[str]:
+        """Lines read from a serial GPS receiver."""
+        if not baudrate.isdigit():
+            port, baudrate = f"{port}:{baudrate}", '4800'
+        import serial
+        
+        with serial.Serial(port, int(baudrate), timeout=0.5) as connection:
+            while not self._stopped.is_set():
+                line = connection.readline()
+                if line:
+                    yield line.decode('ascii', errors='ignore')
+    
+    def _udp_lines(self, host: str, port: int) -> Iterator[str]:
+        """Lines received as UDP datagrams, which may hold several sentences."""
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.bind((host, port))
+            sock.settimeout(0.5)
+            while not self._stopped.is_set():
+                try:
+                    data, _ = sock.recvfrom(65536)
+                except socket.timeout:
+                    continue
+                yield from data.decode('ascii', errors='ignore').splitlines()
+    
+    def _file_lines(self, path: str) -> Iterator[str]:
+        """Lines of a file, following it as it grows like tail -f."""
+        while not os.path.exists(path) and not self._stopped.is_set():
+            self._stopped.wait(0.5)
+        with open(path, 'r') as f:
+            partial = ''
+            while not self._stopped.is_set():
+                chunk = f.readline()
+                if not chunk:
+                    self._stopped.wait(0.1)
+                    continue
+                partial += chunk
+                if partial.endswith('\n'):
+                    yield partial
+                    partial = ''
+    
+    def add_line(self, line: str, arrival_time: float):
+        """
+        Parse one sentence.
+        
+        Args:
+            line: NMEA sentence
+            arrival_time: Local time.time() the sentence arrived at
+        """
+        line = line.strip()
+        if not line:
+            return
+        self.parser.parse_line(line)
+        if not self.parser.gps_data:
+            # Sentences of seconds that never got their counterpart are not kept
+            if len(self.parser.temp_data) > 16:
+                for key in sorted(self.parser.temp_data)[:-16]:
+                    del self.parser.temp_data[key]
+            return
+        
+        new_fixes, self.parser.gps_data = self.parser.gps_data, []
+        with self._lock:
+            for fix in new_fixes:
+                self.fixes.append(fix)
+                self._offsets.append((fix.timestamp - EPOCH).total_seconds() - arrival_time)
+            self._version += 1
+    
+    def gps_time(self, local_time: float) -> Optional[datetime]:
+        """
+        Convert a local time.time() value to GPS time.
+        
+        The smallest observed delay between a fix and its arrival is the best
+        estimate of the clock offset.
+        
+        Args:
+            local_time: Local time in seconds since the epoch
+        
+        Returns:
+            The GPS time, None before the first fix
+        """
+        with self._lock:
+            if not self._offsets:
+                return None
+            return EPOCH + timedelta(seconds=local_time + max(self._offsets))
+    
+    def lookup(self, timestamp: datetime, max_age: float) -> Optional[GPSData]:
+        """
+        Get the GPS data of a GPS time from the recent fixes.
+        
+        Args:
+            timestamp: GPS time to resolve
+            max_age: Largest allowed distance in seconds to the nearest fix
+        
+        Returns:
+            The closest or interpolated GPS data, None if no fix is close enough
+        """
+        with self._lock:
+            if self._timeline_version != self._version:
+                self._timeline = GPSTimeline(self.fixes[-self._window:], self.interpolate)
+                self._timeline_version = self._version
+            timeline = self._timeline
+        if timeline is None or not len(timeline):
+            return None
+        
+        closest = timeline.fixes[int(timeline.closest_indices(timeline.to_seconds([timestamp]))[0])]
+        if abs((closest.timestamp - timestamp).total_seconds()) > max_age:
+            return None
+        return timeline.lookup(timestamp)
+    
+    def all_fixes(self) -> List[GPSData]:
+        """Every fix received so far, in time order."""
+        with self._lock:
+            return sorted(self.fixes, key=lambda fix: fix.timestamp)
+    
+    def close(self):
+        """Stop reading the source."""
+        self._stopped.set()
+        self._thread.join(timeout=2.0)
+
+class LiveProcessor(VideoProcessor):
+    """
+    Flags road issues from a live camera and GPS feed while driving.
+    
+    Each step takes the newest captured frame, resolves its GPS position
+    from the fixes received so far and runs detection, storage and
+    deduplication exactly as for recordings. Frames the detector cannot
+    keep up with are dropped, both by the capture and when they are already
+    older than max_latency, which bounds the delay from capture to stored
+    issue. Frame stride, distance sampling, pipelining, sharding and
+    checkpoints only apply to recordings.
+    """
+    
+    def __init__(self, source: str, nmea_source: str, model_path: str, db_path: str = "road_issues.db",
+                 max_latency: float = 1.0, max_gps_age: float = 2.0, realtime: Optional[bool] = None,
+                 image_prefix: Optional[str] = None, **processor_options):
+        """
+        Initialize the live processor.
+        
+        Args:
+            source: Device index such as "0", stream URL or video file played back in real time
+            nmea_source: Serial port, UDP address or growing file, see LiveNMEAFeed
+            model_path: Path to the YOLO model
+            db_path: Path to the SQLite database
+            max_latency: Frames older than this many seconds when their turn comes are dropped
+            max_gps_age: Frames further than this many seconds from a fix get no position
+            realtime: Pace file sources to their frame rate, see LiveCapture
+            image_prefix: Image name prefix, unique per session by default
+            **processor_options: Further VideoProcessor arguments
+        """
+        self.realtime = realtime
+        self.max_latency = max_latency
+        self.max_gps_age = max_gps_age
+        self.live_interpolation = processor_options.get('gps_interpolation', False)
+        self.stop_event = threading.Event()
+        self.capture_times: Dict[int, float] = {}
+        self.frames_stale = 0
+        if image_prefix is None:
+            image_prefix = f"live_{datetime.now():%Y%m%d_%H%M%S}_"
+        super().__init__(source, nmea_source, model_path, db_path, image_prefix=image_prefix, **processor_options)
+    
+    def _open_capture(self, video_path: str) -> LiveCapture:
+        """Start reading the live source."""
+        return LiveCapture(video_path, self.realtime)
+    
+    def _load_gps_data(self, nmea_path: str) -> List[GPSData]:
+        """Start the NMEA feed, fixes arrive while processing."""
+        self.nmea_feed = LiveNMEAFeed(nmea_path, self.live_interpolation)
+        return []
+    
+    def iter_batches(self) -> Iterator[Tuple[List[FrameRecord], List[Tuple[list, Optional[GPSData]]]]]:
+        """
+        Process the newest frame until the source ends or stop() is called.
+        
+        Yields:
+            Tuples of (one frame record, its (detections, gps_data) tuple)
+        """
+        while not self.stop_event.is_set():
+            captured = self.cap.read_latest()
+            if captured is None:
+                if self.cap.finished:
+                    return
+                continue
+            
+            frame_number, frame, capture_time = captured
+            if time.time() - capture_time > self.max_latency:
+                self.frames_stale += 1
+                continue
+            
+            start = time.perf_counter()
+            timestamp = self.nmea_feed.gps_time(capture_time)
+            gps_data = self.nmea_feed.lookup(timestamp, self.max_gps_age) if timestamp is not None else None
+            records = [FrameRecord(frame_number, frame, timestamp, gps_data, {'gps_lookup': time.perf_counter() - start})]
+            self.capture_times[frame_number] = capture_time
+            self.frames_decoded += 1
+            yield records, self.process_records(records)
+    
+    def iter_results(self) -> Iterator[FrameResult]:
+        """
+        Yield results like VideoProcessor.iter_results, with the capture-to-result
+        latency in their timings and in timer as the 'latency' stage.
+        
+        Frames are decoded on the capture thread at the pace of the source,
+        so live timings have no decode stage.
+        """
+        for result in super().iter_results():
+            capture_time = self.capture_times.pop(result.frame_number, None)
+            if capture_time is not None:
+                latency = time.time() - capture_time
+                self.timer.add('latency', latency)
+                result.timings['latency'] = latency
+            yield result
+    
+    def _processed_range(self) -> Tuple[Optional[datetime], Optional[datetime]]:
+        """Time range of the fixes received during the session."""
+        self.gps_data = self.nmea_feed.all_fixes()
+        self.timeline = GPSTimeline(self.gps_data, self.live_interpolation)
+        if not self.gps_data:
+            return None, None
+        return self.gps_data[0].timestamp, self.gps_data[-1].timestamp
+    
+    def process_video(self) -> int:
+        """
+        Process the live source until it ends, stop() is called or Ctrl+C is pressed.
+        
+        Returns:
+            Number of issues stored
+        """
+        issue_count = 0
+        last_report = time.monotonic()
+        try:
+            for result in self.iter_results():
+                issue_count += len(result.issues)
+                for issue in result.issues:
+                    print(f"{issue.issue_type} at {issue.latitude:.6f}, {issue.longitude:.6f} "
+                          f"({issue.confidence:.2f})")
+                
+                if time.monotonic() - last_report >= 10.0:
+                    self.print_latency()
+                    last_report = time.monotonic()
+        except KeyboardInterrupt:
+            print("Stopping live processing")
+            issue_count += len(self.finish())
+        
+        self.print_latency()
+        print(format_summary(self.timer.summary(), "Stage timings:"))
+        return issue_count
+    
+    def stop(self):
+        """Stop processing after the current frame."""
+        self.stop_event.set()
+    
+    def latency_stats(self) -> Dict[str, float]:
+        """
+        Get capture-to-result latency percentiles and frame counts.
+        
+        Returns:
+            Dictionary with p50, p90, p99 and max latency in seconds, and the
+            frames captured, processed and dropped
+        """
+        latencies = self.timer.stats.get('latency', StageStats())
+        return {
+            'p50': latencies.percentile(50),
+            'p90': latencies.percentile(90),
+            'p99': latencies.percentile(99),
+            'max': latencies.max,
+            'frames_captured': self.cap.frames_captured,
+            'frames_processed': self.frames_decoded,
+            'frames_dropped': self.cap.frames_dropped + self.frames_stale
+        }
+    
+    def print_latency(self):
+        """Print the latency percentiles and frame counts."""
+        stats = self.latency_stats()
+        print(f"Latency p50 {stats['p50'] * 1000:.0f} ms, p90 {stats['p90'] * 1000:.0f} ms, "
+              f"p99 {stats['p99'] * 1000:.0f} ms, max {stats['max'] * 1000:.0f} ms; "
+              f"{stats['frames_processed']}/{stats['frames_captured']} frames processed, "
+              f"{stats['frames_dropped']} dropped")
+    
+    def release(self):
+        """Release the capture, the NMEA feed and everything VideoProcessor holds."""
+        try:
+            super().release()
+        finally:
+            self.nmea_feed.close()
+
+def replay_nmea(nmea_path: str, target: str, speed: float = 1.0, loop: bool = False):
+    """
+    Replay a recorded NMEA file in real time, standing in for a GPS receiver.
+    
+    Sentences are sent in bursts per fix second, spaced by the time between
+    fixes, to a UDP address ("udp:127.0.0.1:10110") or appended to a file.
+    
+    Args:
+        nmea_path: Recorded NMEA file
+        target: UDP address or file to write to
+        speed: Playback speed factor
+        loop: Start over at the end of the file
+    """
+    bursts: List[Tuple[str, List[str]]] = []
+    with open(nmea_path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line.startswith('$'):
+                continue
+            parts = line.split(',')
+            key = parts[1].split('.')[0] if len(parts) > 1 and parts[1] else ''
+            if not bursts or (key and key != bursts[-1][0]):
+                bursts.append((key, []))
+            bursts[-1][1].append(line)
+    
+    def seconds(key: str) -> Optional[float]:
+        return int(key[:2]) * 3600 + int(key[2:4]) * 60 + int(key[4:6]) if len(key) >= 6 and key[:6].isdigit() else None
+    
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM) if target.startswith('udp:') else None
+    address = None
+    if sock is not None:
+        host, port = target[len('udp:'):].rsplit(':', 1)
+        address = (host, int(port))
+    
+    try:
+        while True:
+            previous = None
+            for key, lines in bursts:
+                current = seconds(key)
+                if previous is not None and current is not None and current > previous:
+                    time.sleep((current - previous) / speed)
+                previous = current if current is not None else previous
+                
+                payload = '\r\n'.join(lines) + '\r\n'
+                if sock is not None:
+                    sock.sendto(payload.encode('ascii'), address)
+                else:
+                    with open(target, 'a') as out:
+                        out.write(payload)
+            if not loop:
+                break
+    finally:
+        if sock is not None:
+            sock.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Flag road issues from a live camera and GPS feed")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    run_parser = subparsers.add_parser('run', help="Process a live source")
+    run_parser.add_argument("source", help="Camera index, stream URL or video file played back in real time")
+    run_parser.add_argument("nmea", help="serial:PORT[:BAUD], udp:HOST:PORT or a growing NMEA file")
+    run_parser.add_argument("model", help="Path to the YOLO model")
+    run_parser.add_argument("--db", default="road_issues.db")
+    run_parser.add_argument("--conf", type=float, default=0.5)
+    run_parser.add_argument("--backend", choices=BACKENDS, default='pytorch')
+    run_parser.add_argument("--threads", type=int, default=0)
+    run_parser.add_argument("--model-server", help="Address of a shared model server")
+    run_parser.add_argument("--max-latency", type=float, default=1.0, help="Drop frames older than this many seconds")
+    run_parser.add_argument("--max-gps-age", type=float, default=2.0)
+    run_parser.add_argument("--deduplication", choices=('cooldown', 'tracker'), default='cooldown')
+    run_parser.add_argument("--evidence-mode", choices=('frame', 'compact'), default='frame')
+    
+    replay_parser = subparsers.add_parser('replay-nmea', help="Replay a recorded NMEA file in real time")
+    replay_parser.add_argument("nmea", help="Recorded NMEA file")
+    replay_parser.add_argument("target", help="udp:HOST:PORT or a file to append to")
+    replay_parser.add_argument("--speed", type=float, default=1.0)
+    replay_parser.add_argument("--loop", action='store_true')
+    args = parser.parse_args()
+    
+    if args.command == 'replay-nmea':
+        replay_nmea(args.nmea, args.target, args.speed, args.loop)
+    else:
+        with LiveProcessor(args.source, args.nmea, args.model, args.db, max_latency=args.max_latency,
+                           max_gps_age=args.max_gps_age, conf_threshold=args.conf, batch_size=1,
+                           backend=args.backend, num_threads=args.threads, model_server=args.model_server,
+                           deduplication=args.deduplication, evidence_mode=args.evidence_mode) as processor:
+            processor.process_video()
@@ -1,8 +1,11 @@
 import sys
 import os
+import threading
+import time
+from contextlib import closing
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import Optional, List
+from typing import Optional, List, Tuple
 
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
@@ -19,23 +22,50 @@ import cv2
 from video_processor import VideoProcessor
 from database import Database, RoadIssue
 from detector import RoadDamageDetector
+from backends import BACKENDS
+from roi import RoadROI, load_camera_profiles
+from timing import format_summary
 
 class VideoProcessorThread(QThread):
     """Thread for processing video in the background."""
     progress_updated = pyqtSignal(int)
-    processing_finished = pyqtSignal(list)  # List of RoadIssue objects
+    processing_finished = pyqtSignal()
+    issues_stored = pyqtSignal(list)  # List of RoadIssue objects written to the database
     error_occurred = pyqtSignal(str)
-    frame_ready = pyqtSignal(np.ndarray)  # Signal for processed frame
+    preview_ready = pyqtSignal(QImage)  # Downscaled RGB preview of a processed frame
+    stats_updated = pyqtSignal(dict)  # Per-stage timings, see StageTimer.summary
 
     def __init__(self, video_path: str, nmea_path: str, model_path: str, 
-                 db_path: str, conf_threshold: float):
+                 db_path: str, conf_threshold: float, batch_size: int = 8,
+                 backend: str = 'pytorch', num_threads: int = 0, roi: Optional[RoadROI] = None,
+                 model_server: Optional[str] = None, sample_distance: float = 0.0,
+                 pipelined: bool = False, workers: int = 0, gps_interpolation: bool = False,
+                 evidence_mode: str = 'frame', deduplication: str = 'cooldown', preview_fps: float = 10.0,
+                 preview_size: Tuple[int, int] = (640, 480)):
         super().__init__()
         self.video_path = video_path
         self.nmea_path = nmea_path
         self.model_path = model_path
         self.db_path = db_path
         self.conf_threshold = conf_threshold
+        self.batch_size = batch_size
+        self.backend = backend
+        self.num_threads = num_threads
+        self.roi = roi
+        self.model_server = model_server
+        self.sample_distance = sample_distance
+        self.pipelined = pipelined
+        self.workers = workers
+        self.gps_interpolation = gps_interpolation
+        self.evidence_mode = evidence_mode
+        self.deduplication = deduplication
         self.is_running = True
+        
+        # Preview throttling, a new preview is only sent once the last one was shown
+        self.preview_interval = 1.0 / preview_fps if preview_fps > 0 else 0.0
+        self.preview_size = preview_size  # Updated by the window when the label is resized
+        self.last_preview_time = 0.0
+        self.preview_pending = threading.Event()
         self.processor = None
 
     def run(self):
@@ -45,77 +75,42 @@ class VideoProcessorThread(QThread):
                 self.nmea_path, 
                 self.model_path,
                 self.db_path,
-                self.conf_threshold
+                self.conf_threshold,
+                self.batch_size,
+                self.backend,
+                self.num_threads,
+                self.roi,
+                model_server=self.model_server,
+                sample_distance=self.sample_distance,
+                pipelined=self.pipelined,
+                workers=self.workers,
+                gps_interpolation=self.gps_interpolation,
+                evidence_mode=self.evidence_mode,
+                deduplication=self.deduplication,
+                stats_callback=self.stats_updated.emit
             )
             
-            # Process video and get stored issues
-            stored_issues = []
-            while self.is_running and self.processor.cap.isOpened():
-                ret, frame = self.processor.cap.read()
-                if not ret:
-                    break
-                    
-                # Process frame
-                detections, gps_data = self.processor.process_frame(frame, self.processor.current_frame)
-                
-                if detections and gps_data:
-                    # Draw detections on frame
-                    self.processor.detector.draw_detections(frame, detections)
-                    
-                    # Save annotated frame
-                    output_path = self.processor.output_dir / f"issue_{self.processor.current_frame:06d}.jpg"
-                    cv2.imwrite(str(output_path), frame)
-                    
-                    # Store each detection in the database
-                    for detection in detections:
-                        # Get address information
-                        address_info = self.processor.geocoder.reverse_geocode(
-                            gps_data.latitude_decimal,
-                            gps_data.longitude_decimal
-                        )
-                        
-                        # Create RoadIssue object
-                        issue = RoadIssue(
-                            timestamp=gps_data.timestamp,
-                            latitude=gps_data.latitude_decimal,
-                            longitude=gps_data.longitude_decimal,
-                            issue_type=detection.class_name,
-                            confidence=detection.confidence,
-                            image_path=f"issue_{self.processor.current_frame:06d}.jpg",  # Store only filename
-                            bbox=detection.bbox,
-                            speed=gps_data.speed_knots,
-                            fix_quality=gps_data.fix_quality,
-                            num_satellites=gps_data.num_satellites,
-                            hdop=gps_data.hdop,
-                            city=address_info.get('city') if address_info else None,
-                            district=address_info.get('district') if address_info else None,
-                            street=address_info.get('street') if address_info else None
-                        )
-                        
-                        # Store in database
-                        issue_id = self.processor.db.add_issue(issue)
-                        issue.id = issue_id
-                        stored_issues.append(issue)
+            # Process video, streaming issues to the window once they have their database ID
+            pending_issues = []
+            finished = False
+            with closing(self.processor.iter_results()) as results:
+                for result in results:
+                    # Preview decoded frames, skipped frames were never decoded
+                    if result.frame is not None:
+                        self.emit_preview(result.frame)
                         
-                        # Save image in src/detected_issues directory
-                        image_filename = f"issue_{self.processor.current_frame:06d}.jpg"
-                        image_path = os.path.join('src', 'detected_issues', image_filename)
-                        
-                        # Create directory if it doesn't exist
-                        os.makedirs(os.path.dirname(image_path), exist_ok=True)
+                    pending_issues = self.emit_written(pending_issues + result.issues)
+                    self.progress_updated.emit(int(result.progress))
+                    finished = result.final
+                    
+                    if not self.is_running:
+                        break
                         
-                        # Save the image
-                        cv2.imwrite(image_path, frame)
-                
-                # Emit frame for display
-                self.frame_ready.emit(frame)
-                
-                # Update progress
-                self.processor.current_frame += 1
-                progress = (self.processor.current_frame / self.processor.frame_count) * 100
-                self.progress_updated.emit(int(progress))
-                
-            self.processing_finished.emit(stored_issues)
+            # A stopped run still stores its active tracks and road segments
+            if not finished:
+                pending_issues += self.processor.finish()
+            self.emit_written(pending_issues)
+            self.processing_finished.emit()
             
         except Exception as e:
             self.error_occurred.emit(str(e))
@@ -123,11 +118,72 @@ class VideoProcessorThread(QThread):
             if self.processor:
                 self.processor.release()
 
+    def emit_preview(self, frame: np.ndarray):
+        """
+        Emit a preview of a frame, at most preview_fps times per second.
+        
+        Frames arriving while the previous preview is still waiting to be
+        shown are dropped instead of queued, so a slow GUI never holds up
+        processing. Scaling and colour conversion happen here, off the GUI thread.
+        
+        Args:
+            frame: Processed BGR frame
+        """
+        now = time.monotonic()
+        if self.preview_pending.is_set() or now - self.last_preview_time < self.preview_interval:
+            return
+        self.last_preview_time = now
+        
+        # Scale to fit the label while maintaining aspect ratio, never up
+        height, width = frame.shape[:2]
+        label_width, label_height = self.preview_size
+        scale = min(label_width / width, label_height / height, 1.0)
+        if scale < 1.0:
+            frame = cv2.resize(frame, (max(int(width * scale), 1), max(int(height * scale), 1)),
+                               interpolation=cv2.INTER_AREA)
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        
+        # The QImage gets its own copy of the pixels, the array is freed after this call
+        height, width = frame_rgb.shape[:2]
+        image = QImage(frame_rgb.data, width, height, 3 * width, QImage.Format.Format_RGB888).copy()
+        
+        self.preview_pending.set()
+        self.preview_ready.emit(image)
+        
+    def preview_shown(self, width: int, height: int):
+        """
+        Called by the window once a preview is displayed.
+        
+        Args:
+            width: Current width of the preview label
+            height: Current height of the preview label
+        """
+        self.preview_size = (width, height)
+        self.preview_pending.clear()
+        
+    def emit_written(self, issues: List[RoadIssue]) -> List[RoadIssue]:
+        """
+        Emit the issues that were written to the database.
+        
+        Args:
+            issues: Stored issues, written ones have their ID set
+            
+        Returns:
+            The issues still waiting to be written
+        """
+        written = [issue for issue in issues if issue.id is not None]
+        if written:
+            self.issues_stored.emit(written)
+        return [issue for issue in issues if issue.id is None]
+        
     def stop(self):
-        """Stop the video processing thread safely."""
+        """
+        Ask the video processing thread to stop after the frame it is handling.
+        
+        The capture belongs to the worker thread, which still reads from it to
+        finish the run, so it is released there rather than here.
+        """
         self.is_running = False
-        if self.processor and self.processor.cap:
-            self.processor.cap.release()
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -140,6 +196,10 @@ class MainWindow(QMainWindow):
         self.nmea_path = None
         self.model_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "model", "mymodel.pt")
         self.db_path = "road_issues.db"
+        self.profiles_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "camera_profiles.json")
+        
+        # Load road ROI camera profiles if available
+        self.camera_profiles = load_camera_profiles(self.profiles_path) if os.path.exists(self.profiles_path) else {}
         
         # Initialize processing thread
         self.processing_thread = None
@@ -194,6 +254,62 @@ class MainWindow(QMainWindow):
         
         param_layout.addRow("Confidence Threshold:", self.confidence_spinbox)
         
+        self.batch_size_spinbox = QSpinBox()
+        self.batch_size_spinbox.setRange(1, 64)
+        self.batch_size_spinbox.setValue(8)
+        
+        param_layout.addRow("Batch Size:", self.batch_size_spinbox)
+        
+        self.backend_combo = QComboBox()
+        self.backend_combo.addItems(BACKENDS)
+        
+        param_layout.addRow("Inference Backend:", self.backend_combo)
+        
+        self.threads_spinbox = QSpinBox()
+        self.threads_spinbox.setRange(0, os.cpu_count() or 1)
+        self.threads_spinbox.setValue(0)
+        self.threads_spinbox.setSpecialValueText("Auto")
+        
+        param_layout.addRow("CPU Threads:", self.threads_spinbox)
+        
+        self.profile_combo = QComboBox()
+        self.profile_combo.addItem("Full Frame")
+        self.profile_combo.addItems(sorted(self.camera_profiles))
+        
+        param_layout.addRow("Camera Profile:", self.profile_combo)
+        
+        self.sample_distance_spinbox = QDoubleSpinBox()
+        self.sample_distance_spinbox.setRange(0.0, 50.0)
+        self.sample_distance_spinbox.setSingleStep(0.5)
+        self.sample_distance_spinbox.setValue(0.0)
+        self.sample_distance_spinbox.setSpecialValueText("Every Frame")
+        self.sample_distance_spinbox.setSuffix(" m")
+        
+        param_layout.addRow("Sample Distance:", self.sample_distance_spinbox)
+        
+        self.pipelined_checkbox = QCheckBox("Overlap decode, inference and saving")
+        
+        param_layout.addRow("Pipelined:", self.pipelined_checkbox)
+        
+        self.workers_spinbox = QSpinBox()
+        self.workers_spinbox.setRange(1, os.cpu_count() or 1)
+        self.workers_spinbox.setValue(1)
+        self.workers_spinbox.setSpecialValueText("Off")
+        
+        param_layout.addRow("Worker Processes:", self.workers_spinbox)
+        
+        self.gps_interpolation_checkbox = QCheckBox("Interpolate between GPS fixes")
+        
+        param_layout.addRow("GPS Positions:", self.gps_interpolation_checkbox)
+        
+        self.compact_evidence_checkbox = QCheckBox("Save detection crops and a small context frame")
+        
+        param_layout.addRow("Compact Evidence:", self.compact_evidence_checkbox)
+        
+        self.tracker_checkbox = QCheckBox("Track defects across frames instead of a cooldown")
+        
+        param_layout.addRow("Deduplication:", self.tracker_checkbox)
+        
         # Progress group
         progress_group = QGroupBox("Processing Status")
         progress_layout = QVBoxLayout(progress_group)
@@ -266,10 +382,21 @@ class MainWindow(QMainWindow):
         
         stats_layout.addWidget(self.stats_text)
         
+        # Performance tab
+        timings_tab = QWidget()
+        timings_layout = QVBoxLayout(timings_tab)
+        
+        self.timings_text = QTextEdit()
+        self.timings_text.setReadOnly(True)
+        self.timings_text.setFontFamily("monospace")
+        
+        timings_layout.addWidget(self.timings_text)
+        
         # Add tabs
         right_panel.addTab(video_tab, "Video")
         right_panel.addTab(issues_tab, "Detected Issues")
         right_panel.addTab(stats_tab, "Statistics")
+        right_panel.addTab(timings_tab, "Performance")
         
         # Add panels to splitter
         splitter.addWidget(left_panel)
@@ -432,14 +559,29 @@ class MainWindow(QMainWindow):
                 self.nmea_path,
                 self.model_path,
                 self.db_path,
-                self.confidence_spinbox.value()
+                self.confidence_spinbox.value(),
+                self.batch_size_spinbox.value(),
+                self.backend_combo.currentText(),
+                self.threads_spinbox.value(),
+                self.camera_profiles.get(self.profile_combo.currentText()),
+                sample_distance=self.sample_distance_spinbox.value(),
+                pipelined=self.pipelined_checkbox.isChecked(),
+                workers=self.workers_spinbox.value(),
+                gps_interpolation=self.gps_interpolation_checkbox.isChecked(),
+                evidence_mode='compact' if self.compact_evidence_checkbox.isChecked() else 'frame',
+                deduplication='tracker' if self.tracker_checkbox.isChecked() else 'cooldown',
+                preview_size=(self.video_label.width(), self.video_label.height())
             )
             
             self.processing_thread.progress_updated.connect(self.update_progress)
             self.processing_thread.processing_finished.connect(self.processing_finished)
+            self.processing_thread.issues_stored.connect(self.add_issues_to_table)
             self.processing_thread.error_occurred.connect(self.show_error)
-            self.processing_thread.frame_ready.connect(self.display_frame)
+            self.processing_thread.preview_ready.connect(self.display_frame)
+            self.processing_thread.stats_updated.connect(self.update_timings)
             
+            self.issues_table.setRowCount(0)
+            self.timings_text.clear()
             self.processing_thread.start()
             
             self.process_button.setEnabled(False)
@@ -458,7 +600,7 @@ class MainWindow(QMainWindow):
         """Update the progress bar."""
         self.progress_bar.setValue(value)
         
-    def processing_finished(self, issues: Optional[List[RoadIssue]] = None):
+    def processing_finished(self):
         """Handle completion of video processing."""
         self.process_button.setEnabled(True)
         self.stop_button.setEnabled(False)
@@ -466,21 +608,19 @@ class MainWindow(QMainWindow):
         self.status_label.setText("Processing completed")
         self.progress_bar.setValue(0)
         self.statusBar.showMessage("Processing completed")
+        self.update_statistics()
         
-        if issues:
-            self.update_issues_table(issues)
-            self.update_statistics()
-            
     def show_error(self, error_message):
         """Show error message in a dialog."""
         QMessageBox.critical(self, "Error", f"An error occurred: {error_message}")
         self.processing_finished()
         
-    def update_issues_table(self, issues: List[RoadIssue]):
-        """Update the issues table with new data."""
-        self.issues_table.setRowCount(len(issues))
+    def add_issues_to_table(self, issues: List[RoadIssue]):
+        """Append newly stored issues to the issues table."""
+        first_row = self.issues_table.rowCount()
+        self.issues_table.setRowCount(first_row + len(issues))
         
-        for row, issue in enumerate(issues):
+        for row, issue in enumerate(issues, first_row):
             self.issues_table.setItem(row, 0, QTableWidgetItem(str(issue.id)))
             self.issues_table.setItem(row, 1, QTableWidgetItem(
                 issue.timestamp.strftime("%Y-%m-%d %H:%M:%S")
@@ -519,6 +659,10 @@ class MainWindow(QMainWindow):
             
             self.stats_text.setText(stats_text)
             
+    def update_timings(self, summary: dict):
+        """Show the per-stage timings of the running video in the performance tab."""
+        self.timings_text.setText(format_summary(summary))
+        
     def format_dict(self, d: dict) -> str:
         """Format a dictionary for display in statistics."""
         return "\n".join(f"  {k}: {v}" for k, v in d.items())
@@ -552,26 +696,13 @@ class MainWindow(QMainWindow):
                     f"Data exported successfully to {file_name}"
                 )
 
-    def display_frame(self, frame: np.ndarray):
-        """Display a processed frame."""
-        # Convert frame to RGB
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    def display_frame(self, image: QImage):
+        """Display a preview frame, already scaled to the label by the processing thread."""
+        self.video_label.setPixmap(QPixmap.fromImage(image))
         
-        # Convert to QImage
-        height, width, channel = frame_rgb.shape
-        bytes_per_line = 3 * width
-        q_image = QImage(frame_rgb.data, width, height, bytes_per_line, QImage.Format.Format_RGB888)
-        
-        # Scale image to fit label while maintaining aspect ratio
-        pixmap = QPixmap.fromImage(q_image)
-        scaled_pixmap = pixmap.scaled(
-            self.video_label.size(),
-            Qt.AspectRatioMode.KeepAspectRatio,
-            Qt.TransformationMode.SmoothTransformation
-        )
-        
-        # Display image
-        self.video_label.setPixmap(scaled_pixmap)
+        # Let the thread send the next preview, at the current label size
+        if self.processing_thread:
+            self.processing_thread.preview_shown(self.video_label.width(), self.video_label.height())
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
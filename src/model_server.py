@@ -0,0 +1,315 @@
+import argparse
+import os
+import queue
+import secrets
+import threading
+import time
+import multiprocessing
+import numpy as np
+from concurrent.futures import Future
+from multiprocessing.connection import Listener, Client, Connection
+from typing import List, Sequence, Optional, Union, Tuple
+
+from backends import BACKENDS
+from detector import RoadDamageDetector
+from roi import load_camera_profiles
+
+# Environment variable holding the key shared by a model server and its clients
+AUTHKEY_ENV = 'RDD_MODEL_SERVER_KEY'
+
+# Hosts a model server may listen on without allow_remote
+LOOPBACK_HOSTS = ('127.0.0.1', 'localhost', '::1')
+
+# Default address of the model server
+DEFAULT_ADDRESS = ('127.0.0.1', 6010)
+
+Address = Union[str, Tuple[str, int]]
+
+def parse_address(address: str) -> Address:
+    """
+    Parse a 'host:port' string into a TCP address, anything else is a Unix socket path.
+    
+    Args:
+        address: Address string
+    
+    Returns:
+        (host, port) tuple or socket path
+    """
+    host, sep, port = address.rpartition(':')
+    if sep and port.isdigit():
+        return (host or '127.0.0.1', int(port))
+    return address
+
+def get_authkey() -> bytes:
+    """
+    Get the key a model server and its clients authenticate each other with.
+    
+    The key is read from the RDD_MODEL_SERVER_KEY environment variable. If it
+    is unset a random key is generated and stored there, so worker processes
+    and a server started from this process share it while other users cannot
+    connect.
+    
+    Returns:
+        The key
+    """
+    key = os.environ.get(AUTHKEY_ENV)
+    if not key:
+        key = os.environ[AUTHKEY_ENV] = secrets.token_hex(16)
+    return key.encode()
+
+class ModelServer:
+    """
+    Loads the detector once and serves detections to local producer processes.
+    
+    Requests from all clients go into one queue. A batching thread drains it
+    until max_batch frames are pending or max_wait seconds have passed since
+    the first one arrived, runs them as a single detector call and hands each
+    client its share of the results.
+    """
+    
+    def __init__(self, model_path: str, address: Address = DEFAULT_ADDRESS, max_batch: int = 16,
+                 max_wait: float = 0.01, allow_remote: bool = False, **detector_options):
+        """
+        Initialize the model server.
+        
+        Args:
+            model_path: Path to the YOLO model
+            address: TCP (host, port) or Unix socket path to listen on
+            max_batch: Maximum number of frames per detector call
+            max_wait: Longest time in seconds a request waits for others to batch with
+            allow_remote: Allow listening on a TCP address other than the loopback interface
+            **detector_options: Further RoadDamageDetector arguments
+        """
+        if isinstance(address, tuple) and address[0] not in LOOPBACK_HOSTS and not allow_remote:
+            raise ValueError(f"Model server address {address[0]} is not local, pass allow_remote to listen on it")
+            
+        self.address = address
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.detector = RoadDamageDetector(model_path, batch_size=max_batch, **detector_options)
+        self.requests: queue.Queue = queue.Queue()
+    
+    def serve_forever(self):
+        """Accept clients until the process is terminated."""
+        threading.Thread(target=self._batch_loop, daemon=True).start()
+        
+        with Listener(self.address, authkey=get_authkey()) as listener:
+            print(f"Model server listening on {listener.address}")
+            while True:
+                conn = listener.accept()
+                threading.Thread(target=self._handle_client, args=(conn,), daemon=True).start()
+    
+    def _handle_client(self, conn: Connection):
+        """Serve detection requests of one client connection."""
+        conn.send({
+            'classes': self.detector.classes,
+            'conf_threshold': self.detector.conf_threshold,
+            'batch_size': self.max_batch
+        })
+        
+        try:
+            while True:
+                shapes = conn.recv()
+                frames = [np.frombuffer(conn.recv_bytes(), dtype=np.uint8).reshape(shape) for shape in shapes]
+                
+                future = Future()
+                self.requests.put((frames, future))
+                try:
+                    conn.send((True, future.result()))
+                except Exception as e:
+                    conn.send((False, str(e)))
+        except (EOFError, ConnectionResetError):
+            pass
+        finally:
+            conn.close()
+    
+    def _batch_loop(self):
+        """Collect requests into dynamic batches and run them."""
+        while True:
+            pending = [self.requests.get()]
+            count = len(pending[0][0])
+            
+            # Wait for more requests until the batch is full or the deadline passes
+            deadline = time.monotonic() + self.max_wait
+            while count < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self.requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                pending.append(request)
+                count += len(request[0])
+            
+            frames = [frame for request_frames, _ in pending for frame in request_frames]
+            try:
+                arrays = self.detector.detect_arrays(frames)
+            except Exception as e:
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+            
+            start = 0
+            for request_frames, future in pending:
+                future.set_result(arrays[start:start + len(request_frames)])
+                start += len(request_frames)
+
+def run_model_server(model_path: str, address: Address = DEFAULT_ADDRESS, max_batch: int = 16,
+                     max_wait: float = 0.01, allow_remote: bool = False, **detector_options):
+    """Create a model server and serve until terminated."""
+    ModelServer(model_path, address, max_batch, max_wait, allow_remote, **detector_options).serve_forever()
+
+def start_model_server(model_path: str, address: Address = DEFAULT_ADDRESS, max_batch: int = 16,
+                       max_wait: float = 0.01, **detector_options) -> multiprocessing.Process:
+    """
+    Start a model server in a background process.
+    
+    Args:
+        model_path: Path to the YOLO model
+        address: TCP (host, port) or Unix socket path to listen on
+        max_batch: Maximum number of frames per detector call
+        max_wait: Longest time in seconds a request waits for others to batch with
+        **detector_options: Further RoadDamageDetector arguments
+    
+    Returns:
+        The started server process
+    """
+    # Generated before the process starts, so the server inherits the key of this process
+    get_authkey()
+    process = multiprocessing.Process(
+        target=run_model_server,
+        args=(model_path, address, max_batch, max_wait),
+        kwargs=detector_options,
+        daemon=True
+    )
+    process.start()
+    return process
+
+class RemoteDetector:
+    """
+    Client of a model server with the detection interface of RoadDamageDetector.
+    
+    Only what processing uses is provided: detection, conversion to Detection
+    objects and drawing. Conversion and drawing only need the class names,
+    which the server sends on connect, so they are shared with
+    RoadDamageDetector. Screening, tiling and the ROI are applied on the server.
+    """
+    
+    detect = RoadDamageDetector.detect
+    detect_batch = RoadDamageDetector.detect_batch
+    detect_array = RoadDamageDetector.detect_array
+    to_detections = RoadDamageDetector.to_detections
+    draw_detections = RoadDamageDetector.draw_detections
+    
+    def __init__(self, address: Address = DEFAULT_ADDRESS, connect_timeout: float = 60.0):
+        """
+        Connect to a model server.
+        
+        Args:
+            address: Address of the model server
+            connect_timeout: Seconds to keep retrying while the server is starting
+        """
+        deadline = time.monotonic() + connect_timeout
+        while True:
+            try:
+                self.conn = Client(address, authkey=get_authkey())
+                break
+            except (ConnectionRefusedError, FileNotFoundError):
+                if time.monotonic() >= deadline:
+                    raise ConnectionError(f"Could not connect to model server at {address}")
+                time.sleep(0.5)
+        
+        info = self.conn.recv()
+        self.classes = info['classes']
+        self.conf_threshold = info['conf_threshold']
+        self.batch_size = info['batch_size']
+        
+        # Screening and tiling happen on the server
+        self.cascade_imgsz = 0
+        self.tile_size = 0
+        self.roi = None
+    
+    def detect_arrays(self, frames: Union[Sequence[np.ndarray], np.ndarray],
+                      batch_size: Optional[int] = None) -> List[np.ndarray]:
+        """
+        Send frames to the model server and wait for their detections.
+        
+        Args:
+            frames: List of frames or a stacked (N, H, W, C) array
+            batch_size: Ignored, the server batches requests itself
+        
+        Returns:
+            One array of DETECTION_DTYPE records per input frame, in input order
+        """
+        frames = [np.ascontiguousarray(frame) for frame in frames]
+        if not frames:
+            return []
+        
+        self.conn.send([frame.shape for frame in frames])
+        for frame in frames:
+            self.conn.send_bytes(frame.reshape(-1))
+        
+        ok, payload = self.conn.recv()
+        if not ok:
+            raise RuntimeError(f"Model server error: {payload}")
+        return payload
+    
+    def close(self):
+        """Close the connection to the model server."""
+        self.conn.close()
+
+def create_detector(model_server: Optional[str] = None, **detector_options) -> Union[RoadDamageDetector, RemoteDetector]:
+    """
+    Create a local detector, or a client of a model server if an address is given.
+    
+    Args:
+        model_server: Address ('host:port' or socket path) of a model server, None loads the model locally
+        **detector_options: RoadDamageDetector arguments, ignored for a model server
+    
+    Returns:
+        The detector
+    """
+    if model_server:
+        return RemoteDetector(parse_address(model_server))
+    return RoadDamageDetector(**detector_options)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve road damage detections to local processes")
+    parser.add_argument("model", help="Path to the YOLO model")
+    parser.add_argument("--address", default="127.0.0.1:6010", help="host:port or Unix socket path")
+    parser.add_argument("--max-batch", type=int, default=16)
+    parser.add_argument("--max-wait", type=float, default=0.01, help="Batching deadline in seconds")
+    parser.add_argument("--conf", type=float, default=0.5)
+    parser.add_argument("--backend", choices=BACKENDS, default='pytorch')
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--imgsz", type=int, default=640, help="Model input size")
+    parser.add_argument("--profiles", help="Camera profiles JSON file")
+    parser.add_argument("--profile", help="Camera profile whose road region is applied to all frames served")
+    parser.add_argument("--cascade-imgsz", type=int, default=0, help="Screening pass input size, 0 disables it")
+    parser.add_argument("--cascade-conf", type=float, default=0.25, help="Confidence that escalates a screened frame")
+    parser.add_argument("--tile-size", type=int, default=0, help="Full-resolution tile side, 0 runs whole frames")
+    parser.add_argument("--tile-overlap", type=float, default=0.2, help="Fraction of a tile shared with its neighbour")
+    parser.add_argument("--allow-remote", action='store_true', help="Listen on a non-loopback address")
+    args = parser.parse_args()
+    
+    # A generated key would have to be shown to reach clients in other shells
+    if not os.environ.get(AUTHKEY_ENV):
+        parser.error(f"set {AUTHKEY_ENV} to the key shared with the clients")
+    
+    roi = None
+    if args.profile:
+        if not args.profiles:
+            parser.error("--profile needs --profiles")
+        try:
+            profiles = load_camera_profiles(args.profiles)
+        except (OSError, ValueError) as e:
+            parser.error(f"could not load camera profiles from {args.profiles}: {e}")
+        if args.profile not in profiles:
+            parser.error(f"unknown camera profile {args.profile!r}, expected one of {sorted(profiles)}")
+        roi = profiles[args.profile]
+    
+    run_model_server(args.model, parse_address(args.address), args.max_batch, args.max_wait, args.allow_remote,
+                     conf_threshold=args.conf, backend=args.backend, num_threads=args.threads, imgsz=args.imgsz,
+                     roi=roi, cascade_imgsz=args.cascade_imgsz, cascade_conf=args.cascade_conf,
+                     tile_size=args.tile_size, tile_overlap=args.tile_overlap)
@@ -0,0 +1,186 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+# Marks the end of the stream in a pipeline queue
+_END = object()
+
+class _StageError:
+    """Carries an exception raised in a stage thread to the consumer."""
+    
+    def __init__(self, stage: str, error: BaseException):
+        self.stage = stage
+        self.error = error
+
+class PipelineQueue:
+    """
+    Bounded queue between two pipeline stages that records how full it runs.
+    
+    A queue that is usually full means the consuming stage is the bottleneck,
+    one that is usually empty means the producing stage is.
+    """
+    
+    def __init__(self, name: str, maxsize: int):
+        """
+        Initialize the queue.
+        
+        Args:
+            name: Name shown in the statistics, e.g. 'decode -> inference'
+            maxsize: Maximum number of items waiting in the queue
+        """
+        self.name = name
+        self.maxsize = maxsize
+        self.queue: queue.Queue = queue.Queue(maxsize)
+        self.max_depth = 0
+        self.depth_total = 0
+        self.samples = 0
+        self.blocked_seconds = 0.0  # time the producer waited on a full queue
+    
+    def put(self, item: Any, stop: threading.Event) -> bool:
+        """
+        Put an item, blocking while the queue is full.
+        
+        Args:
+            item: Item to put
+            stop: Event that aborts the wait when the pipeline shuts down
+        
+        Returns:
+            True if the item was queued, False if the pipeline stopped first
+        """
+        start = time.perf_counter()
+        try:
+            while not stop.is_set():
+                try:
+                    self.queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        finally:
+            self.blocked_seconds += time.perf_counter() - start
+    
+    def get(self) -> Any:
+        """Take the next item, sampling the queue depth."""
+        item = self.queue.get()
+        depth = self.queue.qsize() + 1
+        self.max_depth = max(self.max_depth, depth)
+        self.depth_total += depth
+        self.samples += 1
+        return item
+    
+    def stats(self) -> Dict:
+        """
+        Get queue depth statistics.
+        
+        Returns:
+            Dictionary with the capacity, mean and maximum depth seen by the consumer,
+            and the seconds the producer spent blocked on a full queue
+        """
+        return {
+            'capacity': self.maxsize,
+            'mean_depth': self.depth_total / self.samples if self.samples else 0.0,
+            'max_depth': self.max_depth,
+            'blocked_seconds': self.blocked_seconds
+        }
+
+class Pipeline:
+    """
+    Source and processing stages running on their own threads, connected by bounded queues.
+    
+    Iterating the pipeline yields the output of the last stage in order on
+    the calling thread, so the consumer is the final stage. Full queues block
+    the stage feeding them, which bounds memory when a later stage is slower.
+    An exception in any stage is re-raised in the consumer, and leaving the
+    loop early stops all stage threads.
+    """
+    
+    def __init__(self, source: Iterable, stages: List[Tuple[str, Callable[[Any], Any]]],
+                 source_name: str = 'source', queue_size: int = 4):
+        """
+        Initialize the pipeline.
+        
+        Args:
+            source: Iterable producing the input items, consumed on its own thread
+            stages: (name, function) pairs applied to each item in order
+            source_name: Name of the source stage in the statistics
+            queue_size: Capacity of each queue between stages
+        """
+        if queue_size < 1:
+            raise ValueError(f"queue_size must be at least 1, got {queue_size}")
+        
+        self.source = source
+        self.source_name = source_name
+        self.stages = stages
+        names = [source_name] + [name for name, _ in stages] + ['consumer']
+        self.queues = [PipelineQueue(f"{names[i]} -> {names[i + 1]}", queue_size) for i in range(len(stages) + 1)]
+        self._stop = threading.Event()
+    
+    def _run_source(self, outbox: PipelineQueue):
+        """Feed the source iterable into the first queue."""
+        try:
+            for item in self.source:
+                if not outbox.put(item, self._stop):
+                    return
+        except BaseException as e:
+            outbox.put(_StageError(self.source_name, e), self._stop)
+            return
+        outbox.put(_END, self._stop)
+    
+    def _run_stage(self, inbox: PipelineQueue, outbox: PipelineQueue, name: str, function: Callable[[Any], Any]):
+        """Apply a stage function to every item of its input queue."""
+        while True:
+            item = inbox.get()
+            if item is _END or isinstance(item, _StageError):
+                outbox.put(item, self._stop)
+                return
+            try:
+                result = function(item)
+            except BaseException as e:
+                outbox.put(_StageError(name, e), self._stop)
+                return
+            if not outbox.put(result, self._stop):
+                return
+    
+    def __iter__(self) -> Iterator[Any]:
+        """Start the stage threads and yield the results of the last stage."""
+        threads = [threading.Thread(target=self._run_source, args=(self.queues[0],), daemon=True)]
+        for i, (name, function) in enumerate(self.stages):
+            threads.append(threading.Thread(target=self._run_stage,
+                                            args=(self.queues[i], self.queues[i + 1], name, function),
+                                            daemon=True))
+        for thread in threads:
+            thread.start()
+        
+        try:
+            while True:
+                item = self.queues[-1].get()
+                if item is _END:
+                    return
+                if isinstance(item, _StageError):
+                    raise RuntimeError(f"Pipeline stage '{item.stage}' failed: {item.error}") from item.error
+                yield item
+        finally:
+            self._stop.set()
+            # Drain the queues so stages blocked on get() see the end of the stream
+            for pipeline_queue in self.queues:
+                try:
+                    while True:
+                        pipeline_queue.queue.get_nowait()
+                except queue.Empty:
+                    pass
+                try:
+                    pipeline_queue.queue.put_nowait(_END)
+                except queue.Full:
+                    pass
+            for thread in threads:
+                thread.join()
+    
+    def stats(self) -> Dict[str, Dict]:
+        """
+        Get per-queue depth statistics.
+        
+        Returns:
+            Dictionary mapping queue names to PipelineQueue.stats()
+        """
+        return {pipeline_queue.name: pipeline_queue.stats() for pipeline_queue in self.queues}
@@ -0,0 +1,173 @@
+import argparse
+import time
+import cv2
+import numpy as np
+from typing import List, Dict
+
+from backends import BACKENDS, match_frame
+from detector import RoadDamageDetector
+
+def iter_clip_batches(video_path: str, batch_size: int, max_frames: int, stride: int):
+    """
+    Yield batches of frames sampled from a clip.
+    
+    Args:
+        video_path: Path to the video clip
+        batch_size: Number of frames per batch
+        max_frames: Maximum number of frames taken from the clip
+        stride: Take every stride-th frame
+    
+    Yields:
+        Lists of frames
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video file: {video_path}")
+    
+    batch = []
+    taken = 0
+    index = 0
+    try:
+        while taken < max_frames:
+            if not cap.grab():
+                break
+            if index % stride == 0:
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+                batch.append(frame)
+                taken += 1
+                if len(batch) == batch_size:
+                    yield batch
+                    batch = []
+            index += 1
+        if batch:
+            yield batch
+    finally:
+        cap.release()
+
+def timed_detect(detector: RoadDamageDetector, frames: List[np.ndarray]):
+    """Run a detector on frames and return (arrays, elapsed seconds)."""
+    start = time.perf_counter()
+    arrays = detector.detect_arrays(frames)
+    return arrays, time.perf_counter() - start
+
+def build_report(model_path: str, clips: List[str], calibration_dir: str, reference_backend: str = 'onnx',
+                 imgsz: int = 640, conf_threshold: float = 0.5, num_threads: int = 0,
+                 batch_size: int = 8, max_frames: int = 300, stride: int = 1,
+                 iou_threshold: float = 0.5) -> Dict:
+    """
+    Compare the INT8 model against an FP32 reference on the same clips.
+    
+    There are no ground-truth labels for the clips, so recall is measured
+    against the FP32 detections: a reference box counts as recalled when the
+    INT8 model finds a box of the same class overlapping it by at least
+    iou_threshold.
+    
+    Args:
+        model_path: Path to the PyTorch YOLO weights
+        clips: Video clips to evaluate on
+        calibration_dir: Sample frames used to build the INT8 model if it is not cached
+        reference_backend: FP32 backend used as the reference
+        imgsz: Model input size for both models
+        conf_threshold: Confidence threshold for both models
+        num_threads: Runtime thread count for both models
+        batch_size: Frames per model call
+        max_frames: Maximum frames evaluated per clip
+        stride: Take every stride-th frame of each clip
+        iou_threshold: Minimum IoU for a match
+    
+    Returns:
+        Dictionary with per-class recall and throughput of both models
+    """
+    reference = RoadDamageDetector(model_path, conf_threshold, batch_size, reference_backend,
+                                   num_threads, imgsz)
+    quantized = RoadDamageDetector(model_path, conf_threshold, batch_size, 'onnx-int8',
+                                   num_threads, imgsz, calibration_dir)
+    
+    # Warm up both runtimes so one-off graph setup is not timed
+    for clip in clips[:1]:
+        for batch in iter_clip_batches(clip, batch_size, batch_size, stride):
+            reference.detect_arrays(batch)
+            quantized.detect_arrays(batch)
+    
+    num_classes = len(reference.classes)
+    reference_counts = np.zeros(num_classes, dtype=np.int64)
+    recalled_counts = np.zeros(num_classes, dtype=np.int64)
+    extra_counts = np.zeros(num_classes, dtype=np.int64)
+    reference_time = quantized_time = 0.0
+    frames_evaluated = 0
+    
+    for clip in clips:
+        for batch in iter_clip_batches(clip, batch_size, max_frames, stride):
+            reference_arrays, elapsed = timed_detect(reference, batch)
+            reference_time += elapsed
+            quantized_arrays, elapsed = timed_detect(quantized, batch)
+            quantized_time += elapsed
+            frames_evaluated += len(batch)
+            
+            for ref, cand in zip(reference_arrays, quantized_arrays):
+                matches = match_frame(ref, cand, iou_threshold)
+                matched = set()
+                for r, (j, _) in zip(ref, matches):
+                    reference_counts[r['class_id']] += 1
+                    if j is not None:
+                        recalled_counts[r['class_id']] += 1
+                        matched.add(j)
+                for j, c in enumerate(cand):
+                    if j not in matched:
+                        extra_counts[c['class_id']] += 1
+    
+    per_class = {}
+    for class_id, class_name in enumerate(reference.classes):
+        total = int(reference_counts[class_id])
+        per_class[class_name] = {
+            'reference_detections': total,
+            'recall': recalled_counts[class_id] / total if total else None,
+            'extra_detections': int(extra_counts[class_id])
+        }
+    
+    total_reference = int(reference_counts.sum())
+    return {
+        'frames': frames_evaluated,
+        'reference_backend': reference_backend,
+        'reference_fps': frames_evaluated / reference_time if reference_time else 0.0,
+        'int8_fps': frames_evaluated / quantized_time if quantized_time else 0.0,
+        'speedup': reference_time / quantized_time if quantized_time else 0.0,
+        'overall_recall': recalled_counts.sum() / total_reference if total_reference else None,
+        'per_class': per_class
+    }
+
+def print_report(report: Dict) -> None:
+    """Print a report produced by build_report."""
+    print(f"Frames evaluated: {report['frames']}")
+    print(f"FP32 ({report['reference_backend']}): {report['reference_fps']:.2f} FPS")
+    print(f"INT8 (onnx-int8): {report['int8_fps']:.2f} FPS")
+    print(f"Speedup: {report['speedup']:.2f}x")
+    print()
+    print(f"{'Class':<24}{'FP32 boxes':>12}{'INT8 recall':>14}{'INT8 extra':>12}")
+    for class_name, stats in report['per_class'].items():
+        recall = f"{stats['recall']:.3f}" if stats['recall'] is not None else "n/a"
+        print(f"{class_name:<24}{stats['reference_detections']:>12}{recall:>14}{stats['extra_detections']:>12}")
+    overall = report['overall_recall']
+    print(f"{'Overall':<24}{'':>12}{(f'{overall:.3f}' if overall is not None else 'n/a'):>14}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the INT8 model against the FP32 model on video clips")
+    parser.add_argument("model", help="Path to the PyTorch YOLO weights")
+    parser.add_argument("clips", nargs='+', help="Video clips to evaluate on")
+    parser.add_argument("--calibration-dir", help="Sample frames used to build the INT8 model")
+    parser.add_argument("--reference", choices=[b for b in BACKENDS if b != 'onnx-int8'], default='onnx',
+                        help="FP32 backend used as the reference")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--conf", type=float, default=0.5)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--max-frames", type=int, default=300, help="Maximum frames per clip")
+    parser.add_argument("--stride", type=int, default=1, help="Take every n-th frame")
+    args = parser.parse_args()
+    
+    print_report(build_report(
+        args.model, args.clips, args.calibration_dir, args.reference, args.imgsz, args.conf,
+        args.threads, args.batch_size, args.max_frames, args.stride
+    ))
@@ -0,0 +1,119 @@
+import json
+import cv2
+import numpy as np
+from dataclasses import dataclass, field
+from typing import List, Tuple, Optional, Dict
+
+@dataclass
+class RoadROI:
+    """
+    Region of a camera's frame that can contain road surface.
+    
+    Coordinates are fractions of the frame size so one profile works for any
+    resolution of the same camera mounting. Either give a polygon, or a
+    horizon line (everything above is dropped) and a hood line (everything
+    below is dropped).
+    """
+    polygon: Optional[List[Tuple[float, float]]] = None  # (x, y) vertices in [0, 1]
+    horizon: float = 0.0  # top edge of the road area as a fraction of height
+    hood: float = 1.0  # bottom edge of the road area as a fraction of height
+    _cache: Dict[Tuple[int, int], Tuple] = field(default_factory=dict, init=False, repr=False, compare=False)
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'RoadROI':
+        """Create a ROI from a camera profile entry."""
+        polygon = data.get('polygon')
+        return cls(
+            polygon=[tuple(point) for point in polygon] if polygon else None,
+            horizon=data.get('horizon', 0.0),
+            hood=data.get('hood', 1.0)
+        )
+    
+    def _geometry(self, width: int, height: int) -> Tuple[Tuple[int, int, int, int], Optional[np.ndarray], np.ndarray]:
+        """
+        Compute (and cache) the crop rectangle, mask and output buffer for a frame size.
+        
+        Returns:
+            Tuple of ((x, y, w, h) crop rectangle, mask or None, output buffer)
+        """
+        cached = self._cache.get((width, height))
+        if cached is not None:
+            return cached
+        
+        top = int(round(self.horizon * height))
+        bottom = int(round(self.hood * height))
+        if self.polygon:
+            points = np.array([(x * width, y * height) for x, y in self.polygon], dtype=np.float32)
+            points = np.round(points).astype(np.int32)
+            x, y, w, h = cv2.boundingRect(points)
+            
+            # Horizon and hood lines still bound a polygon
+            y0, y1 = max(y, top), min(y + h, bottom)
+            x0, x1 = max(x, 0), min(x + w, width)
+            y0, y1 = max(y0, 0), min(y1, height)
+            rect = (x0, y0, x1 - x0, y1 - y0)
+            
+            mask = np.zeros((rect[3], rect[2]), dtype=np.uint8)
+            cv2.fillPoly(mask, [points - np.array([x0, y0], dtype=np.int32)], 255)
+        else:
+            rect = (0, max(top, 0), width, min(bottom, height) - max(top, 0))
+            mask = None
+        
+        if rect[2] <= 0 or rect[3] <= 0:
+            raise ValueError(f"Road ROI is empty for a {width}x{height} frame")
+        
+        # Masked-out pixels stay black because the buffer is only written through the mask
+        buffer = np.zeros((rect[3], rect[2], 3), dtype=np.uint8) if mask is not None else None
+        self._cache[(width, height)] = (rect, mask, buffer)
+        return rect, mask, buffer
+    
+    def apply(self, frame: np.ndarray) -> Tuple[np.ndarray, Tuple[int, int]]:
+        """
+        Crop a frame to the road area and black out pixels outside the polygon.
+        
+        The result is a view of the frame for horizon/hood ROIs, or a reused
+        buffer for polygons, so it is only valid until the next call.
+        
+        Args:
+            frame: Input frame
+        
+        Returns:
+            Tuple of (road image, (x_offset, y_offset) of the crop in the frame)
+        """
+        height, width = frame.shape[:2]
+        (x, y, w, h), mask, buffer = self._geometry(width, height)
+        crop = frame[y:y+h, x:x+w]
+        
+        if mask is None:
+            return crop, (x, y)
+        
+        cv2.copyTo(crop, mask, buffer)
+        return buffer, (x, y)
+    
+    def polygon_points(self, width: int, height: int) -> np.ndarray:
+        """Pixel outline of the ROI for a frame size, e.g. for drawing it."""
+        if self.polygon:
+            return np.round(np.array([(px * width, py * height) for px, py in self.polygon])).astype(np.int32)
+        (x, y, w, h), _, _ = self._geometry(width, height)
+        return np.array([(x, y), (x + w, y), (x + w, y + h), (x, y + h)], dtype=np.int32)
+
+def load_camera_profiles(path: str) -> Dict[str, RoadROI]:
+    """
+    Load per-camera road ROIs from a JSON file.
+    
+    The file maps profile names to ROI definitions, for example:
+        
+        {
+            "dashcam_front": {"horizon": 0.45, "hood": 0.85},
+            "van_left": {"polygon": [[0.1, 0.5], [0.9, 0.5], [1.0, 0.9], [0.0, 0.9]]}
+        }
+    
+    Args:
+        path: Path to the profiles file
+    
+    Returns:
+        Dictionary mapping profile names to RoadROI objects
+    """
+    with open(path, 'r') as f:
+        data = json.load(f)
+    return {name: RoadROI.from_dict(entry) for name, entry in data.items()}
@@ -0,0 +1,82 @@
+from datetime import datetime
+from typing import Optional
+
+from nmea_parser import GPSData
+
+# Metres per second in one knot
+KNOTS_TO_MPS = 0.514444
+
+class FrameSampler:
+    """
+    Picks frames for detection by distance travelled instead of by time.
+    
+    Distance is integrated from the GPS speed over the time between frames,
+    a frame is selected every metres_per_frame of road, and frames are
+    skipped entirely while the vehicle is stationary.
+    """
+    
+    def __init__(self, metres_per_frame: float = 2.0, min_speed_knots: float = 1.0):
+        """
+        Initialize the frame sampler.
+        
+        Args:
+            metres_per_frame: Road distance between two analysed frames
+            min_speed_knots: Speed below which the vehicle counts as stationary
+        """
+        if metres_per_frame <= 0:
+            raise ValueError(f"metres_per_frame must be positive, got {metres_per_frame}")
+        
+        self.metres_per_frame = metres_per_frame
+        self.min_speed_knots = min_speed_knots
+        self.frames_seen = 0
+        self.frames_selected = 0
+        self.distance_travelled = 0.0
+        self._distance_since_selected = 0.0
+        self._last_timestamp: Optional[datetime] = None
+    
+    def select(self, gps_data: GPSData, timestamp: datetime) -> bool:
+        """
+        Decide whether a frame should be analysed.
+        
+        Must be called for every frame in order, including the ones that end
+        up skipped, so the travelled distance stays correct.
+        
+        Args:
+            gps_data: GPS data point of the frame
+            timestamp: Timestamp of the frame
+        
+        Returns:
+            True if the frame should go to the detector
+        """
+        self.frames_seen += 1
+        elapsed = (timestamp - self._last_timestamp).total_seconds() if self._last_timestamp else 0.0
+        self._last_timestamp = timestamp
+        
+        if gps_data.speed_knots < self.min_speed_knots:
+            return False
+        
+        distance = gps_data.speed_knots * KNOTS_TO_MPS * max(elapsed, 0.0)
+        self.distance_travelled += distance
+        self._distance_since_selected += distance
+        
+        # The first moving frame is always analysed
+        if self.frames_selected and self._distance_since_selected < self.metres_per_frame:
+            return False
+        
+        self._distance_since_selected = 0.0
+        self.frames_selected += 1
+        return True
+    
+    def stats(self) -> dict:
+        """
+        Get sampling statistics.
+        
+        Returns:
+            Dictionary with frame counts, distance travelled and effective metres per analysed frame
+        """
+        return {
+            'frames_seen': self.frames_seen,
+            'frames_selected': self.frames_selected,
+            'distance_travelled': self.distance_travelled,
+            'metres_per_frame': self.distance_travelled / self.frames_selected if self.frames_selected else 0.0
+        }
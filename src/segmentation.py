@@ -0,0 +1,95 @@
+from datetime import datetime
+from typing import List, Sequence
+
+import numpy as np
+
+from database import RoadSegment
+from timeline import GPSTimeline
+
+# Earth's radius in meters, as used by NMEAParser.calculate_distance
+EARTH_RADIUS = 6371000
+
+def haversine(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    """
+    Vectorized Haversine distance between pairs of points.
+    
+    Args:
+        lat1, lon1: Decimal degrees of the first points
+        lat2, lon2: Decimal degrees of the second points
+    
+    Returns:
+        Distances in meters
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(values) for values in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return EARTH_RADIUS * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+def build_road_segments(timeline: GPSTimeline, issue_times: Sequence[datetime], start_time: datetime,
+                        end_time: datetime, segment_length: float = 50.0) -> List[RoadSegment]:
+    """
+    Cut the GPS track between two times into fixed-length road segments.
+    
+    Distance is accumulated from fix to fix over the whole track at once. A
+    segment ends at the first fix where the cumulative distance crosses the
+    next multiple of segment_length, and the incomplete tail is not a
+    segment. Issues count towards the segment whose time range contains them.
+    
+    Args:
+        timeline: GPS track
+        issue_times: Timestamps of the stored issues
+        start_time: Start of the processed part of the track
+        end_time: End of the processed part of the track
+        segment_length: Length of a segment in meters
+    
+    Returns:
+        The road segments in track order
+    """
+    if len(timeline) < 2:
+        return []
+    
+    start, end = timeline.to_seconds([start_time, end_time])
+    indices = np.flatnonzero((timeline.seconds >= start) & (timeline.seconds <= end))
+    if len(indices) < 2:
+        return []
+    
+    latitudes = timeline.latitudes[indices]
+    longitudes = timeline.longitudes[indices]
+    speeds = timeline.speeds[indices]
+    seconds = timeline.seconds[indices]
+    
+    steps = haversine(latitudes[:-1], longitudes[:-1], latitudes[1:], longitudes[1:])
+    cumulative = np.concatenate(([0.0], np.cumsum(steps)))
+    bins = np.floor(cumulative / segment_length).astype(np.int64)
+    boundaries = np.concatenate(([0], np.flatnonzero(np.diff(bins)) + 1))
+    starts, ends = boundaries[:-1], boundaries[1:]
+    if not len(starts):
+        return []
+    
+    # Average of the non-zero speeds of the fixes after the start of each segment
+    moving = speeds > 0
+    speed_sums = np.concatenate(([0.0], np.cumsum(np.where(moving, speeds, 0.0))))
+    moving_counts = np.concatenate(([0], np.cumsum(moving)))
+    sums = speed_sums[ends + 1] - speed_sums[starts + 1]
+    counts = moving_counts[ends + 1] - moving_counts[starts + 1]
+    average_speeds = np.divide(sums, counts, out=np.zeros(len(starts)), where=counts > 0)
+    
+    issue_seconds = np.sort(timeline.to_seconds(issue_times)) if len(issue_times) else np.zeros(0)
+    issue_counts = np.searchsorted(issue_seconds, seconds[ends]) - np.searchsorted(issue_seconds, seconds[starts])
+    distances = cumulative[ends] - cumulative[starts]
+    
+    segments = []
+    for i, (first, last) in enumerate(zip(starts, ends)):
+        start_fix = timeline.fixes[indices[first]]
+        end_fix = timeline.fixes[indices[last]]
+        segments.append(RoadSegment(
+            start_latitude=start_fix.latitude_decimal,
+            start_longitude=start_fix.longitude_decimal,
+            end_latitude=end_fix.latitude_decimal,
+            end_longitude=end_fix.longitude_decimal,
+            start_time=start_fix.timestamp,
+            end_time=end_fix.timestamp,
+            issue_count=int(issue_counts[i]),
+            average_speed=float(average_speeds[i]),
+            distance=float(distances[i])
+        ))
+    return segments
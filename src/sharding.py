@@ -0,0 +1,204 @@
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+import cv2
+import numpy as np
+
+from detector import CLASS_NAMES, RoadDamageDetector
+from model_server import create_detector
+
+# Detector options of the current worker process, set by the pool initializer
+_worker_options = None
+
+# Detector of the current worker process, loaded by its first shard
+_worker_detector = None
+
+# Error of loading the detector, raised again by later shards of the worker
+_worker_error = None
+
+@dataclass
+class ShardResult:
+    """What a worker produced for one shard, as returned by detect_shard."""
+    detections: Dict[int, np.ndarray]  # DETECTION_DTYPE records per decoded frame number
+    timings: Dict[int, Dict[str, float]]  # decode and inference seconds per decoded frame number
+    frames_screened: int = 0  # cascade screening counts of the shard
+    frames_escalated: int = 0
+
+class ShardedDetector:
+    """
+    Stands in for the detector of the processing process in sharded mode.
+    
+    The workers load and run the model, so the process merging their results
+    only needs the class names, conversion to Detection objects and drawing.
+    Cascade counts of the shards are added up here.
+    """
+    
+    to_detections = RoadDamageDetector.to_detections
+    draw_detections = RoadDamageDetector.draw_detections
+    cascade_stats = RoadDamageDetector.cascade_stats
+    
+    def __init__(self, batch_size: int = 8, cascade_imgsz: int = 0):
+        """
+        Initialize the stand-in.
+        
+        Args:
+            batch_size: Number of frames the workers accumulate per detector call
+            cascade_imgsz: Screening input size of the workers, 0 without cascade
+        """
+        self.classes = list(CLASS_NAMES)
+        self.batch_size = batch_size
+        self.cascade_imgsz = cascade_imgsz
+        self.tile_size = 0
+        self.roi = None
+        self.frames_screened = 0
+        self.frames_escalated = 0
+        
+    def add_shard(self, result: ShardResult):
+        """Count the cascade statistics of a shard."""
+        self.frames_screened += result.frames_screened
+        self.frames_escalated += result.frames_escalated
+        
+    def detect_arrays(self, frames: Sequence[np.ndarray]) -> List[np.ndarray]:
+        """Detection only runs on the worker processes in sharded mode."""
+        raise RuntimeError("Frames are detected by the worker processes in sharded mode")
+        
+    def close(self):
+        """Nothing to release, the workers own their models."""
+
+def _init_worker(model_server: Optional[str], detector_options: Dict):
+    """
+    Remember the detector options of a worker process.
+    
+    The model is loaded by the first shard rather than here, so a failure to
+    load it is raised by that shard in the caller instead of killing the worker.
+    """
+    global _worker_options
+    _worker_options = (model_server, detector_options)
+
+def _get_worker_detector():
+    """Get the detector of the worker process, loading it on first use."""
+    global _worker_detector, _worker_error
+    if _worker_error is not None:
+        raise _worker_error
+    if _worker_detector is None:
+        model_server, detector_options = _worker_options
+        try:
+            _worker_detector = create_detector(model_server, **detector_options)
+        except Exception as e:
+            _worker_error = e
+            raise
+    return _worker_detector
+
+def detect_shard(video_path: str, frame_numbers: List[int]) -> ShardResult:
+    """
+    Decode and detect one shard of a video in a worker process.
+    
+    The capture seeks to the first frame of the shard, then grabs its way
+    forward and only decodes the frames of the shard.
+    
+    Args:
+        video_path: Path to the video file
+        frame_numbers: Sorted frame numbers of the shard
+    
+    Returns:
+        Detections and decode and inference seconds of the decoded frames,
+        with the cascade screening counts of the shard
+    """
+    detector = _get_worker_detector()
+    screened = getattr(detector, 'frames_screened', 0)
+    escalated = getattr(detector, 'frames_escalated', 0)
+    
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video file: {video_path}")
+    
+    detections = {}
+    timings = {}
+    batch, batch_numbers = [], []
+    
+    def flush():
+        start = time.perf_counter()
+        arrays = detector.detect_arrays(batch)
+        inference_seconds = (time.perf_counter() - start) / len(batch)
+        for frame_number, array in zip(batch_numbers, arrays):
+            detections[frame_number] = array
+            timings[frame_number]['inference'] = inference_seconds
+        batch.clear()
+        batch_numbers.clear()
+    
+    try:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_numbers[0])
+        position = frame_numbers[0]
+        for frame_number in frame_numbers:
+            start = time.perf_counter()
+            while position < frame_number and cap.grab():
+                position += 1
+            if position < frame_number:
+                break
+            
+            ret, frame = cap.read()
+            if not ret:
+                break
+            position += 1
+            timings[frame_number] = {'decode': time.perf_counter() - start}
+            
+            batch.append(frame)
+            batch_numbers.append(frame_number)
+            if len(batch) == detector.batch_size:
+                flush()
+        if batch:
+            flush()
+    finally:
+        cap.release()
+    
+    return ShardResult(detections, timings, getattr(detector, 'frames_screened', 0) - screened,
+                       getattr(detector, 'frames_escalated', 0) - escalated)
+
+def iter_shard_detections(video_path: str, shards: Iterable[List[int]], workers: int,
+                          model_server: Optional[str], detector_options: Dict,
+                          max_pending: int = 0) -> Iterator[ShardResult]:
+    """
+    Detect shards of a video on a pool of worker processes, each with its own detector.
+    
+    Shards are taken from the iterable as results are consumed, so the caller
+    can plan them lazily; at most max_pending shards are in flight at a time.
+    Errors of a shard, including a model that fails to load, are raised here;
+    a worker that dies raises BrokenProcessPool instead of stalling the pool.
+    
+    Args:
+        video_path: Path to the video file
+        shards: Sorted, non-empty lists of frame numbers, in order
+        workers: Number of worker processes
+        model_server: Address of a model server the workers share, None loads a model per worker
+        detector_options: RoadDamageDetector arguments for the workers
+        max_pending: Shards submitted ahead of the one being yielded, 0 uses twice the workers
+    
+    Yields:
+        Result of each shard as returned by detect_shard, in shard order
+    """
+    max_pending = max_pending or 2 * workers
+    shards = iter(shards)
+    shard = next(shards, None)
+    if shard is None:
+        return
+    
+    # Spawned workers do not inherit threads or open handles of the caller, e.g. the GUI.
+    # Worker processes are started as shards arrive, so short videos start fewer.
+    context = multiprocessing.get_context('spawn')
+    pool = ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                               initargs=(model_server, detector_options))
+    pending = deque()
+    try:
+        while shard is not None:
+            pending.append(pool.submit(detect_shard, video_path, shard))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+            shard = next(shards, None)
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,133 @@
+from dataclasses import replace
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from nmea_parser import GPSData
+
+def _decimal_to_ddmm(value: float, positive: str, negative: str, degree_digits: int) -> str:
+    """Format decimal degrees as an NMEA DDMM.MMMM / DDDMM.MMMM string with hemisphere."""
+    hemisphere = positive if value >= 0 else negative
+    value = abs(value)
+    degrees = int(value)
+    minutes = (value - degrees) * 60
+    return f"{degrees:0{degree_digits}d}{minutes:07.4f}{hemisphere}"
+
+class GPSTimeline:
+    """
+    Time-indexed GPS track for resolving the position of video frames.
+    
+    Fix timestamps are converted once into a sorted NumPy array of seconds, so
+    a lookup is a binary search instead of a scan over all fixes, and whole
+    batches of timestamps resolve in one vectorized call. With interpolate
+    enabled, positions, speed, course and altitude are linearly interpolated
+    between the two fixes around a timestamp instead of snapping to the
+    closest 1 Hz fix.
+    """
+    
+    def __init__(self, gps_data: Sequence[GPSData], interpolate: bool = False):
+        """
+        Initialize the timeline.
+        
+        Args:
+            gps_data: GPS fixes, in any order
+            interpolate: Interpolate between fixes instead of returning the closest one
+        """
+        self.interpolate = interpolate
+        self.origin: Optional[datetime] = min(fix.timestamp for fix in gps_data) if gps_data else None
+        
+        seconds = np.array([(fix.timestamp - self.origin).total_seconds() for fix in gps_data], dtype=np.float64)
+        # A stable sort keeps the first of several fixes with the same timestamp in front
+        order = np.argsort(seconds, kind='stable')
+        self.fixes: List[GPSData] = [gps_data[i] for i in order]
+        self.seconds = seconds[order]
+        self.latitudes = np.array([fix.latitude_decimal for fix in self.fixes], dtype=np.float64)
+        self.longitudes = np.array([fix.longitude_decimal for fix in self.fixes], dtype=np.float64)
+        self.speeds = np.array([fix.speed_knots for fix in self.fixes], dtype=np.float64)
+        self.courses = np.array([fix.course_degrees for fix in self.fixes], dtype=np.float64)
+        self.altitudes = np.array([fix.altitude for fix in self.fixes], dtype=np.float64)
+    
+    def __len__(self) -> int:
+        """Number of fixes in the timeline."""
+        return len(self.fixes)
+    
+    def to_seconds(self, timestamps: Sequence[datetime]) -> np.ndarray:
+        """Convert timestamps to seconds since the first fix."""
+        return np.array([(timestamp - self.origin).total_seconds() for timestamp in timestamps], dtype=np.float64)
+    
+    def closest_indices(self, seconds: np.ndarray) -> np.ndarray:
+        """
+        Find the closest fix for each time.
+        
+        Args:
+            seconds: Times in seconds since the first fix
+        
+        Returns:
+            Index into fixes for every time; on a tie the earlier fix wins
+        """
+        right = np.clip(np.searchsorted(self.seconds, seconds), 0, len(self.seconds) - 1)
+        left = np.clip(right - 1, 0, len(self.seconds) - 1)
+        use_right = np.abs(self.seconds[right] - seconds) < np.abs(seconds - self.seconds[left])
+        return np.where(use_right, right, left)
+    
+    def lookup(self, timestamp: datetime) -> Optional[GPSData]:
+        """
+        Get the GPS data of a single timestamp.
+        
+        Args:
+            timestamp: The timestamp to resolve
+        
+        Returns:
+            The closest or interpolated GPS data, None if the timeline is empty
+        """
+        if not self.fixes:
+            return None
+        return self.lookup_seconds(self.to_seconds([timestamp]))[0]
+    
+    def lookup_seconds(self, seconds: np.ndarray) -> List[GPSData]:
+        """
+        Get the GPS data of a batch of times in one vectorized pass.
+        
+        Args:
+            seconds: Times in seconds since the first fix, the timeline must not be empty
+        
+        Returns:
+            One closest or interpolated GPS data point per time
+        """
+        seconds = np.asarray(seconds, dtype=np.float64)
+        closest = self.closest_indices(seconds)
+        if not self.interpolate or len(self.fixes) < 2:
+            return [self.fixes[i] for i in closest]
+        
+        # Times outside the track are clamped to its first or last fix
+        right = np.clip(np.searchsorted(self.seconds, seconds, side='right'), 1, len(self.seconds) - 1)
+        left = right - 1
+        span = self.seconds[right] - self.seconds[left]
+        fraction = np.clip((seconds - self.seconds[left]) / np.where(span > 0, span, 1.0), 0.0, 1.0)
+        fraction = np.where(span > 0, fraction, 0.0)
+        
+        latitudes = self.latitudes[left] + (self.latitudes[right] - self.latitudes[left]) * fraction
+        longitudes = self.longitudes[left] + (self.longitudes[right] - self.longitudes[left]) * fraction
+        speeds = self.speeds[left] + (self.speeds[right] - self.speeds[left]) * fraction
+        altitudes = self.altitudes[left] + (self.altitudes[right] - self.altitudes[left]) * fraction
+        # Courses turn the short way round, e.g. 350 -> 10 degrees passes through 0
+        turn = (self.courses[right] - self.courses[left] + 180.0) % 360.0 - 180.0
+        courses = (self.courses[left] + turn * fraction) % 360.0
+        times = self.seconds[left] + span * fraction
+        
+        points = []
+        for i, index in enumerate(closest):
+            # Fix quality, satellites and HDOP are taken from the closest fix
+            points.append(replace(
+                self.fixes[index],
+                timestamp=self.origin + timedelta(seconds=float(times[i])),
+                latitude_ddmm=_decimal_to_ddmm(latitudes[i], 'N', 'S', 2),
+                longitude_ddmm=_decimal_to_ddmm(longitudes[i], 'E', 'W', 3),
+                latitude_decimal=float(latitudes[i]),
+                longitude_decimal=float(longitudes[i]),
+                speed_knots=float(speeds[i]),
+                course_degrees=float(courses[i]),
+                altitude=float(altitudes[i])
+            ))
+        return points
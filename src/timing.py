@@ -0,0 +1,159 @@
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+# Processing stages in pipeline order, summaries list them in this order
+STAGES = ('decode', 'gps_lookup', 'inference', 'annotate', 'image_write', 'geocode', 'db_insert')
+
+# Histogram bucket edges in seconds, 20 log-spaced buckets per decade from 1 us to 1000 s
+BUCKET_EDGES = np.logspace(-6, 3, 9 * 20 + 1)
+
+class StageStats:
+    """
+    Running histogram of the durations of one stage.
+    
+    Durations are counted in log-spaced buckets, so memory is constant
+    however long a run is and percentiles are accurate to the bucket width
+    of about 12%. Histograms of the same stage can be merged, e.g. across
+    worker processes.
+    """
+    
+    def __init__(self):
+        self.counts = np.zeros(len(BUCKET_EDGES) + 1, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+    
+    def add(self, seconds: float):
+        """Count one duration."""
+        self.counts[np.searchsorted(BUCKET_EDGES, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+    
+    def merge(self, other: 'StageStats'):
+        """Add the durations counted by another histogram."""
+        self.counts += other.counts
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+    
+    def percentile(self, q: float) -> float:
+        """
+        Estimate a percentile from the histogram.
+        
+        Args:
+            q: Percentile between 0 and 100
+        
+        Returns:
+            Geometric centre of the bucket holding the percentile in seconds,
+            clamped to the observed range, 0 without durations
+        """
+        if not self.count:
+            return 0.0
+        index = int(np.searchsorted(np.cumsum(self.counts), q / 100 * self.count))
+        lower = BUCKET_EDGES[index - 1] if index > 0 else self.min
+        upper = BUCKET_EDGES[index] if index < len(BUCKET_EDGES) else self.max
+        return float(min(max(np.sqrt(lower * upper), self.min), self.max))
+    
+    def summary(self) -> Dict[str, float]:
+        """
+        Get the statistics of the stage.
+        
+        Returns:
+            Dictionary with the count, total and mean, the p50, p90 and p99
+            estimates and the maximum; durations in seconds
+        """
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self.max
+        }
+
+class StageTimer:
+    """
+    Collects durations per stage from any thread.
+    
+    Stages that run per frame are recorded once per frame, e.g. decode or
+    geocode; image_write per image and db_insert per transaction, as those
+    happen in the background and in batches.
+    """
+    
+    def __init__(self):
+        self.stats: Dict[str, StageStats] = {}
+        self.lock = threading.Lock()
+    
+    def add(self, stage: str, seconds: float):
+        """Record one duration of a stage."""
+        with self.lock:
+            stats = self.stats.get(stage)
+            if stats is None:
+                stats = self.stats[stage] = StageStats()
+            stats.add(seconds)
+    
+    def add_timings(self, timings: Dict[str, float]):
+        """Record the per-stage durations of one frame."""
+        for stage, seconds in timings.items():
+            self.add(stage, seconds)
+    
+    def merge(self, other: 'StageTimer'):
+        """Add the durations collected by another timer, e.g. of a worker process."""
+        with other.lock:
+            others = list(other.stats.items())
+        with self.lock:
+            for stage, stats in others:
+                if stage not in self.stats:
+                    self.stats[stage] = StageStats()
+                self.stats[stage].merge(stats)
+    
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Get the statistics of every stage with recorded durations.
+        
+        Returns:
+            Dictionary mapping stage names to StageStats.summary() dictionaries,
+            known stages first in pipeline order
+        """
+        with self.lock:
+            return {stage: self.stats[stage].summary() for stage in _ordered(self.stats)}
+    
+    def __getstate__(self) -> Dict:
+        """Pickle without the lock, timers are returned from worker processes."""
+        return {'stats': self.stats}
+    
+    def __setstate__(self, state: Dict):
+        self.stats = state['stats']
+        self.lock = threading.Lock()
+
+def _ordered(stages: Iterable[str]) -> List[str]:
+    """Stage names with the known stages first, in pipeline order."""
+    stages = list(stages)
+    return [stage for stage in STAGES if stage in stages] + sorted(stage for stage in stages if stage not in STAGES)
+
+def format_summary(summary: Dict[str, Dict[str, float]], title: Optional[str] = None) -> str:
+    """
+    Format a StageTimer.summary() as a table.
+    
+    Args:
+        summary: Statistics per stage
+        title: Line printed above the table
+    
+    Returns:
+        The table, one line per stage with durations in milliseconds
+    """
+    lines = [title] if title else []
+    lines.append(f"{'Stage':<14}{'Count':>8}{'Mean ms':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}"
+                 f"{'Max ms':>10}{'Total s':>10}")
+    for stage, stats in summary.items():
+        lines.append(f"{stage:<14}{stats['count']:>8}{stats['mean'] * 1000:>10.2f}{stats['p50'] * 1000:>10.2f}"
+                     f"{stats['p90'] * 1000:>10.2f}{stats['p99'] * 1000:>10.2f}{stats['max'] * 1000:>10.2f}"
+                     f"{stats['total']:>10.2f}")
+    return "\n".join(lines)
@@ -0,0 +1,252 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from detector import DETECTION_DTYPE
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """
+    Intersection over union of every pair of boxes.
+    
+    Args:
+        boxes_a: Array of shape (n, 4) with x1, y1, x2, y2
+        boxes_b: Array of shape (m, 4) with x1, y1, x2, y2
+    
+    Returns:
+        Array of shape (n, m)
+    """
+    x1 = np.maximum(boxes_a[:, None, 0], boxes_b[None, :, 0])
+    y1 = np.maximum(boxes_a[:, None, 1], boxes_b[None, :, 1])
+    x2 = np.minimum(boxes_a[:, None, 2], boxes_b[None, :, 2])
+    y2 = np.minimum(boxes_a[:, None, 3], boxes_b[None, :, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+class BoxKalmanFilter:
+    """
+    Constant-velocity Kalman filter over a bounding box, as in SORT.
+    
+    The state is the box centre, area and aspect ratio plus the velocities
+    of the centre and area. Time is measured in frames, so frames skipped by
+    sampling are bridged by a single longer prediction step.
+    """
+    
+    def __init__(self, box: np.ndarray):
+        """
+        Initialize the filter at a box.
+        
+        Args:
+            box: x1, y1, x2, y2
+        """
+        self.x = np.zeros(7)
+        self.x[:4] = self._to_measurement(box)
+        self.P = np.diag([10.0, 10.0, 10.0, 10.0, 1e4, 1e4, 1e4])
+        self.Q = np.diag([1.0, 1.0, 1.0, 1.0, 0.01, 0.01, 1e-4])
+        self.R = np.diag([1.0, 1.0, 10.0, 10.0])
+        self.H = np.eye(4, 7)
+    
+    @staticmethod
+    def _to_measurement(box: np.ndarray) -> np.ndarray:
+        """Convert x1, y1, x2, y2 to centre, area and aspect ratio."""
+        width = max(float(box[2] - box[0]), 1.0)
+        height = max(float(box[3] - box[1]), 1.0)
+        return np.array([box[0] + width / 2, box[1] + height / 2, width * height, width / height])
+    
+    def predict(self, steps: int = 1) -> np.ndarray:
+        """
+        Advance the state by a number of frames.
+        
+        Args:
+            steps: Frames since the last prediction
+        
+        Returns:
+            Predicted box as x1, y1, x2, y2
+        """
+        F = np.eye(7)
+        F[0, 4] = F[1, 5] = F[2, 6] = steps
+        # A shrinking box must not reach zero area
+        if self.x[2] + self.x[6] * steps <= 0:
+            self.x[6] = 0.0
+        self.x = F @ self.x
+        self.P = F @ self.P @ F.T + self.Q * steps
+        return self.box()
+    
+    def update(self, box: np.ndarray):
+        """Correct the state with a detected box."""
+        residual = self._to_measurement(box) - self.H @ self.x
+        S = self.H @ self.P @ self.H.T + self.R
+        K = self.P @ self.H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ residual
+        self.P = (np.eye(7) - K @ self.H) @ self.P
+    
+    def box(self) -> np.ndarray:
+        """Current box as x1, y1, x2, y2."""
+        area = max(self.x[2], 1.0)
+        aspect = max(self.x[3], 1e-3)
+        width = np.sqrt(area * aspect)
+        height = area / width
+        return np.array([self.x[0] - width / 2, self.x[1] - height / 2, self.x[0] + width / 2, self.x[1] + height / 2])
+
+class Track:
+    """A road defect followed across frames, with the frame it was seen best on."""
+    
+    def __init__(self, track_id: int, frame_number: int, detection: np.void):
+        """
+        Start a track at a detection.
+        
+        Args:
+            track_id: Unique track ID
+            frame_number: Frame of the detection
+            detection: DETECTION_DTYPE record
+        """
+        self.track_id = track_id
+        self.class_id = int(detection['class_id'])
+        self.filter = BoxKalmanFilter(_box(detection))
+        self.hits = 1
+        self.first_frame = self.last_frame = self.predicted_frame = frame_number
+        self.best_frame = frame_number
+        self.best_detection = np.array(detection, dtype=DETECTION_DTYPE)
+    
+    def predict(self, frame_number: int) -> np.ndarray:
+        """Predicted box of the track in a later frame."""
+        steps = frame_number - self.predicted_frame
+        self.predicted_frame = frame_number
+        return self.filter.predict(steps) if steps > 0 else self.filter.box()
+    
+    def update(self, frame_number: int, detection: np.void):
+        """Add a matched detection, keeping it if it is the most confident so far."""
+        self.filter.update(_box(detection))
+        self.hits += 1
+        self.last_frame = frame_number
+        if detection['confidence'] > self.best_detection['confidence']:
+            self.best_frame = frame_number
+            self.best_detection = np.array(detection, dtype=DETECTION_DTYPE)
+    
+    def to_dict(self) -> Dict:
+        """Serializable state of the track."""
+        return {
+            'track_id': self.track_id,
+            'class_id': self.class_id,
+            'x': self.filter.x.tolist(),
+            'P': self.filter.P.tolist(),
+            'hits': self.hits,
+            'first_frame': self.first_frame,
+            'last_frame': self.last_frame,
+            'predicted_frame': self.predicted_frame,
+            'best_frame': self.best_frame,
+            'best_detection': self.best_detection.tolist()
+        }
+    
+    @classmethod
+    def from_dict(cls, state: Dict) -> 'Track':
+        """Restore a track saved with to_dict."""
+        detection = np.array(tuple(state['best_detection']), dtype=DETECTION_DTYPE)
+        track = cls(state['track_id'], state['best_frame'], detection)
+        track.filter.x = np.array(state['x'])
+        track.filter.P = np.array(state['P'])
+        track.hits = state['hits']
+        track.first_frame = state['first_frame']
+        track.last_frame = state['last_frame']
+        track.predicted_frame = state['predicted_frame']
+        return track
+
+def _box(detection: np.void) -> np.ndarray:
+    """Box of a DETECTION_DTYPE record as a float array."""
+    return np.array([detection['x1'], detection['y1'], detection['x2'], detection['y2']], dtype=np.float64)
+
+class IoUTracker:
+    """
+    Lightweight SORT-style multi-object tracker for road defects.
+    
+    Each frame, tracks are advanced by their Kalman filter and matched to
+    detections of the same class greedily by descending IoU. Unmatched
+    detections start new tracks. A track ends once it has not been matched
+    for max_age frames, and is then reported once with its most confident
+    detection, so a defect visible over many frames yields a single issue
+    while two defects of the same class close together stay separate.
+    """
+    
+    def __init__(self, iou_threshold: float = 0.3, max_age: int = 30, min_hits: int = 1):
+        """
+        Initialize the tracker.
+        
+        Args:
+            iou_threshold: Minimum IoU between a prediction and a detection to match them
+            max_age: Frames a track survives without a match
+            min_hits: Matched detections a track needs to be reported
+        """
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.tracks: List[Track] = []
+        self.next_id = 1
+    
+    def update(self, frame_number: int, detections: Optional[np.ndarray]) -> List[Track]:
+        """
+        Add the detections of a frame.
+        
+        Must be called in frame order for every analysed frame, including the
+        ones without detections.
+        
+        Args:
+            frame_number: Number of the frame
+            detections: Array of DETECTION_DTYPE records, None for no detections
+        
+        Returns:
+            Tracks that ended before this frame
+        """
+        finished = self._expire(frame_number)
+        if detections is None or not len(detections):
+            return finished
+        
+        for class_id in np.unique(detections['class_id']).tolist():
+            class_detections = detections[detections['class_id'] == class_id]
+            tracks = [track for track in self.tracks if track.class_id == class_id]
+            matched = set()
+            if tracks:
+                predicted = np.array([track.predict(frame_number) for track in tracks])
+                boxes = np.stack([_box(detection) for detection in class_detections])
+                ious = iou_matrix(predicted, boxes)
+                used_tracks = set()
+                # Greedy assignment, best overlaps first
+                for flat in np.argsort(-ious, axis=None, kind='stable'):
+                    track_index, detection_index = np.unravel_index(flat, ious.shape)
+                    if ious[track_index, detection_index] < self.iou_threshold:
+                        break
+                    if track_index in used_tracks or detection_index in matched:
+                        continue
+                    tracks[track_index].update(frame_number, class_detections[detection_index])
+                    used_tracks.add(track_index)
+                    matched.add(detection_index)
+            
+            for index, detection in enumerate(class_detections):
+                if index not in matched:
+                    self.tracks.append(Track(self.next_id, frame_number, detection))
+                    self.next_id += 1
+        
+        return finished
+    
+    def _expire(self, frame_number: int) -> List[Track]:
+        """Remove tracks that were not matched for more than max_age frames."""
+        expired = [track for track in self.tracks if frame_number - track.last_frame > self.max_age]
+        if expired:
+            self.tracks = [track for track in self.tracks if frame_number - track.last_frame <= self.max_age]
+        return [track for track in expired if track.hits >= self.min_hits]
+    
+    def finish(self) -> List[Track]:
+        """End all tracks, e.g. at the end of the video."""
+        finished = [track for track in self.tracks if track.hits >= self.min_hits]
+        self.tracks = []
+        return finished
+    
+    def state_dict(self) -> Dict:
+        """Serializable state of the tracker, for checkpoints."""
+        return {'next_id': self.next_id, 'tracks': [track.to_dict() for track in self.tracks]}
+    
+    def load_state(self, state: Dict):
+        """Restore a state saved with state_dict."""
+        self.next_id = state['next_id']
+        self.tracks = [Track.from_dict(track) for track in state['tracks']]
@@ -1,16 +1,81 @@
 import cv2
 import numpy as np
+from collections import deque
 from datetime import datetime, timedelta
-from typing import Optional, Tuple, List
+from dataclasses import dataclass, field
+from typing import Optional, Tuple, List, Sequence, Dict, Iterator, Callable
 from pathlib import Path
 from nmea_parser import NMEAParser, GPSData
-from detector import RoadDamageDetector, Detection
-from database import Database, RoadIssue, RoadSegment
+from detector import Detection
+from database import Database, RoadIssue, RoadSegment, BufferedIssueWriter
 from geocoder import Geocoder
+from roi import RoadROI
+from model_server import create_detector
+from sharding import ShardedDetector, iter_shard_detections
+from sampling import FrameSampler
+from pipeline import Pipeline
+from timeline import GPSTimeline
+from segmentation import build_road_segments
+from image_sink import ImageSink
+from evidence import EVIDENCE_MODES, crop_name, context_name, crop_detection, context_image
+from tracker import IoUTracker, Track
+from timing import StageTimer, format_summary
 import os
+import json
+import time
+
+# Upper bound on frames (decoded or skipped) gathered into one batch, so progress
+# keeps updating while long stretches are skipped
+MAX_RECORDS_PER_BATCH = 512
+
+# Shards handed to each worker process in sharded mode
+SHARDS_PER_WORKER = 4
+
+# Upper bound on the frames analysed per shard, so long videos are split into
+# shards as they are planned instead of being planned in one piece
+MAX_SHARD_FRAMES = 256
+
+# Frames whose timestamps and GPS data are resolved in one vectorized lookup
+PLAN_WINDOW_FRAMES = 1024
+
+# Ways to keep one road defect from being stored once per frame it is visible in
+DEDUPLICATION_MODES = ('cooldown', 'tracker')
+
+@dataclass
+class FrameRecord:
+    """A frame position in the video and what acquisition resolved for it."""
+    frame_number: int
+    frame: Optional[np.ndarray] = None  # only decoded for frames selected for detection
+    timestamp: Optional[datetime] = None
+    gps_data: Optional[GPSData] = None
+    timings: Dict[str, float] = field(default_factory=dict)  # seconds spent on the frame per stage
+
+@dataclass
+class FrameResult:
+    """What processing produced for one frame, as yielded by VideoProcessor.iter_results."""
+    frame_number: int
+    frame: Optional[np.ndarray]  # annotated when it has issues, None for frames never decoded
+    gps_data: Optional[GPSData]
+    issues: List[RoadIssue]  # queued while handling the frame, IDs are set once written
+    progress: float  # percent of the video processed
+    timings: Dict[str, float]  # seconds spent on the frame per step and per stage
+    final: bool = False  # the last result only carries issues stored when processing finished
 
 class VideoProcessor:
-    def __init__(self, video_path: str, nmea_path: str, model_path: str, db_path: str = "road_issues.db", conf_threshold: float = 0.5):
+    def __init__(self, video_path: str, nmea_path: str, model_path: str, db_path: str = "road_issues.db",
+                 conf_threshold: float = 0.5, batch_size: int = 8, backend: str = 'pytorch',
+                 num_threads: int = 0, roi: Optional[RoadROI] = None, cascade_imgsz: int = 0,
+                 tile_size: int = 0, tile_overlap: float = 0.2, model_server: Optional[str] = None,
+                 sample_distance: float = 0.0, frame_stride: int = 1,
+                 frame_schedule: Optional[Sequence[int]] = None, pipelined: bool = False,
+                 queue_size: int = 4, workers: int = 0, image_prefix: str = "",
+                 checkpoint_path: Optional[str] = None, checkpoint_interval: float = 60.0,
+                 resume: bool = False, gps_interpolation: bool = False, flush_rows: int = 100,
+                 flush_interval: float = 2.0, image_format: str = 'jpg', image_quality: int = 95,
+                 image_workers: int = 2, evidence_mode: str = 'frame', deduplication: str = 'cooldown',
+                 track_iou: float = 0.3, track_max_age: float = 1.0, track_min_hits: int = 1,
+                 stats_callback: Optional[Callable[[Dict[str, Dict[str, float]]], None]] = None,
+                 stats_interval: float = 5.0):
         """
         Initialize the video processor with video and NMEA data.
         
@@ -20,15 +85,55 @@ class VideoProcessor:
             model_path: Path to the YOLO model
             db_path: Path to the SQLite database file
             conf_threshold: Confidence threshold for detections
+            batch_size: Number of frames accumulated per detector call
+            backend: Inference runtime, one of 'pytorch', 'onnx', 'openvino' or 'onnx-int8'
+            num_threads: CPU threads used by the inference runtime, 0 for the default
+            roi: Road region of the camera, frames are cropped to it before detection
+            cascade_imgsz: Input size of a low-resolution screening pass, 0 runs every frame at full resolution
+            tile_size: Side of square tiles for high-resolution cameras, 0 runs whole frames
+            tile_overlap: Fraction of a tile shared with its neighbour
+            model_server: Address ('host:port' or socket path) of a shared model server to use
+                instead of loading the model in this process; detector options are then set on the server
+            sample_distance: Metres of road between analysed frames, 0 analyses every frame
+            frame_stride: Only every frame_stride-th frame can be analysed, the others are never decoded
+            frame_schedule: Explicit frame numbers to analyse instead of a stride, reading stops after the last
+            pipelined: Run decoding and inference on their own threads, overlapping them with saving
+            queue_size: Batches buffered between pipeline stages
+            workers: Number of processes that decode and detect shards of the video, 0 or 1 runs in this process
+            image_prefix: Prefix of saved image names, keeps names unique when several videos share one output directory
+            checkpoint_path: JSON file the processing state is saved to, None disables checkpoints
+            checkpoint_interval: Seconds between checkpoints
+            resume: Continue from the checkpoint at checkpoint_path if it exists
+            gps_interpolation: Interpolate position and speed between GPS fixes instead of using the closest fix
+            flush_rows: Pending database rows that trigger a write
+            flush_interval: Longest time in seconds a row waits before it is written
+            image_format: Format of the saved images, 'jpg', 'webp' or 'png'
+            image_quality: JPEG/WebP quality, or PNG compression level
+            image_workers: Number of threads encoding and writing images
+            evidence_mode: 'frame' saves the annotated frame, 'compact' saves a full-resolution
+                crop per detection plus a downscaled context frame, annotated when served
+            deduplication: 'cooldown' drops detections of a class for 3 seconds after one was stored,
+                'tracker' follows each defect across frames and stores it once on its most confident frame
+            track_iou: Minimum IoU to continue a track
+            track_max_age: Seconds a track survives without a matching detection
+            track_min_hits: Detections a track needs to be stored
+            stats_callback: Called with timer.summary() every stats_interval seconds and when
+                processing finishes, on the thread iterating the results
+            stats_interval: Seconds between stats_callback calls
         """
+        if frame_stride < 1:
+            raise ValueError(f"frame_stride must be at least 1, got {frame_stride}")
+        if evidence_mode not in EVIDENCE_MODES:
+            raise ValueError(f"Unknown evidence mode: {evidence_mode}, expected one of {EVIDENCE_MODES}")
+        if deduplication not in DEDUPLICATION_MODES:
+            raise ValueError(f"Unknown deduplication: {deduplication}, expected one of {DEDUPLICATION_MODES}")
+            
         self.video_path = video_path
         self.nmea_path = nmea_path
         
         # Initialize video capture
-        self.cap = cv2.VideoCapture(video_path)
-        if not self.cap.isOpened():
-            raise ValueError(f"Could not open video file: {video_path}")
-            
+        self.cap = self._open_capture(video_path)
+        
         # Get video properties
         self.fps = self.cap.get(cv2.CAP_PROP_FPS)
         self.frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
@@ -36,38 +141,102 @@ class VideoProcessor:
         self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         
         # Parse NMEA data
-        self.nmea_parser = NMEAParser()
-        self.gps_data = self.nmea_parser.parse_file(nmea_path)
+        self.gps_data = self._load_gps_data(nmea_path)
+        self.timeline = GPSTimeline(self.gps_data, gps_interpolation)
         
-        # Initialize detector
-        self.detector = RoadDamageDetector(model_path, conf_threshold)
+        # Initialize detector, in-process or through a shared model server
+        self.model_server = model_server
+        self.detector_options = dict(
+            model_path=model_path, conf_threshold=conf_threshold, batch_size=batch_size, backend=backend,
+            num_threads=num_threads, roi=roi, cascade_imgsz=cascade_imgsz, tile_size=tile_size,
+            tile_overlap=tile_overlap
+        )
+        if workers > 1:
+            # The worker processes run the model, a server keeps its cascade counts to itself
+            self.detector = ShardedDetector(batch_size, cascade_imgsz if model_server is None else 0)
+        else:
+            self.detector = create_detector(model_server, **self.detector_options)
         
-        # Initialize database
+        # Initialize database, rows are written in batched transactions
         self.db = Database(db_path)
+        self.issue_writer = BufferedIssueWriter(self.db, flush_rows, flush_interval)
         
         # Initialize geocoder
         self.geocoder = Geocoder()
         
-        # Create output directory for detected issues
+        # Initialize per-stage timing, reported through stats_callback while processing
+        self.timer = StageTimer()
+        self.stats_callback = stats_callback
+        self.stats_interval = stats_interval
+        self.last_stats_time = time.monotonic()
+        
+        # Create output directory for detected issues, images are written in the background
         self.output_dir = Path("src/detected_issues")
-        self.output_dir.mkdir(exist_ok=True)
+        self.image_sink = ImageSink(self.output_dir, image_format, image_quality, image_workers, timer=self.timer)
+        self.image_prefix = image_prefix
+        self.evidence_mode = evidence_mode
         
         # Initialize frame counter and timestamp
         self.current_frame = 0
         self.start_time = None
         
+        # Initialize distance-based frame sampling
+        self.sampler = FrameSampler(sample_distance) if sample_distance > 0 else None
+        
+        # Initialize the frame schedule, frames off the schedule are never decoded
+        self.frame_stride = frame_stride
+        self.frame_schedule = frozenset(frame_schedule) if frame_schedule is not None else None
+        self.last_scheduled_frame = max(self.frame_schedule, default=-1) if self.frame_schedule is not None else None
+        self.next_frame = 0  # next frame to grab from the capture
+        self.frames_decoded = 0
+        
+        # Initialize pipelined execution, decode and inference then run on their own threads
+        self.pipelined = pipelined
+        self.queue_size = queue_size
+        self.pipeline_stats = None
+        
+        # Initialize sharded execution across worker processes
+        self.workers = workers
+        
         # Initialize cooldown tracking
         self.cooldown_period = 3.0  # 3 seconds cooldown
         self.last_detection_times = {}  # Maps issue type to last detection timestamp
         
-        # Initialize road segment tracking
-        self.current_segment = None
-        self.segment_distance = 0.0
-        self.segment_speeds = []
-        self.segment_issues = 0
-        self.segment_start_time = None
-        self.segment_start_gps = None
+        # Initialize tracking, which replaces the cooldown when enabled
+        self.tracker = None
+        if deduplication == 'tracker':
+            self.tracker = IoUTracker(track_iou, max(1, round(track_max_age * self.fps)), track_min_hits)
+        self.track_records: Dict[int, FrameRecord] = {}  # Best frames of the active tracks
+        self.finished_tracks: List[Track] = []  # Tracks ended but not stored yet
+        
+        # Initialize road segmentation, segments are cut from the GPS track after processing
         self.segment_length = 50.0  # meters between segments
+        self.issue_times = []  # timestamps of the stored issues
+        self.segments_built = False
+        
+        # Initialize checkpointing, rows above the last IDs are not covered by a checkpoint yet
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
+        self.last_checkpoint_time = time.monotonic()
+        self.last_issue_id, self.last_segment_id = self.db.get_last_ids()
+        
+        if resume and checkpoint_path and os.path.exists(checkpoint_path):
+            self.resume_from_checkpoint()
+        elif checkpoint_path:
+            # Start from a checkpoint, so rows written before the first interval can be removed on resume
+            self.save_checkpoint()
+        
+    def _open_capture(self, video_path: str) -> cv2.VideoCapture:
+        """Open the video file, live sources override this."""
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video file: {video_path}")
+        return cap
+        
+    def _load_gps_data(self, nmea_path: str) -> List[GPSData]:
+        """Parse the complete NMEA file, live sources override this."""
+        self.nmea_parser = NMEAParser()
+        return self.nmea_parser.parse_file(nmea_path)
         
     def get_frame_timestamp(self, frame_number: int) -> Optional[datetime]:
         """
@@ -86,6 +255,10 @@ class VideoProcessor:
         seconds = frame_number / self.fps
         return self.start_time + timedelta(seconds=seconds)
         
+    def image_name(self, frame_number: int) -> str:
+        """Name of the saved image of a frame, without the extension added by image_sink."""
+        return f"{self.image_prefix}issue_{frame_number:06d}"
+        
     def find_closest_gps_data(self, timestamp: datetime) -> Optional[GPSData]:
         """
         Find the closest GPS data point for a given timestamp.
@@ -94,14 +267,9 @@ class VideoProcessor:
             timestamp: The timestamp to find GPS data for
             
         Returns:
-            The closest GPS data point or None if no data available
+            The closest (or interpolated) GPS data point or None if no data available
         """
-        if not self.gps_data:
-            return None
-            
-        # Find the closest GPS data point
-        closest = min(self.gps_data, key=lambda x: abs((x.timestamp - timestamp).total_seconds()))
-        return closest
+        return self.timeline.lookup(timestamp)
         
     def process_frame(self, frame: np.ndarray, frame_number: int) -> Tuple[List[Detection], Optional[GPSData]]:
         """
@@ -114,6 +282,212 @@ class VideoProcessor:
         Returns:
             Tuple of (detections, gps_data)
         """
+        return self.process_batch([frame], frame_number)[0]
+        
+    def process_batch(self, frames: List[np.ndarray],
+                      first_frame_number: int) -> List[Tuple[List[Detection], Optional[GPSData]]]:
+        """
+        Process consecutive, already decoded frames with a single batched detector call.
+        
+        Args:
+            frames: Consecutive frames to process
+            first_frame_number: The frame number of the first frame
+            
+        Returns:
+            One (detections, gps_data) tuple per input frame
+        """
+        records = []
+        for i, frame in enumerate(frames):
+            record = self._plan_frame(first_frame_number + i)
+            if self._should_detect(record):
+                record.frame = frame
+            records.append(record)
+        return self.process_records(records)
+    
+    def process_records(self, records: List[FrameRecord]) -> List[Tuple[List[Detection], Optional[GPSData]]]:
+        """
+        Run detection on the decoded frames of a batch and update state for all of them.
+        
+        Args:
+            records: Consecutive frame records as returned by read_batch
+            
+        Returns:
+            One (detections, gps_data) tuple per record
+        """
+        return self.apply_detections(records, self.detect_records(records))
+        
+    def detect_records(self, records: List[FrameRecord]) -> Dict[int, np.ndarray]:
+        """
+        Run the detector on the decoded frames of a batch.
+        
+        This only touches the detector, so it can run on its own thread.
+        
+        Args:
+            records: Consecutive frame records as returned by read_batch
+            
+        Returns:
+            Dictionary mapping frame numbers to arrays of DETECTION_DTYPE records
+        """
+        detect_records = [record for record in records if record.frame is not None]
+        if not detect_records:
+            return {}
+        
+        start = time.perf_counter()
+        batch_detections = self.detector.detect_arrays([record.frame for record in detect_records])
+        inference_seconds = (time.perf_counter() - start) / len(detect_records)
+        for record in detect_records:
+            record.timings['inference'] = inference_seconds
+        return {record.frame_number: detections for record, detections in zip(detect_records, batch_detections)}
+        
+    def apply_detections(self, records: List[FrameRecord],
+                         detections_by_frame: Dict[int, np.ndarray]) -> List[Tuple[List[Detection], Optional[GPSData]]]:
+        """
+        Apply the stateful cooldown logic to a batch in frame order.
+        
+        With the tracker enabled, detections go to the tracker instead and
+        every record gets an empty detection list; defects are stored through
+        take_tracked_detections() once their track ends.
+        
+        Args:
+            records: Consecutive frame records as returned by read_batch
+            detections_by_frame: Output of detect_records for the same records
+            
+        Returns:
+            One (detections, gps_data) tuple per record
+        """
+        results = []
+        for record in records:
+            if record.gps_data is None:
+                results.append(([], None))
+                continue
+                
+            detections = detections_by_frame.get(record.frame_number)
+            if detections is None:
+                results.append(([], record.gps_data))
+                continue
+                
+            if self.tracker is not None:
+                self._track_detections(record, detections)
+                results.append(([], record.gps_data))
+                continue
+                
+            results.append((self._filter_detections(detections, record.timestamp), record.gps_data))
+            
+        return results
+        
+    def _track_detections(self, record: FrameRecord, detections: np.ndarray):
+        """
+        Feed the detections of an analysed frame to the tracker.
+        
+        The frame is kept while it is the best frame of an active track, so
+        the defect can be saved from it once the track ends.
+        
+        Args:
+            record: Frame record with its decoded frame
+            detections: Array of DETECTION_DTYPE records found in the frame
+        """
+        self.finished_tracks.extend(self.tracker.update(record.frame_number, detections))
+        if record.frame is not None and any(track.best_frame == record.frame_number for track in self.tracker.tracks):
+            self.track_records[record.frame_number] = record
+            
+    def take_tracked_detections(self, final: bool = False) -> List[Tuple[FrameRecord, List[Detection], str]]:
+        """
+        Collect the defects whose track has ended, grouped by their best frame.
+        
+        Args:
+            final: End all remaining tracks, at the end of the video
+            
+        Returns:
+            (frame record, detections, image name) tuples in frame order, the
+            record holds a copy of the best frame and its GPS data
+        """
+        if self.tracker is None:
+            return []
+        if final:
+            self.finished_tracks.extend(self.tracker.finish())
+            
+        tracks_by_frame = {}
+        for track in self.finished_tracks:
+            tracks_by_frame.setdefault(track.best_frame, []).append(track)
+        self.finished_tracks = []
+        
+        tracked = []
+        for frame_number in sorted(tracks_by_frame):
+            tracks = tracks_by_frame[frame_number]
+            # Frames are only missing when workers decoded them, the capture is free to seek then
+            best = self.track_records.get(frame_number)
+            if best is None or best.frame is None:
+                best = self._read_frame_record(frame_number)
+            record = FrameRecord(frame_number, best.frame.copy(), best.timestamp, best.gps_data)
+            detections = self.detector.to_detections(np.stack([track.best_detection for track in tracks]))
+            # Another track can end on the same frame later, the track ID keeps image names apart
+            tracked.append((record, detections, f"{self.image_name(frame_number)}_t{tracks[0].track_id}"))
+            
+        active_frames = {track.best_frame for track in self.tracker.tracks}
+        self.track_records = {n: record for n, record in self.track_records.items() if n in active_frames}
+        return tracked
+        
+    def is_scheduled(self, frame_number: int) -> bool:
+        """
+        Check whether a frame is on the stride / explicit frame schedule.
+        
+        Args:
+            frame_number: The frame number
+        
+        Returns:
+            True if the frame may be sent to the detector
+        """
+        if self.frame_schedule is not None:
+            return frame_number in self.frame_schedule
+        return frame_number % self.frame_stride == 0
+    
+    def _plan_frame(self, frame_number: int) -> FrameRecord:
+        """Resolve the timestamp and GPS data of a frame without decoding it."""
+        context = self._get_frame_context(frame_number)
+        if context is None:
+            return FrameRecord(frame_number)
+        return FrameRecord(frame_number, timestamp=context[0], gps_data=context[1])
+    
+    def _plan_frames(self, start: int, end: int) -> List[FrameRecord]:
+        """Resolve the timestamps and GPS data of a range of frames in one vectorized lookup."""
+        if not self.gps_data:
+            return [FrameRecord(frame_number) for frame_number in range(start, end)]
+        if self.start_time is None:
+            self.start_time = self.gps_data[0].timestamp
+            
+        offsets = np.arange(start, end) / self.fps
+        gps_points = self.timeline.lookup_seconds((self.start_time - self.timeline.origin).total_seconds() + offsets)
+        return [
+            FrameRecord(frame_number, timestamp=self.start_time + timedelta(seconds=float(offset)), gps_data=gps_data)
+            for frame_number, offset, gps_data in zip(range(start, end), offsets, gps_points)
+        ]
+        
+    def _iter_planned_frames(self, start: int, end: int) -> Iterator[FrameRecord]:
+        """Plan a range of frames one window at a time, timing the GPS lookup of each frame."""
+        for window_start in range(start, end, PLAN_WINDOW_FRAMES):
+            plan_start = time.perf_counter()
+            records = self._plan_frames(window_start, min(window_start + PLAN_WINDOW_FRAMES, end))
+            gps_seconds = (time.perf_counter() - plan_start) / len(records)
+            for record in records:
+                record.timings['gps_lookup'] = gps_seconds
+                yield record
+                
+    def _should_detect(self, record: FrameRecord) -> bool:
+        """Decide whether a frame goes to the detector, before it is decoded."""
+        if record.gps_data is None or not self.is_scheduled(record.frame_number):
+            return False
+        return self.sampler is None or self.sampler.select(record.gps_data, record.timestamp)
+    
+    def _get_frame_context(self, frame_number: int) -> Optional[Tuple[datetime, GPSData]]:
+        """
+        Get the timestamp and closest GPS data point for a frame.
+        
+        Args:
+            frame_number: The frame number
+            
+        Returns:
+            Tuple of (timestamp, gps_data) or None if no GPS data available
+        """
         # Get timestamp for this frame
         timestamp = self.get_frame_timestamp(frame_number)
         if timestamp is None:
@@ -122,148 +496,611 @@ class VideoProcessor:
                 self.start_time = self.gps_data[0].timestamp
                 timestamp = self.get_frame_timestamp(frame_number)
             else:
-                return [], None
+                return None
                 
         # Get closest GPS data
         gps_data = self.find_closest_gps_data(timestamp)
         if gps_data is None:
-            return [], None
+            return None
             
-        # Update road segment
-        self._update_road_segment(gps_data, timestamp)
+        return timestamp, gps_data
+        
+    def _filter_detections(self, detections: np.ndarray, timestamp: datetime) -> List[Detection]:
+        """
+        Filter detections based on the per-class cooldown.
+        
+        Args:
+            detections: Array of DETECTION_DTYPE records found in the frame
+            timestamp: Timestamp of the frame
             
-        # Detect road issues
-        detections = self.detector.detect(frame)
+        Returns:
+            Detections that passed the cooldown
+        """
+        # Only the first box of each class in a frame can pass the cooldown
+        class_ids, first_indices = np.unique(detections['class_id'], return_index=True)
         
-        # Filter detections based on cooldown
-        filtered_detections = []
-        for detection in detections:
-            issue_type = detection.class_name
+        keep = []
+        for class_id, index in zip(class_ids.tolist(), first_indices.tolist()):
+            issue_type = self.detector.classes[class_id]
             last_detection = self.last_detection_times.get(issue_type)
             
             # If no previous detection or enough time has passed
             if last_detection is None or (timestamp - last_detection).total_seconds() >= self.cooldown_period:
-                filtered_detections.append(detection)
+                keep.append(index)
                 self.last_detection_times[issue_type] = timestamp
-                self.segment_issues += 1
-        
-        return filtered_detections, gps_data
-        
-    def _update_road_segment(self, gps_data: GPSData, timestamp: datetime):
-        """Update the current road segment with new GPS data."""
-        if self.segment_start_gps is None:
-            # Start new segment
-            self.segment_start_gps = gps_data
-            self.segment_start_time = timestamp
-            self.segment_distance = 0.0
-            self.segment_speeds = []
-            self.segment_issues = 0
+        
+        return self.detector.to_detections(detections[sorted(keep)])
+        
+    def read_batch(self) -> List[FrameRecord]:
+        """
+        Advance the video by up to one detector batch of decoded frames.
+        
+        Every frame is grabbed, but only frames selected for detection are
+        decoded, so skipped frames cost no decode time. The selection needs
+        only the frame number and its GPS data, which are known before decoding.
+        
+        Returns:
+            Consecutive frame records, empty once the video is exhausted
+        """
+        records = []
+        decoded = 0
+        while decoded < self.detector.batch_size and len(records) < MAX_RECORDS_PER_BATCH:
+            frame_number = self.next_frame + len(records)
+            if self.last_scheduled_frame is not None and frame_number > self.last_scheduled_frame:
+                break
+            start = time.perf_counter()
+            if not self.cap.grab():
+                break
+            decode_seconds = time.perf_counter() - start
+            
+            start = time.perf_counter()
+            record = self._plan_frame(frame_number)
+            record.timings['gps_lookup'] = time.perf_counter() - start
+            if self._should_detect(record):
+                start = time.perf_counter()
+                ret, frame = self.cap.retrieve()
+                if not ret:
+                    break
+                decode_seconds += time.perf_counter() - start
+                record.frame = frame
+                decoded += 1
+            record.timings['decode'] = decode_seconds
+            records.append(record)
+        
+        self.next_frame += len(records)
+        self.frames_decoded += decoded
+        return records
+        
+    def iter_batches(self) -> Iterator[Tuple[List[FrameRecord], List[Tuple[List[Detection], Optional[GPSData]]]]]:
+        """
+        Read and process the video batch by batch.
+        
+        In pipelined mode decoding and inference run as separate stages on
+        their own threads, connected by bounded queues, while the caller
+        post-processes the previous batch. Segment, cooldown and database
+        state is only touched on the calling thread.
+        
+        Yields:
+            Tuples of (frame records, one (detections, gps_data) tuple per record)
+        """
+        if self.workers > 1:
+            yield from self._iter_sharded_batches()
+            return
+            
+        if not self.pipelined:
+            while True:
+                records = self.read_batch()
+                if not records:
+                    return
+                yield records, self.process_records(records)
+                
+        pipeline = Pipeline(
+            iter(self.read_batch, []),
+            [('inference', lambda records: (records, self.detect_records(records)))],
+            source_name='decode',
+            queue_size=self.queue_size
+        )
+        try:
+            for records, detections_by_frame in pipeline:
+                yield records, self.apply_detections(records, detections_by_frame)
+        finally:
+            self.pipeline_stats = pipeline.stats()
+            
+    def _iter_sharded_batches(self) -> Iterator[Tuple[List[FrameRecord], List[Tuple[List[Detection], Optional[GPSData]]]]]:
+        """
+        Read and process the video in shards on a pool of worker processes.
+        
+        Which frames to analyse depends only on GPS data, so frames are planned
+        without decoding, a window at a time, and the selected frames are cut
+        into contiguous shards as planning proceeds. Workers decode the shards
+        and run them through their own detector while later shards are still
+        being planned, so memory stays bounded by the shards in flight rather
+        than the length of the video. Shard results are merged in frame order
+        through the same cooldown logic as a sequential run, so the output
+        matches it exactly. Frames that end up with issues are read again here
+        for saving.
+        
+        Yields:
+            Tuples of (frame records of one shard, one (detections, gps_data) tuple per record)
+        """
+        if self.frame_count <= 0:
+            raise ValueError("Sharded processing needs the frame count of the video")
+            
+        first = self.next_frame
+        end = self.frame_count if self.last_scheduled_frame is None else min(self.frame_count, self.last_scheduled_frame + 1)
+        self.next_frame = end
+        
+        # Several shards per worker keep the pool busy when shards take uneven time
+        if self.frame_schedule is not None:
+            scheduled = sum(first <= frame_number < end for frame_number in self.frame_schedule)
         else:
-            # Calculate distance from last point
-            distance = self.nmea_parser.calculate_distance(self.segment_start_gps, gps_data)
-            self.segment_distance += distance
-            
-            # Add speed to segment
-            if gps_data.speed_knots > 0:
-                self.segment_speeds.append(gps_data.speed_knots)
-            
-            # If we've traveled enough distance, save the segment
-            if self.segment_distance >= self.segment_length:
-                # Calculate average speed
-                avg_speed = sum(self.segment_speeds) / len(self.segment_speeds) if self.segment_speeds else 0.0
+            scheduled = (end - first + self.frame_stride - 1) // self.frame_stride
+        shard_size = min(max(1, scheduled // (self.workers * SHARDS_PER_WORKER)), MAX_SHARD_FRAMES)
+        worker_options = dict(self.detector_options)
+        if not worker_options['num_threads']:
+            worker_options['num_threads'] = max(1, (os.cpu_count() or 1) // self.workers)
+            
+        # Records of the shards handed to the pool, in shard order, and of the frames after the last shard
+        shard_records = deque()
+        tail = []
+        
+        def plan_shards() -> Iterator[List[int]]:
+            shard, records = [], []
+            for record in self._iter_planned_frames(first, end):
+                if self._should_detect(record):
+                    # A shard owns every frame up to the first frame of the next one
+                    if len(shard) == shard_size:
+                        shard_records.append(records)
+                        yield shard
+                        shard, records = [], []
+                    shard.append(record.frame_number)
+                records.append(record)
+            if shard:
+                shard_records.append(records)
+                yield shard
+            else:
+                tail.extend(records)
                 
-                # Create and save segment
-                segment = RoadSegment(
-                    start_latitude=self.segment_start_gps.latitude_decimal,
-                    start_longitude=self.segment_start_gps.longitude_decimal,
-                    end_latitude=gps_data.latitude_decimal,
-                    end_longitude=gps_data.longitude_decimal,
-                    start_time=self.segment_start_time,
-                    end_time=timestamp,
-                    issue_count=self.segment_issues,
-                    average_speed=avg_speed,
-                    distance=self.segment_distance
-                )
-                self.db.add_road_segment(segment)
+        shard_detections = iter_shard_detections(self.video_path, plan_shards(), self.workers, self.model_server,
+                                                 worker_options, self.workers * SHARDS_PER_WORKER)
+        for shard in shard_detections:
+            records = shard_records.popleft()
+            self.frames_decoded += len(shard.detections)
+            self.detector.add_shard(shard)
+            for record in records:
+                record.timings.update(shard.timings.get(record.frame_number, {}))
+            
+            results = self.apply_detections(records, shard.detections)
+            for record, (detections, _) in zip(records, results):
+                if detections:
+                    read_start = time.perf_counter()
+                    record.frame = self._read_frame(record.frame_number)
+                    record.timings['decode'] = record.timings.get('decode', 0.0) + time.perf_counter() - read_start
+                    
+            yield records, results
+            
+            # Only keep decoded frames around while the caller needs them
+            for record in records:
+                record.frame = None
                 
-                # Reset for next segment
-                self.segment_start_gps = gps_data
-                self.segment_start_time = timestamp
-                self.segment_distance = 0.0
-                self.segment_speeds = []
-                self.segment_issues = 0
+        if tail:
+            yield tail, self.apply_detections(tail, {})
+            
+    def _read_frame(self, frame_number: int) -> np.ndarray:
+        """Seek to and decode a single frame."""
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+        ret, frame = self.cap.read()
+        if not ret:
+            raise RuntimeError(f"Could not read frame {frame_number} of {self.video_path}")
+        return frame
+        
+    def _read_frame_record(self, frame_number: int) -> FrameRecord:
+        """Seek to and decode a single frame along with its timestamp and GPS data."""
+        timestamp = self.get_frame_timestamp(frame_number)
+        return FrameRecord(frame_number, self._read_frame(frame_number), timestamp, self.find_closest_gps_data(timestamp))
         
-    def process_video(self) -> List[RoadIssue]:
+    def process_video(self) -> int:
         """
         Process the entire video and store detected issues in the database.
         
         Returns:
-            List of RoadIssue objects that were stored in the database
+            Number of issues this call stored, including those of tracks still
+            active at the end; a resumed run only counts issues stored after
+            its checkpoint
         """
-        stored_issues = []
+        issue_count = 0
         
-        while True:
-            ret, frame = self.cap.read()
-            if not ret:
-                break
-                
-            # Process frame
-            detections, gps_data = self.process_frame(frame, self.current_frame)
+        for result in self.iter_results():
+            issue_count += len(result.issues)
             
-            if detections and gps_data:
-                # Draw detections on frame
-                self.detector.draw_detections(frame, detections)
+            # Print progress
+            if not result.final and (result.frame_number + 1) % 100 == 0:
+                print(f"Processing: {result.progress:.1f}% complete")
                 
-                # Save annotated frame
-                output_path = self.output_dir / f"issue_{self.current_frame:06d}.jpg"
-                cv2.imwrite(str(output_path), frame)
+        print(f"Decoded {self.frames_decoded}/{self.current_frame} frames")
+        
+        if self.pipeline_stats is not None:
+            for name, stats in self.pipeline_stats.items():
+                print(f"Queue {name}: mean depth {stats['mean_depth']:.1f}/{stats['capacity']}, "
+                      f"max {stats['max_depth']}, producer blocked {stats['blocked_seconds']:.1f} s")
+        
+        if self.detector.cascade_imgsz:
+            stats = self.detector.cascade_stats()
+            print(f"Cascade: {stats['frames_escalated']}/{stats['frames_screened']} frames escalated "
+                  f"({stats['escalation_rate'] * 100:.1f}%)")
+            
+        if self.sampler is not None:
+            stats = self.sampler.stats()
+            print(f"Sampling: {stats['frames_selected']}/{stats['frames_seen']} frames analysed over "
+                  f"{stats['distance_travelled']:.0f} m ({stats['metres_per_frame']:.2f} m/frame)")
+            
+        print(format_summary(self.timer.summary(), "Stage timings:"))
+        return issue_count
+        
+    def iter_results(self) -> Iterator[FrameResult]:
+        """
+        Process the video and yield a result for every frame as it is handled.
+        
+        This is the single processing loop behind process_video, the GUI and
+        the batch runner. Issues are saved and queued for the database before
+        their frame is yielded and nothing is kept once it is, so memory stays
+        constant however long the video is. When the video is exhausted,
+        finish() runs and a last result with final set carries the issues it
+        stored. A consumer that stops early must call finish() itself.
+        
+        Yields:
+            One FrameResult per frame in frame order, then the final result
+        """
+        batches = self.iter_batches()
+        try:
+            while True:
+                start = time.perf_counter()
+                batch = next(batches, None)
+                if batch is None:
+                    break
+                records, results = batch
+                # Decoding and inference run per batch, their time is split over its frames
+                batch_seconds = (time.perf_counter() - start) / len(records)
                 
-                # Store each detection in the database
-                for detection in detections:
-                    # Get address information
-                    address_info = self.geocoder.reverse_geocode(
-                        gps_data.latitude_decimal,
-                        gps_data.longitude_decimal
-                    )
+                for i, (record, (detections, gps_data)) in enumerate(zip(records, results)):
+                    start = time.perf_counter()
+                    issues = self.store_detections(record, detections) if detections and gps_data else []
                     
-                    # Create RoadIssue object with relative path
-                    issue = RoadIssue(
-                        timestamp=gps_data.timestamp,
-                        latitude=gps_data.latitude_decimal,
-                        longitude=gps_data.longitude_decimal,
-                        issue_type=detection.class_name,
-                        confidence=detection.confidence,
-                        image_path=f"issue_{self.current_frame:06d}.jpg",  # Store only filename
-                        bbox=detection.bbox,
-                        speed=gps_data.speed_knots,
-                        fix_quality=gps_data.fix_quality,
-                        num_satellites=gps_data.num_satellites,
-                        hdop=gps_data.hdop,
-                        city=address_info.get('city') if address_info else None,
-                        district=address_info.get('district') if address_info else None,
-                        street=address_info.get('street') if address_info else None
-                    )
+                    # Store defects whose track ended in this batch with its last frame
+                    if i == len(records) - 1:
+                        for tracked_record, tracked_detections, name in self.take_tracked_detections():
+                            issues.extend(self.store_detections(tracked_record, tracked_detections, name))
+                            for stage, seconds in tracked_record.timings.items():
+                                record.timings[stage] = record.timings.get(stage, 0.0) + seconds
+                                
+                    self.current_frame = record.frame_number + 1
+                    self.timer.add_timings(record.timings)
+                    timings = {'batch': batch_seconds, 'store': time.perf_counter() - start, **record.timings}
+                    yield FrameResult(record.frame_number, record.frame, gps_data, issues, self.progress(), timings)
                     
-                    # Store in database
-                    issue_id = self.db.add_issue(issue)
-                    issue.id = issue_id
-                    stored_issues.append(issue)
-                
-            self.current_frame += 1
+                self.end_batch()
+                self.maybe_report_stats()
+        finally:
+            batches.close()
             
-            # Print progress
-            if self.current_frame % 100 == 0:
-                progress = (self.current_frame / self.frame_count) * 100
-                print(f"Processing: {progress:.1f}% complete")
+        issues = self.finish()
+        yield FrameResult(self.current_frame - 1, None, None, issues, self.progress(), {}, final=True)
+        
+    def progress(self) -> float:
+        """Percent of the video processed so far."""
+        return min(self.current_frame / self.frame_count * 100, 100.0) if self.frame_count > 0 else 0.0
+        
+    def finish(self) -> List[RoadIssue]:
+        """
+        Complete processing: store the remaining tracked defects, build the
+        road segments and write out all queued rows and images.
+        
+        Safe to call more than once.
+        
+        Returns:
+            The issues stored for tracks that were still active
+        """
+        issues = []
+        for record, detections, name in self.take_tracked_detections(final=True):
+            issues.extend(self.store_detections(record, detections, name))
+            self.timer.add_timings(record.timings)
+            
+        self.build_road_segments()
+        self.flush_writes()
+        self.image_sink.flush()
+        
+        if self.checkpoint_path:
+            self.save_checkpoint()
+            
+        self.report_stats()
+        return issues
+        
+    def store_detections(self, record: FrameRecord, detections: List[Detection],
+                         name: Optional[str] = None) -> List[RoadIssue]:
+        """
+        Save the evidence of a frame and queue one issue per detection.
+        
+        Args:
+            record: Frame record with its decoded frame and GPS data
+            detections: Detections to store
+            name: Image name, image_name() of the frame by default
+            
+        Returns:
+            The queued RoadIssue objects
+        """
+        gps_data = record.gps_data
+        issues = []
+        
+        # Queue evidence images for saving
+        image_paths = self.save_evidence(record.frame, record.frame_number, detections, name, record.timings)
+        
+        # Store each detection in the database
+        for detection, image_path in zip(detections, image_paths):
+            # Get address information
+            start = time.perf_counter()
+            address_info = self.geocoder.reverse_geocode(
+                gps_data.latitude_decimal,
+                gps_data.longitude_decimal
+            )
+            record.timings['geocode'] = record.timings.get('geocode', 0.0) + time.perf_counter() - start
+            
+            # Create RoadIssue object with relative path
+            issue = RoadIssue(
+                timestamp=gps_data.timestamp,
+                latitude=gps_data.latitude_decimal,
+                longitude=gps_data.longitude_decimal,
+                issue_type=detection.class_name,
+                confidence=detection.confidence,
+                image_path=image_path,  # Store only filename
+                bbox=detection.bbox,
+                speed=gps_data.speed_knots,
+                fix_quality=gps_data.fix_quality,
+                num_satellites=gps_data.num_satellites,
+                hdop=gps_data.hdop,
+                city=address_info.get('city') if address_info else None,
+                district=address_info.get('district') if address_info else None,
+                street=address_info.get('street') if address_info else None
+            )
+            
+            # Store in database
+            self.store_issue(issue)
+            issues.append(issue)
+            
+        return issues
+        
+    def save_evidence(self, frame: np.ndarray, frame_number: int, detections: List[Detection],
+                      name: Optional[str] = None, timings: Optional[Dict[str, float]] = None) -> List[str]:
+        """
+        Queue the evidence images of a frame on image_sink.
+        
+        In 'frame' mode the annotated frame is saved once for all detections.
+        In 'compact' mode each detection gets an unannotated full-resolution
+        crop and the frame a downscaled context image; the web app draws the
+        stored bboxes on them when serving. The frame is annotated in place
+        in both modes, after the crops are taken.
+        
+        Args:
+            frame: Decoded frame
+            frame_number: Number of the frame
+            detections: Detections on the frame
+            name: Image name, image_name() of the frame by default
+            timings: Per-stage timings of the frame, the time spent preparing images is added as 'annotate'
+            
+        Returns:
+            Stored image path for each detection
+        """
+        name = name or self.image_name(frame_number)
+        start = time.perf_counter()
+        if self.evidence_mode == 'frame':
+            self.detector.draw_detections(frame, detections)
+            images = [(frame, name)]
+        else:
+            images = [(crop_detection(frame, detection.bbox), crop_name(name, i)) for i, detection in enumerate(detections)]
+            images.append((context_image(frame), context_name(name)))
+            self.detector.draw_detections(frame, detections)
+        if timings is not None:
+            timings['annotate'] = timings.get('annotate', 0.0) + time.perf_counter() - start
+            
+        image_paths = [self.image_sink.save(image, image_name) for image, image_name in images]
+        if self.evidence_mode == 'frame':
+            return image_paths * len(detections)
+        return image_paths[:-1]
+        
+    def store_issue(self, issue: RoadIssue) -> None:
+        """
+        Queue an issue for the database.
+        
+        The issue is written with the next batch of rows, its id is set then.
+        Call flush_writes() to write it right away.
+        
+        Args:
+            issue: The issue to store
+        """
+        self.issue_writer.add_issue(issue)
+        self.issue_times.append(issue.timestamp)
+        
+    def flush_writes(self) -> List[int]:
+        """
+        Write all queued issues and road segments to the database.
+        
+        Returns:
+            IDs of the issues written
+        """
+        return self._write_rows(self.issue_writer.flush)
+        
+    def _write_rows(self, flush: Callable[[], List[int]]) -> List[int]:
+        """
+        Run a flush of issue_writer, timing it as db_insert when it wrote rows,
+        and remember the last written issue ID for checkpoints.
+        """
+        pending = self.issue_writer.pending()
+        start = time.perf_counter()
+        issue_ids = flush()
+        if pending and not self.issue_writer.pending():
+            self.timer.add('db_insert', time.perf_counter() - start)
+        if issue_ids:
+            self.last_issue_id = max(issue_ids)
+        return issue_ids
+            
+    def end_batch(self):
+        """
+        Finish a batch: write queued rows when due and save a checkpoint when due.
+        
+        Must be called once all frames before current_frame are fully handled.
+        """
+        self._write_rows(self.issue_writer.maybe_flush)
+        self.maybe_checkpoint()
+        
+    def build_road_segments(self) -> List[RoadSegment]:
+        """
+        Cut the GPS track of the processed frames into road segments and store them.
+        
+        Runs once after processing, over the whole track at once, and stores
+        all segments in a single transaction.
+        
+        Returns:
+            The stored road segments
+        """
+        if self.segments_built:
+            return []
+            
+        start_time, end_time = self._processed_range()
+        if start_time is None:
+            return []
+            
+        segments = build_road_segments(self.timeline, self.issue_times, start_time, end_time, self.segment_length)
+        for segment in segments:
+            segment.source = self.video_path
+        self.issue_writer.add_road_segments(segments)
+        self.flush_writes()
+        if segments:
+            self.last_segment_id = segments[-1].id
+        self.segments_built = True
+        return segments
+        
+    def _processed_range(self) -> Tuple[Optional[datetime], Optional[datetime]]:
+        """Time range of the processed frames, None if there is no GPS data."""
+        if not self.gps_data:
+            return None, None
+        start_time = self.start_time or self.gps_data[0].timestamp
+        return start_time, start_time + timedelta(seconds=self.current_frame / self.fps)
+        
+    def maybe_report_stats(self):
+        """Call stats_callback if stats_interval has passed since the last call."""
+        if self.stats_callback is not None and time.monotonic() - self.last_stats_time >= self.stats_interval:
+            self.report_stats()
+            
+    def report_stats(self):
+        """Call stats_callback with the current per-stage timings."""
+        if self.stats_callback is not None:
+            self.stats_callback(self.timer.summary())
+            self.last_stats_time = time.monotonic()
+            
+    def maybe_checkpoint(self):
+        """Save a checkpoint if checkpoint_interval has passed since the last one."""
+        if self.checkpoint_path and time.monotonic() - self.last_checkpoint_time >= self.checkpoint_interval:
+            self.save_checkpoint()
+            
+    def save_checkpoint(self):
+        """
+        Save the processing state to checkpoint_path.
+        
+        Must only be called between batches, once all frames before
+        current_frame are fully handled. Queued images and rows are written
+        first, and the file is replaced atomically so a crash while saving
+        leaves the previous checkpoint intact.
+        """
+        self.image_sink.flush()
+        self.flush_writes()
+        
+        state = {
+            'video_path': self.video_path,
+            'frame': self.current_frame,
+            'last_issue_id': self.last_issue_id,
+            'last_segment_id': self.last_segment_id,
+            'last_detection_times': {
+                issue_type: timestamp.isoformat() for issue_type, timestamp in self.last_detection_times.items()
+            },
+            'issue_times': [timestamp.isoformat() for timestamp in self.issue_times],
+            'segments_built': self.segments_built,
+            'tracker': self.tracker.state_dict() if self.tracker is not None else None
+        }
+        
+        temp_path = f"{self.checkpoint_path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(temp_path, self.checkpoint_path)
+        self.last_checkpoint_time = time.monotonic()
+        
+    def resume_from_checkpoint(self):
+        """
+        Restore the state saved at checkpoint_path and seek to its frame.
+        
+        Issues and road segments this video stored after the checkpoint are
+        deleted first, as they will be produced again. The distance sampler
+        is rebuilt by replaying frame selection up to the checkpoint, which
+        only needs GPS data and decodes nothing.
+        """
+        with open(self.checkpoint_path, 'r') as f:
+            state = json.load(f)
+            
+        if state['video_path'] != self.video_path:
+            raise ValueError(f"Checkpoint {self.checkpoint_path} belongs to {state['video_path']}, not {self.video_path}")
+            
+        frame = state['frame']
+        self.last_issue_id = state['last_issue_id']
+        self.last_segment_id = state['last_segment_id']
+        
+        # Remove rows written after the checkpoint
+        start_time, end_time = self._time_range()
+        deleted_issues, deleted_segments = self.db.delete_rows_after(
+            self.last_issue_id, self.last_segment_id, start_time, end_time, self.video_path, self.image_prefix
+        )
+        
+        # Restore cooldown and road segmentation state
+        self.last_detection_times = {
+            issue_type: datetime.fromisoformat(timestamp) for issue_type, timestamp in state['last_detection_times'].items()
+        }
+        self.issue_times = [datetime.fromisoformat(timestamp) for timestamp in state['issue_times']]
+        self.segments_built = state['segments_built']
+        
+        # Restore active tracks and decode their best frames again
+        if self.tracker is not None and state.get('tracker'):
+            self.tracker.load_state(state['tracker'])
+            if self.start_time is None:
+                self.start_time = self.gps_data[0].timestamp
+            for frame_number in {track.best_frame for track in self.tracker.tracks}:
+                self.track_records[frame_number] = self._read_frame_record(frame_number)
+                
+        if self.sampler is not None:
+            for record in self._iter_planned_frames(0, frame):
+                self._should_detect(record)
                 
-        return stored_issues
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame)
+        self.current_frame = self.next_frame = frame
+        print(f"Resuming {self.video_path} at frame {frame}, removed {deleted_issues} issues and "
+              f"{deleted_segments} road segments stored after the checkpoint")
+              
+    def _time_range(self) -> Tuple[datetime, datetime]:
+        """Time range covered by the video and its GPS data."""
+        start_time = self.gps_data[0].timestamp
+        end_time = max(self.gps_data[-1].timestamp, start_time + timedelta(seconds=self.frame_count / self.fps))
+        return start_time, end_time
         
     def release(self):
-        """Release video capture resources and close database connection."""
+        """Release video capture and detector resources and close database connection."""
         if self.cap is not None:
             self.cap.release()
+        if self.detector is not None:
+            self.detector.close()
         if self.db is not None:
-            self.db.close()
+            try:
+                self.image_sink.close()
+            finally:
+                try:
+                    self.issue_writer.close()
+                finally:
+                    self.db.close()
             
     def __enter__(self):
         """Context manager entry."""
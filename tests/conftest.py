@@ -0,0 +1,138 @@
+import os
+import sys
+import threading
+from datetime import datetime, timedelta
+
+import cv2
+import numpy as np
+import pytest
+
+# Modules in src import each other by their flat names
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+import model_server
+import video_processor
+from detector import CLASS_NAMES, DETECTION_DTYPE, RoadDamageDetector
+from geocoder import Geocoder
+from nmea_parser import GPSData
+
+# Time of the first GPS fix in the tests
+START = datetime(2024, 5, 1, 12, 0, 0)
+
+# Recordings made by the recording fixture: 6 s at 10 fps, one brightness level per second
+FPS = 10
+LEVEL_FRAMES = 10
+LEVEL_STEP = 40
+
+class BrightnessDetector:
+    """
+    Stands in for RoadDamageDetector in processing tests.
+    
+    Detects one defect on every frame that is not black, with the class
+    given by the brightness level of the frame.
+    """
+    
+    to_detections = RoadDamageDetector.to_detections
+    draw_detections = RoadDamageDetector.draw_detections
+    
+    def __init__(self, batch_size: int = 8, **options):
+        self.classes = list(CLASS_NAMES)
+        self.conf_threshold = 0.5
+        self.batch_size = batch_size
+        self.cascade_imgsz = 0
+        
+    def detect_arrays(self, frames):
+        arrays = []
+        for frame in frames:
+            level = int(round(frame.mean() / LEVEL_STEP))
+            rows = [(8, 8, 40, 30, 0.8, level % len(CLASS_NAMES))] if level else []
+            arrays.append(np.array(rows, dtype=DETECTION_DTYPE))
+        return arrays
+        
+    def close(self):
+        pass
+
+@pytest.fixture
+def at():
+    """Factory of timestamps a number of seconds after START."""
+    return lambda seconds: START + timedelta(seconds=seconds)
+
+@pytest.fixture
+def make_fix():
+    """Factory of GPS fixes at a number of seconds after START."""
+    def make(seconds: float, latitude: float = 48.0, longitude: float = 11.0, speed_knots: float = 20.0,
+             course_degrees: float = 90.0, altitude: float = 500.0) -> GPSData:
+        return GPSData(
+            timestamp=START + timedelta(seconds=seconds),
+            latitude_ddmm='',
+            longitude_ddmm='',
+            latitude_decimal=latitude,
+            longitude_decimal=longitude,
+            speed_knots=speed_knots,
+            course_degrees=course_degrees,
+            fix_quality=1,
+            num_satellites=8,
+            hdop=0.9,
+            altitude=altitude
+        )
+    return make
+
+def _ddmm(value: float, degree_digits: int) -> str:
+    """Unsigned decimal degrees as NMEA DDMM.MMMM."""
+    degrees = int(value)
+    return f"{degrees:0{degree_digits}d}{(value - degrees) * 60:07.4f}"
+
+@pytest.fixture
+def recording(tmp_path):
+    """
+    Write a video with a matching NMEA track to tmp_path.
+    
+    Returns:
+        Tuple of (video path, NMEA path)
+    """
+    video_path = str(tmp_path / 'drive.avi')
+    writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*'MJPG'), FPS, (64, 48))
+    for frame_number in range(6 * LEVEL_FRAMES):
+        writer.write(np.full((48, 64, 3), LEVEL_STEP * (frame_number // LEVEL_FRAMES), dtype=np.uint8))
+    writer.release()
+    
+    # Heading north at about 22 m/s, one fix per second
+    nmea_path = str(tmp_path / 'drive.nmea')
+    with open(nmea_path, 'w') as f:
+        for second in range(8):
+            timestamp = START + timedelta(seconds=second)
+            time_str = timestamp.strftime('%H%M%S.00')
+            latitude = _ddmm(48.0 + 0.0002 * second, 2)
+            longitude = _ddmm(11.0, 3)
+            f.write(f"$GPRMC,{time_str},A,{latitude},N,{longitude},E,042.8,000.0,{timestamp:%d%m%y},,,A*00\n")
+            f.write(f"$GPGGA,{time_str},{latitude},N,{longitude},E,1,08,0.9,500.0,M,46.9,M,,*00\n")
+    return video_path, nmea_path
+
+@pytest.fixture
+def make_processor(tmp_path, monkeypatch):
+    """Factory of VideoProcessors that run BrightnessDetector and write below tmp_path."""
+    monkeypatch.setattr(video_processor, 'create_detector', lambda model_server, **options: BrightnessDetector(**options))
+    monkeypatch.setattr(Geocoder, 'reverse_geocode', lambda self, latitude, longitude: None)
+    # Evidence images go to src/detected_issues below the working directory
+    monkeypatch.chdir(tmp_path)
+    
+    def make(recording, db_path: str = 'issues.db', **options) -> video_processor.VideoProcessor:
+        options.setdefault('batch_size', 4)
+        return video_processor.VideoProcessor(recording[0], recording[1], 'model.pt', str(tmp_path / db_path), **options)
+    return make
+
+@pytest.fixture
+def model_server_address(tmp_path, monkeypatch):
+    """
+    Serve BrightnessDetector from a model server thread of the test process.
+    
+    Spawned worker processes cannot be patched, but they can use this server.
+    
+    Returns:
+        Unix socket address of the server
+    """
+    monkeypatch.setenv(model_server.AUTHKEY_ENV, 'test-key')
+    monkeypatch.setattr(model_server, 'RoadDamageDetector', lambda model_path, **options: BrightnessDetector(**options))
+    server = model_server.ModelServer('model.pt', str(tmp_path / 'model.sock'))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.address
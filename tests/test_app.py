@@ -0,0 +1,53 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+for module in ('flask', 'flask_login', 'flask_caching', 'folium', 'pandas'):
+    pytest.importorskip(module)
+
+# The web app imports the src package from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+from src.database import Database, RoadIssue
+
+def test_context_image_is_removed_with_the_last_crop_of_its_frame(tmp_path, monkeypatch, at):
+    monkeypatch.chdir(tmp_path)
+    image_dir = tmp_path / 'src' / 'src' / 'detected_issues'
+    image_dir.mkdir(parents=True)
+    crops = ['cam1_issue_000042_det0.jpg', 'cam1_issue_000042_det1.jpg']
+    for name in crops + ['cam1_issue_000042_context.jpg']:
+        (image_dir / name).write_bytes(b'')
+        
+    with Database(str(tmp_path / 'issues.db')) as db:
+        ids = [
+            db.add_issue(RoadIssue(timestamp=at(0), latitude=48.0, longitude=11.0, issue_type='Potholes',
+                                   confidence=0.8, image_path=name))
+            for name in crops
+        ]
+        
+        db.delete_issue(ids[0])
+        app.remove_issue_images(db, crops[:1])
+        assert sorted(os.listdir(image_dir)) == ['cam1_issue_000042_context.jpg', 'cam1_issue_000042_det1.jpg']
+        
+        db.bulk_delete_issues(ids[1:])
+        app.remove_issue_images(db, crops[1:])
+        assert os.listdir(image_dir) == []
+
+@pytest.mark.parametrize('extension, mimetype, signature', [
+    ('.jpg', 'image/jpeg', b'\xff\xd8'),
+    ('.png', 'image/png', b'\x89PNG'),
+    ('.webp', 'image/webp', b'RIFF'),
+])
+def test_annotated_images_keep_the_stored_format(extension, mimetype, signature):
+    image = np.zeros((16, 16, 3), dtype=np.uint8)
+    
+    with app.app.test_request_context():
+        response = app.send_annotated(image, f"cam1_issue_000042_det0{extension}")
+        response.direct_passthrough = False
+        
+        assert app.image_mimetype(f"cam1_issue_000042{extension}") == mimetype
+        assert response.mimetype == mimetype
+        assert response.get_data().startswith(signature)
@@ -0,0 +1,118 @@
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from backends import (PAD_VALUE, Letterbox, LetterboxMeta, box_iou, decode_predictions, match_frame,
+                      non_max_suppression, quantize_model)
+from detector import DETECTION_DTYPE
+
+def test_nms_keeps_the_best_of_overlapping_boxes():
+    boxes = np.array([[0, 0, 10, 10], [1, 1, 11, 11], [50, 50, 60, 60]], dtype=np.float32)
+    scores = np.array([0.6, 0.9, 0.5], dtype=np.float32)
+    class_ids = np.zeros(3, dtype=np.int64)
+    
+    assert non_max_suppression(boxes, scores, class_ids, 0.5).tolist() == [1, 2]
+
+def test_nms_never_suppresses_across_classes():
+    boxes = np.array([[0, 0, 10, 10], [0, 0, 10, 10]], dtype=np.float32)
+    scores = np.array([0.6, 0.9], dtype=np.float32)
+    class_ids = np.array([0, 1])
+    
+    assert non_max_suppression(boxes, scores, class_ids, 0.5).tolist() == [1, 0]
+
+def test_nms_keeps_boxes_at_the_threshold():
+    # Intersection 50, union 150: IoU 1/3
+    boxes = np.array([[0, 0, 10, 10], [5, 0, 15, 10]], dtype=np.float32)
+    scores = np.array([0.9, 0.8], dtype=np.float32)
+    class_ids = np.zeros(2, dtype=np.int64)
+    
+    assert len(non_max_suppression(boxes, scores, class_ids, 0.4)) == 2
+    assert len(non_max_suppression(boxes, scores, class_ids, 0.3)) == 1
+
+def test_nms_without_boxes():
+    keep = non_max_suppression(np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int64), 0.5)
+    assert keep.shape == (0,)
+
+def test_decode_predictions_converts_centres_and_filters():
+    # Three anchors, two classes: rows are cx, cy, w, h and the class scores
+    output = np.array([
+        [50, 52, 200],
+        [50, 50, 200],
+        [20, 20, 10],
+        [10, 10, 10],
+        [0.9, 0.8, 0.1],
+        [0.1, 0.2, 0.2]
+    ], dtype=np.float32)
+    
+    boxes = decode_predictions(output, conf_threshold=0.25, iou_threshold=0.5)
+    
+    # The second anchor overlaps the first and the third is below the threshold
+    np.testing.assert_allclose(boxes, [[40, 45, 60, 55, 0.9, 0]])
+
+def _to_canvas(boxes: np.ndarray, meta: LetterboxMeta) -> np.ndarray:
+    """Map frame boxes onto the letterboxed canvas, the inverse of LetterboxMeta.to_frame."""
+    canvas = boxes.astype(np.float64)
+    canvas[:, [0, 2]] = (canvas[:, [0, 2]] - meta.crop_x) * meta.scale + meta.x_offset
+    canvas[:, [1, 3]] = (canvas[:, [1, 3]] - meta.crop_y) * meta.scale + meta.y_offset
+    return canvas
+
+def test_letterbox_round_trip_square_canvas():
+    frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+    canvas, meta = Letterbox(640)(frame)
+    
+    assert canvas.shape == (640, 640, 3)
+    assert (meta.scale, meta.x_offset, meta.y_offset) == (0.5, 0, 140)
+    boxes = np.array([[0, 0, 1280, 720], [100, 200, 300, 400]], dtype=np.float64)
+    np.testing.assert_allclose(meta.to_frame(_to_canvas(boxes, meta)), boxes)
+
+def test_letterbox_round_trip_with_stride_and_crop():
+    frame = np.zeros((500, 1000, 3), dtype=np.uint8)
+    canvas, meta = Letterbox(640, stride=32)(frame)
+    meta = replace(meta, crop_x=40, crop_y=300)
+    
+    # 1000x500 scales to 640x320, already a multiple of the stride
+    assert canvas.shape == (320, 640, 3)
+    boxes = np.array([[140, 310, 540, 700]], dtype=np.float64)
+    np.testing.assert_allclose(meta.to_frame(_to_canvas(boxes, meta)), boxes)
+
+def test_letterbox_to_frame_clips_to_the_image():
+    meta = LetterboxMeta(scale=0.5, x_offset=0, y_offset=140, width=1280, height=720)
+    
+    # Boxes reaching into the padding end at the image border
+    boxes = meta.to_frame(np.array([[-10, 100, 700, 600]], dtype=np.float64))
+    np.testing.assert_allclose(boxes, [[0, 0, 1280, 720]])
+
+def test_letterbox_pads_and_reuses_its_canvas():
+    letterbox = Letterbox(64)
+    first, meta = letterbox(np.full((32, 64, 3), 7, dtype=np.uint8))
+    
+    assert (first[:meta.y_offset] == PAD_VALUE).all()
+    assert (first[meta.y_offset:meta.y_offset + 32] == 7).all()
+    second, _ = letterbox(np.full((32, 64, 3), 9, dtype=np.uint8))
+    assert second is first
+    assert (second[meta.y_offset:meta.y_offset + 32] == 9).all()
+
+def test_box_iou():
+    assert box_iou((0, 0, 10, 10), (5, 0, 15, 10)) == pytest.approx(1 / 3)
+    assert box_iou((0, 0, 10, 10), (20, 20, 30, 30)) == 0.0
+    assert box_iou((0, 0, 0, 0), (0, 0, 0, 0)) == 0.0
+
+def test_match_frame_pairs_boxes_of_the_same_class_once():
+    reference = np.array([(0, 0, 10, 10, 0.9, 1), (0, 0, 10, 10, 0.8, 2), (40, 40, 50, 50, 0.7, 1)], dtype=DETECTION_DTYPE)
+    candidate = np.array([(1, 0, 11, 10, 0.9, 1), (0, 0, 10, 10, 0.9, 3), (41, 40, 51, 50, 0.6, 1)], dtype=DETECTION_DTYPE)
+    
+    matches = match_frame(reference, candidate)
+    
+    # The class 2 box overlaps only a box of another class
+    assert [j for j, _ in matches] == [0, None, 2]
+    assert matches[0][1] == pytest.approx(9 / 11)
+    assert [j for j, _ in match_frame(reference, candidate, iou_threshold=0.9)] == [None, None, None]
+
+def test_quantized_model_is_reused_without_calibration(tmp_path):
+    cached = tmp_path / 'model_320_int8.onnx'
+    cached.write_bytes(b'')
+    
+    assert quantize_model(str(tmp_path / 'model.pt'), 320) == str(cached)
+    with pytest.raises(ValueError, match="calibration folder"):
+        quantize_model(str(tmp_path / 'model.pt'), 640)
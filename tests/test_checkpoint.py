@@ -0,0 +1,95 @@
+import sqlite3
+
+import pytest
+
+def _rows(db_path):
+    """Stored issues and road segments, without their IDs."""
+    conn = sqlite3.connect(db_path)
+    try:
+        issues = conn.execute("SELECT timestamp, issue_type, image_path FROM road_issues ORDER BY id").fetchall()
+        segments = conn.execute("SELECT start_time, end_time, issue_count, distance, source "
+                                "FROM road_segments ORDER BY id").fetchall()
+    finally:
+        conn.close()
+    return issues, segments
+
+def _crash_on_issue(processor, count):
+    """Make processing fail when the count-th issue is stored."""
+    store_issue = processor.store_issue
+    stored = []
+    
+    def crash(issue):
+        stored.append(issue)
+        if len(stored) == count:
+            raise RuntimeError("crash")
+        store_issue(issue)
+    processor.store_issue = crash
+
+@pytest.fixture
+def reference(recording, make_processor, tmp_path):
+    """Rows of an uninterrupted run."""
+    with make_processor(recording, 'reference.db') as processor:
+        processor.process_video()
+    return _rows(tmp_path / 'reference.db')
+
+def test_resume_after_a_crash_matches_an_uninterrupted_run(recording, make_processor, reference, tmp_path):
+    with pytest.raises(RuntimeError):
+        with make_processor(recording, checkpoint_path='checkpoint.json', checkpoint_interval=0) as processor:
+            _crash_on_issue(processor, 4)
+            processor.process_video()
+            
+    with make_processor(recording, checkpoint_path='checkpoint.json', resume=True) as processor:
+        assert processor.current_frame > 0
+        processor.process_video()
+        
+    assert _rows(tmp_path / 'issues.db') == reference
+
+def test_resume_after_a_crash_before_the_first_interval(recording, make_processor, reference, tmp_path):
+    with pytest.raises(RuntimeError):
+        with make_processor(recording, checkpoint_path='checkpoint.json', checkpoint_interval=3600,
+                            flush_rows=1) as processor:
+            _crash_on_issue(processor, 4)
+            processor.process_video()
+    assert len(_rows(tmp_path / 'issues.db')[0]) == 3
+    
+    # The checkpoint saved at the start lets the resumed run remove the rows written since
+    with make_processor(recording, checkpoint_path='checkpoint.json', resume=True) as processor:
+        assert processor.current_frame == 0
+        processor.process_video()
+        
+    assert _rows(tmp_path / 'issues.db') == reference
+
+def test_resume_only_removes_rows_of_its_own_video(recording, make_processor, tmp_path):
+    # Another camera of the same drive shares the database, its prefix matches 'a_' if '_' were a wildcard
+    other = (recording[0].replace('drive', 'other'), recording[1])
+    (tmp_path / 'other.avi').write_bytes((tmp_path / 'drive.avi').read_bytes())
+    with make_processor(other, image_prefix='ax') as processor:
+        processor.process_video()
+    other_rows = _rows(tmp_path / 'issues.db')
+    
+    # Crash once the segments are written, before the final checkpoint
+    with pytest.raises(RuntimeError):
+        with make_processor(recording, checkpoint_path='checkpoint.json', checkpoint_interval=3600,
+                            image_prefix='a_') as processor:
+            def crash():
+                raise RuntimeError("crash")
+            processor.save_checkpoint = crash
+            processor.process_video()
+            
+    with make_processor(recording, checkpoint_path='checkpoint.json', resume=True, image_prefix='a_') as processor:
+        processor.process_video()
+        
+    issues, segments = _rows(tmp_path / 'issues.db')
+    assert issues[:len(other_rows[0])] == other_rows[0]
+    assert [issue[2][:2] for issue in issues[len(other_rows[0]):]] == ['a_'] * len(other_rows[0])
+    assert segments[:len(other_rows[1])] == other_rows[1]
+    assert [segment[4] for segment in segments] == [other[0]] * len(other_rows[1]) + [recording[0]] * len(other_rows[1])
+
+def test_resume_rejects_the_checkpoint_of_another_video(recording, make_processor, tmp_path):
+    with make_processor(recording, checkpoint_path='checkpoint.json'):
+        pass
+    other = (str(tmp_path / 'other.avi'), recording[1])
+    (tmp_path / 'other.avi').write_bytes((tmp_path / 'drive.avi').read_bytes())
+    
+    with pytest.raises(ValueError, match="belongs to"):
+        make_processor(other, checkpoint_path='checkpoint.json', resume=True)
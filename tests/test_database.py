@@ -0,0 +1,98 @@
+import sqlite3
+
+import pytest
+
+from database import BufferedIssueWriter, Database, RoadIssue, RoadSegment
+
+def _issue(at, seconds, issue_type='Potholes'):
+    return RoadIssue(timestamp=at(seconds), latitude=48.0, longitude=11.0, issue_type=issue_type,
+                     confidence=0.8, image_path=f"issue_{seconds:06d}.jpg", bbox=(1, 2, 3, 4))
+
+@pytest.fixture
+def db(tmp_path):
+    with Database(str(tmp_path / 'issues.db')) as db:
+        yield db
+
+def _count(db, table):
+    return db.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+def test_writer_buffers_until_flushed(db, at):
+    writer = BufferedIssueWriter(db, max_rows=100, max_delay=3600)
+    issues = [_issue(at, seconds) for seconds in range(3)]
+    for issue in issues:
+        writer.add_issue(issue)
+        
+    assert writer.pending() == 3
+    assert writer.maybe_flush() == []
+    assert _count(db, 'road_issues') == 0
+    
+    ids = writer.flush()
+    
+    assert ids == [issue.id for issue in issues] == [1, 2, 3]
+    assert writer.pending() == 0
+    stored = db.conn.execute("SELECT id, image_path, bbox FROM road_issues ORDER BY id").fetchall()
+    assert [tuple(row) for row in stored] == [(i + 1, f"issue_{i:06d}.jpg", '[1, 2, 3, 4]') for i in range(3)]
+
+def test_writer_flushes_on_row_count_and_delay(db, at):
+    writer = BufferedIssueWriter(db, max_rows=2, max_delay=3600)
+    writer.add_issue(_issue(at, 0))
+    assert writer.maybe_flush() == []
+    writer.add_issue(_issue(at, 1))
+    assert writer.maybe_flush() == [1, 2]
+    
+    writer = BufferedIssueWriter(db, max_rows=100, max_delay=0)
+    writer.add_issue(_issue(at, 2))
+    assert writer.maybe_flush() == [3]
+
+def test_writer_ids_never_reuse_deleted_rows(db, at):
+    writer = BufferedIssueWriter(db)
+    writer.add_issue(_issue(at, 0))
+    writer.add_issue(_issue(at, 1))
+    writer.flush()
+    db.bulk_delete_issues([2])
+    
+    writer.add_issue(_issue(at, 2))
+    assert writer.flush() == [3]
+    # Rows added one by one continue after the explicit IDs
+    assert db.add_issue(_issue(at, 3)) == 4
+
+def test_writers_sharing_a_database_get_distinct_ids(db, tmp_path, at):
+    with Database(str(tmp_path / 'issues.db')) as other_db:
+        first, second = BufferedIssueWriter(db), BufferedIssueWriter(other_db)
+        for seconds in range(3):
+            first.add_issue(_issue(at, seconds))
+            second.add_issue(_issue(at, seconds + 10))
+        second.add_road_segments([RoadSegment(start_time=at(0), end_time=at(5), distance=50.0)])
+        
+        ids = first.flush() + second.flush()
+        
+    assert ids == [1, 2, 3, 4, 5, 6]
+    assert _count(db, 'road_issues') == 6
+    assert tuple(db.conn.execute("SELECT id, distance FROM road_segments").fetchone()) == (1, 50.0)
+
+def test_failed_flush_keeps_the_rows_pending(db, at):
+    writer = BufferedIssueWriter(db)
+    issues = [_issue(at, 0), RoadIssue(latitude=48.0)]
+    for issue in issues:
+        writer.add_issue(issue)
+        
+    # The second issue misses required columns, so nothing is written
+    with pytest.raises(sqlite3.IntegrityError):
+        writer.flush()
+        
+    assert [issue.id for issue in issues] == [None, None]
+    assert writer.pending() == 2
+    assert _count(db, 'road_issues') == 0
+
+def test_image_paths_are_looked_up_by_id_and_literal_prefix(db, at):
+    for image_path in ('cam_1_issue_000010_det0.jpg', 'cam_1_issue_000010_det1.jpg', 'cam11issue_000010_det0.jpg'):
+        issue = _issue(at, 10)
+        issue.image_path = image_path
+        db.add_issue(issue)
+        
+    assert db.get_issue_image_paths([3, 1]) == ['cam_1_issue_000010_det0.jpg', 'cam11issue_000010_det0.jpg']
+    assert db.get_issue_image_paths([]) == []
+    # '_' is matched literally, not as a LIKE wildcard
+    assert sorted(db.get_image_paths_with_prefix('cam_1_issue_000010')) == [
+        'cam_1_issue_000010_det0.jpg', 'cam_1_issue_000010_det1.jpg'
+    ]
@@ -0,0 +1,164 @@
+import numpy as np
+import pytest
+
+import detector as detector_module
+from detector import CLASS_NAMES, DETECTION_DTYPE, Detection, RoadDamageDetector
+from roi import RoadROI
+
+class WhiteRegionModel:
+    """Stands in for an exported model: one pothole box around the white pixels of each input."""
+    
+    def __init__(self):
+        self.calls = []  # batch size of each call
+        self.sizes = []  # input side of each call
+        
+    def __call__(self, blob: np.ndarray) -> np.ndarray:
+        self.calls.append(len(blob))
+        self.sizes.append(blob.shape[-1])
+        outputs = np.zeros((len(blob), 4 + len(CLASS_NAMES), 1), dtype=np.float32)
+        for output, image in zip(outputs, blob):
+            ys, xs = np.nonzero(image[0] > 0.9)
+            if len(xs):
+                x1, y1, x2, y2 = xs.min(), ys.min(), xs.max() + 1, ys.max() + 1
+                output[:4, 0] = [(x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1]
+                output[4 + CLASS_NAMES.index('Potholes'), 0] = 0.9
+        return outputs
+
+@pytest.fixture
+def model(monkeypatch):
+    model = WhiteRegionModel()
+    monkeypatch.setattr(detector_module, 'create_backend', lambda *args: model)
+    return model
+
+def test_tile_grid_covers_the_frame_with_equal_tiles(model):
+    detector = RoadDamageDetector('model.pt', backend='onnx', tile_size=500, tile_overlap=0.2)
+    
+    # Steps of 400 px, the last column is shifted back to end at the border
+    assert detector.tile_grid(1000, 500) == [(0, 0, 500, 500), (400, 0, 500, 500), (500, 0, 500, 500)]
+    assert detector.tile_grid(300, 200) == [(0, 0, 300, 200)]
+
+def test_tiles_merge_a_box_seen_twice_along_their_border(model):
+    detector = RoadDamageDetector('model.pt', backend='onnx', tile_size=500, tile_overlap=0.2)
+    frame = np.zeros((500, 1000, 3), dtype=np.uint8)
+    frame[200:260, 420:480] = 255
+    
+    detections = detector.detect_arrays([frame])[0]
+    
+    # The first two tiles both contain the region, all tiles went through the model in one call
+    assert model.calls == [3]
+    assert len(detections) == 1
+    box = [detections['x1'][0], detections['y1'][0], detections['x2'][0], detections['y2'][0]]
+    np.testing.assert_allclose(box, [420, 200, 480, 260], atol=2)
+    assert CLASS_NAMES[detections['class_id'][0]] == 'Potholes'
+
+def test_tiles_keep_separate_regions(model):
+    detector = RoadDamageDetector('model.pt', backend='onnx', tile_size=500, tile_overlap=0.2)
+    frame = np.zeros((500, 1000, 3), dtype=np.uint8)
+    frame[100:150, 100:150] = 255
+    frame[300:350, 850:900] = 255
+    
+    detections = detector.detect_arrays([frame])[0]
+    
+    np.testing.assert_allclose(np.sort(detections['x1']), [100, 850], atol=2)
+
+def _frames(count, white):
+    """Black frames, with a white region on the frames listed in white."""
+    frames = [np.zeros((240, 320, 3), dtype=np.uint8) for _ in range(count)]
+    for i in white:
+        frames[i][100:140, 100:160] = 255
+    return frames
+
+def test_cascade_confirms_only_frames_with_candidates(model):
+    detector = RoadDamageDetector('model.pt', backend='onnx', imgsz=320, cascade_imgsz=160)
+    
+    arrays = detector.detect_arrays(_frames(5, white=[1, 3]))
+    
+    # One screening call over all frames, one full-size call over the two candidates
+    assert model.sizes == [160, 320]
+    assert model.calls == [5, 2]
+    assert [len(array) for array in arrays] == [0, 1, 0, 1, 0]
+    box = [arrays[1]['x1'][0], arrays[1]['y1'][0], arrays[1]['x2'][0], arrays[1]['y2'][0]]
+    np.testing.assert_allclose(box, [100, 100, 160, 140], atol=2)
+    assert detector.cascade_stats() == {'frames_screened': 5, 'frames_escalated': 2, 'escalation_rate': 0.4}
+
+def test_frames_rejected_by_the_screen_skip_the_full_model(model):
+    detector = RoadDamageDetector('model.pt', backend='onnx', imgsz=320, cascade_imgsz=160, cascade_conf=0.95)
+    
+    arrays = detector.detect_arrays(_frames(4, white=[0, 2]))
+    
+    assert model.sizes == [160]
+    assert all(len(array) == 0 for array in arrays)
+    assert detector.cascade_stats()['frames_escalated'] == 0
+
+def test_cascade_counts_add_up_over_calls(model):
+    detector = RoadDamageDetector('model.pt', backend='onnx', imgsz=320, cascade_imgsz=160)
+    
+    detector.detect_arrays(_frames(3, white=[0]))
+    detector.detect_arrays(_frames(2, white=[0, 1]))
+    
+    assert detector.cascade_stats() == {'frames_screened': 5, 'frames_escalated': 3, 'escalation_rate': 0.6}
+
+def test_batches_are_split_by_batch_size(model):
+    detector = RoadDamageDetector('model.pt', backend='onnx', imgsz=320, batch_size=2)
+    frames = _frames(5, white=[1, 4])
+    
+    batched = detector.detect_batch(frames)
+    
+    assert model.calls == [2, 2, 1]
+    assert detector.detect_batch(np.stack(frames), batch_size=5) == batched
+    assert model.calls[-1] == 5
+    assert [detector.detect(frame) for frame in frames] == batched
+    assert [len(detections) for detections in batched] == [0, 1, 0, 0, 1]
+
+class _Boxes:
+    """Ultralytics boxes of one result, with data on a device."""
+    
+    def __init__(self, data):
+        self.data = self
+        self._data = np.asarray(data, dtype=np.float32)
+        
+    def cpu(self):
+        return self
+        
+    def numpy(self):
+        return self._data
+
+def test_yolo_results_become_arrays_in_frame_coordinates(model):
+    detector = RoadDamageDetector('model.pt', backend='onnx', imgsz=320)
+    _, (meta,) = detector.letterbox.batch([np.zeros((240, 640, 3), dtype=np.uint8)], None)
+    result = type('Result', (), {'boxes': _Boxes([[50, 110, 100, 130, 0.8, 4], [0, 90, 320, 230, 0.6, 1]])})()
+    
+    array = detector._result_to_array(result, meta)
+    
+    # The frame is scaled by half and padded by 100 px above and below
+    assert (meta.scale, meta.x_offset, meta.y_offset) == (0.5, 0, 100)
+    assert array.dtype == DETECTION_DTYPE
+    assert array[['x1', 'y1', 'x2', 'y2']].tolist() == [(100, 20, 200, 60), (0, 0, 640, 240)]
+    assert detector.to_detections(array) == [
+        Detection(confidence=pytest.approx(0.8), bbox=(100, 20, 200, 60), class_id=4, class_name='Potholes'),
+        Detection(confidence=pytest.approx(0.6), bbox=(0, 0, 640, 240), class_id=1, class_name=CLASS_NAMES[1])
+    ]
+
+def test_arrays_and_detection_lists_draw_the_same(model):
+    detector = RoadDamageDetector('model.pt', backend='onnx', imgsz=320)
+    array = np.array([(10, 20, 60, 50, 0.7, 2)], dtype=DETECTION_DTYPE)
+    frames = [np.zeros((120, 160, 3), dtype=np.uint8) for _ in range(2)]
+    
+    detector.draw_detections(frames[0], array)
+    detector.draw_detections(frames[1], detector.to_detections(array))
+    
+    assert frames[0].any()
+    assert np.array_equal(frames[0], frames[1])
+
+def test_roi_boxes_are_shifted_back_to_the_frame(model):
+    detector = RoadDamageDetector('model.pt', backend='onnx', imgsz=320, roi=RoadROI(horizon=0.5))
+    frame = np.zeros((240, 320, 3), dtype=np.uint8)
+    frame[150:190, 100:160] = 255
+    # Above the horizon, never seen by the model
+    frame[20:60, 100:160] = 255
+    
+    detections = detector.detect_arrays([frame])[0]
+    
+    assert len(detections) == 1
+    box = [detections['x1'][0], detections['y1'][0], detections['x2'][0], detections['y2'][0]]
+    np.testing.assert_allclose(box, [100, 150, 160, 190], atol=2)
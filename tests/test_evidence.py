@@ -0,0 +1,65 @@
+import os
+
+import numpy as np
+
+from evidence import (CROP_MARGIN, context_name, context_path, crop_detection, crop_name, crop_origin, frame_stem,
+                      unused_evidence)
+
+def test_crop_and_context_names_share_the_frame_stem():
+    assert crop_name('cam1_issue_000042', 0) == 'cam1_issue_000042_det0'
+    assert context_name('cam1_issue_000042') == 'cam1_issue_000042_context'
+
+def test_context_path_of_a_crop():
+    assert context_path('cam1_issue_000042_det3.webp') == 'cam1_issue_000042_context.webp'
+    # Only the last _det suffix belongs to the crop
+    assert context_path('van_det2_issue_000042_det0.jpg') == 'van_det2_issue_000042_context.jpg'
+
+def test_context_path_of_a_full_frame_is_none():
+    assert context_path('cam1_issue_000042.jpg') is None
+    assert context_path('cam1_issue_000042_context.jpg') is None
+
+def test_frame_stem_is_shared_by_the_crops_of_a_frame():
+    assert frame_stem('cam1_issue_000042_det3.webp') == 'cam1_issue_000042'
+    assert frame_stem('cam1_issue_000042.jpg') == 'cam1_issue_000042'
+
+def test_context_image_is_kept_while_a_crop_of_its_frame_remains():
+    deleted = ['cam1_issue_000042_det0.jpg']
+    
+    assert unused_evidence(deleted, ['cam1_issue_000042_det1.jpg']) == ['cam1_issue_000042_det0.jpg']
+    assert unused_evidence(deleted + ['cam1_issue_000042_det1.jpg'], []) == [
+        'cam1_issue_000042_context.jpg', 'cam1_issue_000042_det0.jpg', 'cam1_issue_000042_det1.jpg'
+    ]
+
+def test_shared_frame_image_is_kept_while_an_issue_refers_to_it():
+    assert unused_evidence(['cam1_issue_000042.jpg', None], ['cam1_issue_000042.jpg']) == []
+    assert unused_evidence(['cam1_issue_000042.jpg', None], []) == ['cam1_issue_000042.jpg']
+
+def test_crops_add_a_margin_clamped_to_the_frame():
+    frame = np.arange(200 * 300 * 3, dtype=np.uint32).reshape(200, 300, 3)
+    
+    crop = crop_detection(frame, (100, 20, 150, 190))
+    
+    assert crop_origin((100, 20, 150, 190)) == (100 - CROP_MARGIN, 0)
+    assert crop.shape == (200, 50 + 2 * CROP_MARGIN, 3)
+    assert (crop == frame[:, 100 - CROP_MARGIN:150 + CROP_MARGIN]).all()
+    assert not np.shares_memory(crop, frame)
+
+def test_compact_mode_stores_a_crop_per_detection(recording, make_processor):
+    with make_processor(recording, evidence_mode='compact', image_prefix='cam1_') as processor:
+        processor.process_video()
+        paths = [row[0] for row in processor.db.conn.execute("SELECT image_path FROM road_issues ORDER BY id")]
+        output_dir = processor.output_dir
+        
+    # The first detection is on the first frame of the second brightness level
+    assert paths[0] == 'cam1_issue_000010_det0.jpg'
+    for path in paths:
+        assert os.path.exists(output_dir / path)
+        assert os.path.exists(output_dir / context_path(path))
+
+def test_frame_mode_stores_the_annotated_frame(recording, make_processor):
+    with make_processor(recording, image_prefix='cam1_') as processor:
+        processor.process_video()
+        paths = [row[0] for row in processor.db.conn.execute("SELECT image_path FROM road_issues ORDER BY id")]
+        
+    assert paths == [f"cam1_issue_{frame_number:06d}.jpg" for frame_number in (10, 20, 30, 40, 50)]
+    assert all(context_path(path) is None for path in paths)
@@ -0,0 +1,31 @@
+import cv2
+import numpy as np
+import pytest
+
+from image_sink import ImageSink
+
+@pytest.mark.parametrize('image_format, quality', [('jpg', 90), ('png', 3), ('webp', 80)])
+def test_sink_writes_decodable_images(tmp_path, image_format, quality):
+    sink = ImageSink(tmp_path, image_format, quality, workers=2, max_pending=2)
+    frames = [np.full((16, 16, 3), level, dtype=np.uint8) for level in (0, 100, 200)]
+    
+    names = [sink.save(frame, f"issue_{i}") for i, frame in enumerate(frames)]
+    sink.close()
+    
+    assert names == [f"issue_{i}.{image_format}" for i in range(3)]
+    for name, frame in zip(names, frames):
+        image = cv2.imread(str(tmp_path / name))
+        assert image.shape == frame.shape
+        assert abs(int(image.mean()) - int(frame.mean())) <= 2
+
+def test_sink_raises_failed_writes(tmp_path):
+    sink = ImageSink(tmp_path)
+    sink.save(np.zeros((8, 8, 3), dtype=np.uint8), 'missing_dir/issue_0')
+    
+    with pytest.raises(RuntimeError, match="Writing an evidence image failed"):
+        sink.flush()
+    sink.close()
+
+def test_sink_rejects_unknown_formats(tmp_path):
+    with pytest.raises(ValueError):
+        ImageSink(tmp_path, 'gif')
@@ -0,0 +1,89 @@
+import time
+
+import pytest
+
+from live import LiveNMEAFeed, replay_nmea
+
+# Local time.time() the first fix of the recording arrives at
+ARRIVAL = 1_700_000_000.0
+
+@pytest.fixture
+def make_feed(tmp_path):
+    """Factory of feeds on a file that is never written, sentences are added by the tests."""
+    feeds = []
+    
+    def make(**options) -> LiveNMEAFeed:
+        feeds.append(LiveNMEAFeed(str(tmp_path / 'unused.nmea'), **options))
+        return feeds[-1]
+    yield make
+    for feed in feeds:
+        feed.close()
+
+def _feed_recording(feed, nmea_path, delays, first=0):
+    """Add the RMC/GGA pairs of consecutive seconds of a recording, each arriving its delay after the fix."""
+    with open(nmea_path) as f:
+        lines = f.read().splitlines()
+    for second, delay in enumerate(delays, first):
+        for line in lines[2 * second:2 * second + 2]:
+            feed.add_line(line, ARRIVAL + second + delay)
+
+def test_gps_time_uses_the_smallest_arrival_delay(make_feed, recording, at):
+    feed = make_feed()
+    assert feed.gps_time(ARRIVAL) is None
+    
+    _feed_recording(feed, recording[1], [0.3, 0.1, 0.5, 0.3])
+    
+    assert len(feed.all_fixes()) == 4
+    assert abs((feed.gps_time(ARRIVAL + 2.1) - at(2)).total_seconds()) < 1e-3
+
+def test_lookup_returns_the_closest_fix(make_feed, recording, at):
+    feed = make_feed()
+    _feed_recording(feed, recording[1], [0.2] * 8)
+    
+    assert feed.lookup(at(2.4), max_age=1.0).timestamp == at(2)
+    assert feed.lookup(at(2.6), max_age=1.0).latitude_decimal == pytest.approx(48.0006)
+
+def test_lookup_interpolates_between_fixes(make_feed, recording, at):
+    feed = make_feed(interpolate=True)
+    _feed_recording(feed, recording[1], [0.2] * 8)
+    
+    gps_data = feed.lookup(at(2.5), max_age=1.0)
+    
+    assert gps_data.timestamp == at(2.5)
+    assert gps_data.latitude_decimal == pytest.approx(48.0005)
+
+def test_lookup_outside_the_fixes(make_feed, recording, at):
+    feed = make_feed(interpolate=True)
+    assert feed.lookup(at(0), max_age=2.0) is None
+    
+    _feed_recording(feed, recording[1], [0.2] * 8)
+    
+    # The last fix is at 7 s
+    assert feed.lookup(at(7.5), max_age=1.0).timestamp == at(7)
+    assert feed.lookup(at(8.5), max_age=1.0) is None
+    assert feed.lookup(at(-1.5), max_age=1.0) is None
+
+def test_lookup_sees_fixes_added_after_it_ran(make_feed, recording, at):
+    feed = make_feed()
+    _feed_recording(feed, recording[1], [0.2] * 2)
+    assert feed.lookup(at(5), max_age=1.0) is None
+    
+    _feed_recording(feed, recording[1], [0.2] * 6, first=2)
+    
+    assert feed.lookup(at(5), max_age=1.0).timestamp == at(5)
+
+def test_replayed_file_is_followed_by_a_feed(recording, tmp_path, at):
+    target = str(tmp_path / 'live.nmea')
+    feed = LiveNMEAFeed(target)
+    try:
+        replay_nmea(recording[1], target, speed=100.0)
+        
+        deadline = time.monotonic() + 10.0
+        while len(feed.all_fixes()) < 8 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        
+        assert [fix.timestamp for fix in feed.all_fixes()] == [at(second) for second in range(8)]
+    finally:
+        feed.close()
+    with open(target) as replayed, open(recording[1]) as recorded:
+        assert replayed.read().splitlines() == recorded.read().splitlines()
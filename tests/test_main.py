@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('PyQt6')
+
+from main import VideoProcessorThread
+
+FRAME = np.zeros((480, 640, 3), dtype=np.uint8)
+
+def _thread(recording=('drive.avi', 'drive.nmea'), **options):
+    thread = VideoProcessorThread(recording[0], recording[1], 'model.pt', 'issues.db', 0.5, batch_size=4, **options)
+    thread.previews = []
+    thread.preview_ready.connect(thread.previews.append)
+    return thread
+
+def test_previews_are_dropped_while_one_is_pending():
+    thread = _thread(preview_fps=0)
+    
+    thread.emit_preview(FRAME)
+    thread.emit_preview(FRAME)
+    assert len(thread.previews) == 1
+    
+    thread.preview_shown(320, 240)
+    thread.emit_preview(FRAME)
+    assert len(thread.previews) == 2
+    
+    # Previews fit the label size reported with the last one shown
+    assert (thread.previews[0].width(), thread.previews[0].height()) == (640, 480)
+    assert (thread.previews[1].width(), thread.previews[1].height()) == (320, 240)
+
+def test_previews_are_limited_to_preview_fps():
+    thread = _thread(preview_fps=10)
+    
+    thread.emit_preview(FRAME)
+    thread.preview_shown(640, 480)
+    thread.emit_preview(FRAME)
+    assert len(thread.previews) == 1
+    
+    thread.last_preview_time -= 1.0
+    thread.emit_preview(FRAME)
+    assert len(thread.previews) == 2
+
+def test_stop_leaves_the_capture_to_the_worker_thread(recording, make_processor):
+    thread = _thread(recording)
+    events = []
+    thread.processing_finished.connect(lambda: events.append('finished'))
+    thread.error_occurred.connect(events.append)
+    
+    def stop(progress):
+        thread.stop()
+        events.append(('capture open', thread.processor.cap.isOpened()))
+    
+    thread.progress_updated.connect(stop)
+    thread.run()
+    
+    # The run stops after the first frame and still finishes
+    assert events == [('capture open', True), 'finished']
+    assert not thread.processor.cap.isOpened()
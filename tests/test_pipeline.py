@@ -0,0 +1,58 @@
+import itertools
+import threading
+import time
+
+import pytest
+
+from pipeline import Pipeline
+
+def _stage_threads():
+    """Pipeline threads still running, the pipeline starts them without names."""
+    return [thread for thread in threading.enumerate() if thread is not threading.current_thread() and thread.daemon]
+
+def test_pipeline_yields_every_item_in_order():
+    pipeline = Pipeline(range(100), [('double', lambda x: x * 2), ('increment', lambda x: x + 1)], queue_size=2)
+    
+    assert list(pipeline) == [x * 2 + 1 for x in range(100)]
+    assert list(pipeline.stats()) == ['source -> double', 'double -> increment', 'increment -> consumer']
+
+def test_pipeline_raises_stage_errors_in_the_consumer():
+    def fail_on_five(x):
+        if x == 5:
+            raise ValueError("bad item")
+        return x
+        
+    results = []
+    with pytest.raises(RuntimeError, match="stage 'check' failed: bad item") as error:
+        for item in Pipeline(range(10), [('check', fail_on_five)]):
+            results.append(item)
+            
+    assert isinstance(error.value.__cause__, ValueError)
+    assert results == [0, 1, 2, 3, 4]
+    assert not _stage_threads()
+
+def test_pipeline_raises_source_errors_in_the_consumer():
+    def source():
+        yield 1
+        raise OSError("read failed")
+        
+    with pytest.raises(RuntimeError, match="stage 'decode' failed") as error:
+        list(Pipeline(source(), [('identity', lambda x: x)], source_name='decode'))
+        
+    assert isinstance(error.value.__cause__, OSError)
+
+def test_pipeline_stops_its_threads_when_left_early():
+    def slow(x):
+        time.sleep(0.01)
+        return x
+        
+    # An endless source keeps every queue full until the consumer leaves
+    for item in Pipeline(itertools.count(), [('slow', slow)], queue_size=1):
+        if item == 3:
+            break
+            
+    assert not _stage_threads()
+
+def test_pipeline_rejects_empty_queues():
+    with pytest.raises(ValueError):
+        Pipeline([], [], queue_size=0)
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+import quantization_report
+from detector import CLASS_NAMES, DETECTION_DTYPE
+
+POTHOLES = CLASS_NAMES.index('Potholes')
+
+class FixedDetector:
+    """Stands in for RoadDamageDetector, finding the same boxes on every frame."""
+    
+    def __init__(self, rows):
+        self.classes = list(CLASS_NAMES)
+        self.rows = rows
+        self.frames = 0
+        
+    def detect_arrays(self, frames):
+        self.frames += len(frames)
+        return [np.array(self.rows, dtype=DETECTION_DTYPE) for _ in frames]
+
+def test_report_measures_int8_recall_against_fp32(recording, monkeypatch):
+    detectors = {
+        'onnx': FixedDetector([(10, 10, 40, 40, 0.9, POTHOLES), (0, 0, 20, 20, 0.8, 1)]),
+        # Finds the pothole slightly shifted, misses class 1 and adds a class 2 box
+        'onnx-int8': FixedDetector([(12, 10, 42, 40, 0.9, POTHOLES), (50, 50, 60, 60, 0.7, 2)])
+    }
+    monkeypatch.setattr(quantization_report, 'RoadDamageDetector',
+                        lambda model_path, conf, batch_size, backend, *args: detectors[backend])
+    
+    report = quantization_report.build_report('model.pt', [recording[0]], 'frames', batch_size=8, max_frames=20)
+    
+    assert report['frames'] == 20
+    # The warm-up batch is not counted
+    assert detectors['onnx-int8'].frames == 28
+    assert report['overall_recall'] == 0.5
+    assert report['per_class']['Potholes'] == {'reference_detections': 20, 'recall': 1.0, 'extra_detections': 0}
+    assert report['per_class'][CLASS_NAMES[1]]['recall'] == 0.0
+    assert report['per_class'][CLASS_NAMES[2]] == {'reference_detections': 0, 'recall': None, 'extra_detections': 20}
+    assert report['int8_fps'] > 0 and report['reference_fps'] > 0
+
+def test_clip_batches_follow_stride_and_frame_limit(recording):
+    batches = list(quantization_report.iter_clip_batches(recording[0], 4, 10, 3))
+    
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+    
+    with pytest.raises(ValueError):
+        list(quantization_report.iter_clip_batches('missing.avi', 4, 10, 1))
@@ -0,0 +1,60 @@
+import json
+
+import numpy as np
+import pytest
+
+from roi import RoadROI, load_camera_profiles
+
+def _frame():
+    return np.arange(100 * 200 * 3, dtype=np.uint32).reshape(100, 200, 3).astype(np.uint8) | 1
+
+def test_horizon_and_hood_crop_a_view_of_the_frame():
+    frame = _frame()
+    
+    road, offset = RoadROI(horizon=0.4, hood=0.9).apply(frame)
+    
+    assert offset == (0, 40)
+    assert road.shape == (50, 200, 3)
+    assert np.shares_memory(road, frame)
+    assert np.array_equal(road, frame[40:90])
+
+def test_polygon_crops_its_bounding_box_and_masks_the_rest():
+    frame = _frame()
+    roi = RoadROI(polygon=[(0.25, 0.5), (0.75, 0.5), (0.75, 1.0), (0.25, 1.0)], hood=0.8)
+    
+    road, offset = roi.apply(frame)
+    
+    # The hood line still bounds the polygon
+    assert offset == (50, 50)
+    assert road.shape == (30, 101, 3)
+    assert np.array_equal(road[:, :100], frame[50:80, 50:150])
+    
+    triangle = RoadROI(polygon=[(0.0, 0.0), (1.0, 0.0), (0.0, 1.0)])
+    road, offset = triangle.apply(frame)
+    assert offset == (0, 0)
+    assert road[0, 0].all() and not road[-1, -1].any()
+
+def test_polygon_buffer_is_reused_per_frame_size():
+    roi = RoadROI(polygon=[(0.0, 0.0), (1.0, 0.0), (0.0, 1.0)])
+    
+    first, _ = roi.apply(_frame())
+    second, _ = roi.apply(np.zeros((100, 200, 3), dtype=np.uint8))
+    
+    assert first is second
+    assert not second.any()
+
+def test_empty_roi_is_rejected():
+    with pytest.raises(ValueError, match="empty"):
+        RoadROI(horizon=0.6, hood=0.6).apply(_frame())
+
+def test_camera_profiles_load_from_json(tmp_path):
+    path = tmp_path / 'profiles.json'
+    path.write_text(json.dumps({
+        'dashcam_front': {'horizon': 0.45, 'hood': 0.85},
+        'van_left': {'polygon': [[0.1, 0.5], [0.9, 0.5], [1.0, 0.9], [0.0, 0.9]]}
+    }))
+    
+    profiles = load_camera_profiles(str(path))
+    
+    assert profiles['dashcam_front'] == RoadROI(horizon=0.45, hood=0.85)
+    assert profiles['van_left'].polygon == [(0.1, 0.5), (0.9, 0.5), (1.0, 0.9), (0.0, 0.9)]
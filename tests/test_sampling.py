@@ -0,0 +1,47 @@
+import pytest
+
+from sampling import KNOTS_TO_MPS, FrameSampler
+
+FPS = 30.0
+
+def _run(sampler, make_fix, speeds):
+    """Feed one frame per speed at FPS and return the numbers of the selected frames."""
+    selected = []
+    for frame_number, speed in enumerate(speeds):
+        fix = make_fix(frame_number / FPS, speed_knots=speed)
+        if sampler.select(fix, fix.timestamp):
+            selected.append(frame_number)
+    return selected
+
+def test_sampler_selects_a_frame_per_distance(make_fix):
+    sampler = FrameSampler(metres_per_frame=2.0)
+    
+    selected = _run(sampler, make_fix, [10.0] * 300)
+    
+    # 10 knots at 30 fps cover 2 m in just under 12 frames
+    step = 10.0 * KNOTS_TO_MPS / FPS
+    assert selected[0] == 0
+    assert {b - a for a, b in zip(selected, selected[1:])} == {int(2.0 // step) + 1}
+    assert sampler.stats()['distance_travelled'] == pytest.approx(299 * step)
+
+def test_sampler_skips_stationary_frames(make_fix):
+    sampler = FrameSampler(metres_per_frame=2.0, min_speed_knots=1.0)
+    
+    selected = _run(sampler, make_fix, [0.5] * 60 + [10.0] * 30)
+    
+    # Moving again, the first frame is analysed right away
+    assert selected[0] == 60
+    stats = sampler.stats()
+    assert stats['frames_seen'] == 90
+    assert stats['frames_selected'] == len(selected)
+    assert stats['distance_travelled'] == pytest.approx(30 * 10.0 * KNOTS_TO_MPS / FPS)
+
+def test_sampler_selects_more_frames_at_higher_speed(make_fix):
+    slow = _run(FrameSampler(2.0), make_fix, [5.0] * 300)
+    fast = _run(FrameSampler(2.0), make_fix, [20.0] * 300)
+    
+    assert len(fast) > 3 * len(slow)
+
+def test_sampler_rejects_non_positive_distance():
+    with pytest.raises(ValueError):
+        FrameSampler(metres_per_frame=0)
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from nmea_parser import NMEAParser
+from segmentation import build_road_segments, haversine
+from timeline import GPSTimeline
+
+# Degrees of latitude driven per second, about 11 m
+STEP = 0.0001
+
+@pytest.fixture
+def track(make_fix):
+    """Drive north for 20 s at one fix per second."""
+    return GPSTimeline([make_fix(second, latitude=48.0 + STEP * second) for second in range(21)])
+
+def test_haversine_matches_the_nmea_parser(make_fix):
+    distances = haversine(np.array([48.0, 10.0]), np.array([11.0, 20.0]), np.array([48.01, 10.5]), np.array([11.02, 20.5]))
+    
+    parser = NMEAParser()
+    expected = [
+        parser.calculate_distance(make_fix(0, 48.0, 11.0), make_fix(0, 48.01, 11.02)),
+        parser.calculate_distance(make_fix(0, 10.0, 20.0), make_fix(0, 10.5, 20.5))
+    ]
+    np.testing.assert_allclose(distances, expected)
+
+def test_segments_cover_the_track_in_fixed_lengths(track, at):
+    segments = build_road_segments(track, [], at(0), at(20), segment_length=50.0)
+    
+    # 20 steps of about 11.1 m make 222 m, the incomplete tail is dropped
+    step = haversine(48.0, 11.0, 48.0 + STEP, 11.0)
+    assert len(segments) == 4
+    # A segment ends at the first fix past the next multiple of the length
+    ends = np.cumsum([segment.distance for segment in segments])
+    assert ((ends >= [50.0, 100.0, 150.0, 200.0]) & (ends < np.array([50.0, 100.0, 150.0, 200.0]) + step)).all()
+    for segment in segments:
+        assert segment.distance == pytest.approx(step * (segment.end_time - segment.start_time).total_seconds())
+    assert [segment.start_time for segment in segments[1:]] == [segment.end_time for segment in segments[:-1]]
+    assert segments[0].start_latitude == 48.0
+
+def test_segments_count_their_issues(track, at):
+    issue_times = [at(1), at(2.5), at(7), at(30)]
+    
+    segments = build_road_segments(track, issue_times, at(0), at(20), segment_length=50.0)
+    
+    # Segments span 0-5 s, 5-9 s, 9-14 s and 14-18 s; issues after the last one are not counted
+    assert [segment.issue_count for segment in segments] == [2, 1, 0, 0]
+
+def test_segments_average_the_moving_speeds(make_fix, at):
+    speeds = [10.0, 0.0, 30.0, 20.0, 0.0, 40.0]
+    track = GPSTimeline([make_fix(second, latitude=48.0 + 0.0005 * second, speed_knots=speed)
+                         for second, speed in enumerate(speeds)])
+    
+    segments = build_road_segments(track, [], at(0), at(5), segment_length=100.0)
+    
+    # Each segment averages the non-zero speeds of the fixes after its start
+    assert [segment.average_speed for segment in segments] == pytest.approx([30.0, 20.0])
+
+def test_segments_only_use_the_processed_time_range(track, at):
+    assert len(build_road_segments(track, [], at(10), at(20), segment_length=50.0)) == 2
+    assert build_road_segments(track, [], at(30), at(40), segment_length=50.0) == []
+    assert build_road_segments(GPSTimeline([]), [], at(0), at(20)) == []
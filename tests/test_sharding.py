@@ -0,0 +1,81 @@
+import itertools
+import sqlite3
+
+import numpy as np
+import pytest
+
+import video_processor
+from detector import DETECTION_DTYPE
+from sharding import ShardedDetector, ShardResult, iter_shard_detections
+
+def test_sharded_detector_adds_up_shard_cascade_counts():
+    detector = ShardedDetector(batch_size=4, cascade_imgsz=320)
+    
+    detector.add_shard(ShardResult({}, {}, frames_screened=10, frames_escalated=2))
+    detector.add_shard(ShardResult({}, {}, frames_screened=30, frames_escalated=8))
+    
+    assert detector.cascade_stats() == {'frames_screened': 40, 'frames_escalated': 10, 'escalation_rate': 0.25}
+
+def test_sharded_detector_converts_worker_detections():
+    detector = ShardedDetector()
+    array = np.array([(10, 20, 30, 40, 0.8, 4)], dtype=DETECTION_DTYPE)
+    
+    detection, = detector.to_detections(array)
+    
+    assert (detection.bbox, detection.class_name) == ((10, 20, 30, 40), 'Potholes')
+    with pytest.raises(RuntimeError):
+        detector.detect_arrays([np.zeros((8, 8, 3), dtype=np.uint8)])
+
+def test_worker_model_errors_reach_the_caller():
+    # The workers fail to create their detector, the error must not stall the pool
+    options = dict(model_path='missing.pt', backend='no-such-backend')
+    
+    with pytest.raises(ValueError, match="Unknown backend"):
+        list(iter_shard_detections('missing.avi', [[0, 1], [2, 3], [4, 5]], 2, None, options))
+
+def test_shards_are_taken_as_results_are_consumed():
+    options = dict(model_path='missing.pt', backend='no-such-backend')
+    taken = []
+    
+    def shards():
+        for i in itertools.count():
+            taken.append(i)
+            yield [2 * i, 2 * i + 1]
+            
+    # An endless plan would never finish if it was consumed up front
+    with pytest.raises(ValueError, match="Unknown backend"):
+        list(iter_shard_detections('missing.avi', shards(), 2, None, options, max_pending=3))
+    assert taken == [0, 1, 2]
+
+def _issues(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT timestamp, issue_type, image_path, bbox FROM road_issues ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+def test_sharded_run_matches_a_sequential_run(recording, make_processor, model_server_address, monkeypatch, tmp_path):
+    # Small shards and planning windows, so both end mid-video
+    monkeypatch.setattr(video_processor, 'MAX_SHARD_FRAMES', 4)
+    monkeypatch.setattr(video_processor, 'PLAN_WINDOW_FRAMES', 16)
+    shard_sizes = []
+    
+    def counted(video_path, shards, *args):
+        def taken():
+            for shard in shards:
+                shard_sizes.append(len(shard))
+                yield shard
+        return iter_shard_detections(video_path, taken(), *args)
+        
+    monkeypatch.setattr(video_processor, 'iter_shard_detections', counted)
+    with make_processor(recording, db_path='sequential.db') as processor:
+        processor.process_video()
+        frames_decoded = processor.frames_decoded
+        
+    with make_processor(recording, db_path='sharded.db', workers=2, model_server=model_server_address) as processor:
+        processor.process_video()
+        
+        assert processor.frames_decoded == frames_decoded == 60
+        
+    assert shard_sizes == [4] * 15
+    assert _issues(tmp_path / 'sharded.db') == _issues(tmp_path / 'sequential.db')
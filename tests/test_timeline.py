@@ -0,0 +1,60 @@
+import pytest
+
+from timeline import GPSTimeline
+
+@pytest.fixture
+def fixes(make_fix):
+    # Given out of order, the timeline sorts them
+    return [
+        make_fix(2, latitude=48.002, speed_knots=30.0, altitude=520.0),
+        make_fix(0, latitude=48.000, speed_knots=10.0, altitude=500.0),
+        make_fix(1, latitude=48.001, speed_knots=20.0, altitude=510.0)
+    ]
+
+def test_closest_fix_without_interpolation(fixes, at):
+    timeline = GPSTimeline(fixes)
+    
+    assert timeline.lookup(at(1.4)).latitude_decimal == 48.001
+    assert timeline.lookup(at(1.6)).latitude_decimal == 48.002
+    # On a tie the earlier fix wins
+    assert timeline.lookup(at(0.5)).latitude_decimal == 48.000
+
+def test_interpolation_between_fixes(fixes, at):
+    timeline = GPSTimeline(fixes, interpolate=True)
+    
+    point = timeline.lookup(at(1.25))
+    
+    assert point.timestamp == at(1.25)
+    assert point.latitude_decimal == pytest.approx(48.00125)
+    assert point.speed_knots == pytest.approx(22.5)
+    assert point.altitude == pytest.approx(512.5)
+    assert point.latitude_ddmm == '4800.0750N'
+
+def test_interpolated_course_turns_the_short_way(make_fix, at):
+    timeline = GPSTimeline([make_fix(0, course_degrees=350.0), make_fix(1, course_degrees=10.0)], interpolate=True)
+    
+    assert timeline.lookup(at(0.5)).course_degrees == pytest.approx(0.0, abs=1e-9)
+    assert timeline.lookup(at(0.75)).course_degrees == pytest.approx(5.0)
+
+@pytest.mark.parametrize('interpolate', [False, True])
+def test_times_outside_the_track_clamp_to_its_ends(fixes, interpolate, at):
+    timeline = GPSTimeline(fixes, interpolate=interpolate)
+    
+    before, after = timeline.lookup_seconds(timeline.to_seconds([at(-5), at(60)]))
+    
+    assert (before.latitude_decimal, before.speed_knots) == (48.000, 10.0)
+    assert (after.latitude_decimal, after.speed_knots) == (48.002, 30.0)
+
+def test_batch_lookup_matches_single_lookups(fixes, at):
+    timeline = GPSTimeline(fixes, interpolate=True)
+    times = [at(seconds) for seconds in (0.0, 0.3, 1.0, 1.9)]
+    
+    batch = timeline.lookup_seconds(timeline.to_seconds(times))
+    
+    assert batch == [timeline.lookup(time) for time in times]
+
+def test_empty_timeline(at):
+    timeline = GPSTimeline([])
+    
+    assert len(timeline) == 0
+    assert timeline.lookup(at(0)) is None
@@ -0,0 +1,74 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from image_sink import ImageSink
+from timing import StageStats, StageTimer, format_summary
+
+def test_percentiles_are_accurate_to_the_bucket_width():
+    durations = np.random.default_rng(0).lognormal(np.log(0.01), 1.0, 10000)
+    stats = StageStats()
+    for seconds in durations:
+        stats.add(seconds)
+        
+    for q in (50, 90, 99):
+        assert stats.percentile(q) == pytest.approx(np.percentile(durations, q), rel=0.12)
+    summary = stats.summary()
+    assert summary['count'] == 10000
+    assert summary['mean'] == pytest.approx(durations.mean())
+    assert summary['max'] == durations.max()
+
+def test_percentiles_stay_within_the_observed_range():
+    stats = StageStats()
+    stats.add(0.5)
+    
+    assert stats.percentile(1) == stats.percentile(99) == 0.5
+    assert StageStats().percentile(50) == 0.0
+
+def test_merged_timers_match_one_timer():
+    single, first, second = StageTimer(), StageTimer(), StageTimer()
+    for i in range(100):
+        seconds = 0.001 * (i + 1)
+        single.add('decode', seconds)
+        (first if i % 2 else second).add('decode', seconds)
+    second.add_timings({'inference': 0.02})
+    single.add('inference', 0.02)
+    
+    # Timers of worker processes come back pickled
+    first.merge(pickle.loads(pickle.dumps(second)))
+    
+    merged, expected = first.summary(), single.summary()
+    assert list(merged) == list(expected)
+    for stage in expected:
+        assert merged[stage] == pytest.approx(expected[stage])
+
+def test_summary_lists_stages_in_pipeline_order():
+    timer = StageTimer()
+    for stage in ('custom', 'db_insert', 'decode', 'inference'):
+        timer.add(stage, 0.01)
+        
+    summary = timer.summary()
+    
+    assert list(summary) == ['decode', 'inference', 'db_insert', 'custom']
+    lines = format_summary(summary, "Stage timings:").splitlines()
+    assert lines[0] == "Stage timings:"
+    assert [line.split()[0] for line in lines[2:]] == list(summary)
+
+def test_image_sink_records_write_times(tmp_path):
+    timer = StageTimer()
+    sink = ImageSink(tmp_path, timer=timer)
+    for i in range(3):
+        sink.save(np.zeros((8, 8, 3), dtype=np.uint8), f"issue_{i}")
+    sink.close()
+    
+    assert timer.summary()['image_write']['count'] == 3
+
+def test_processing_reports_every_stage(recording, make_processor):
+    reports = []
+    with make_processor(recording, stats_callback=reports.append, stats_interval=0) as processor:
+        processor.process_video()
+        
+    assert len(reports) > 1
+    assert set(reports[-1]) == {'decode', 'gps_lookup', 'inference', 'annotate', 'image_write', 'geocode', 'db_insert'}
+    assert reports[-1]['decode']['count'] == 60
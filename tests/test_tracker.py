@@ -0,0 +1,80 @@
+import json
+
+import numpy as np
+
+from detector import DETECTION_DTYPE
+from tracker import IoUTracker, iou_matrix
+
+def _detections(*rows):
+    """Detections from (x1, y1, x2, y2, confidence, class_id) rows."""
+    return np.array(list(rows), dtype=DETECTION_DTYPE)
+
+def _moving_box(frame_number, confidence=0.5, class_id=4, x=100):
+    """A defect drifting 4 px right per frame, as when driving past it."""
+    return (x + 4 * frame_number, 200, x + 60 + 4 * frame_number, 240, confidence, class_id)
+
+def test_iou_matrix():
+    boxes = np.array([[0, 0, 10, 10], [20, 20, 30, 30]], dtype=np.float64)
+    
+    ious = iou_matrix(boxes, np.array([[0, 0, 10, 10], [5, 0, 15, 10]], dtype=np.float64))
+    
+    np.testing.assert_allclose(ious, [[1.0, 1 / 3], [0.0, 0.0]])
+
+def test_tracker_follows_a_defect_and_keeps_its_best_frame():
+    tracker = IoUTracker(iou_threshold=0.3, max_age=3)
+    confidences = [0.5, 0.6, 0.9, 0.7, 0.6]
+    for frame_number, confidence in enumerate(confidences):
+        assert tracker.update(frame_number, _detections(_moving_box(frame_number, confidence))) == []
+        
+    # Frames without the defect, the track ends once it was missed for more than max_age frames
+    assert tracker.update(6, None) == []
+    assert tracker.update(7, _detections()) == []
+    finished = tracker.update(8, None)
+    
+    track, = finished
+    assert (track.hits, track.first_frame, track.last_frame) == (5, 0, 4)
+    assert track.best_frame == 2
+    assert track.best_detection['confidence'] == np.float32(0.9)
+    assert tracker.tracks == []
+
+def test_tracker_separates_classes_and_distant_defects():
+    tracker = IoUTracker()
+    for frame_number in range(3):
+        tracker.update(frame_number, _detections(
+            _moving_box(frame_number, class_id=4),
+            _moving_box(frame_number, class_id=0),
+            _moving_box(frame_number, class_id=4, x=600)
+        ))
+        
+    tracks = tracker.finish()
+    
+    assert sorted((track.class_id, track.hits) for track in tracks) == [(0, 3), (4, 3), (4, 3)]
+    assert len({track.track_id for track in tracks}) == 3
+
+def test_tracker_drops_tracks_below_min_hits():
+    tracker = IoUTracker(max_age=1, min_hits=2)
+    tracker.update(0, _detections(_moving_box(0)))
+    
+    # A single detection expires without being reported
+    assert tracker.update(5, None) == []
+    assert tracker.tracks == []
+
+def test_tracker_state_round_trip_continues_identically():
+    def run(tracker, frames):
+        finished = []
+        for frame_number in frames:
+            box = _moving_box(frame_number, 0.5 + 0.01 * frame_number) if frame_number < 12 else None
+            finished += tracker.update(frame_number, _detections(box) if box else None)
+        return finished
+        
+    uninterrupted = IoUTracker(max_age=2)
+    expected = run(uninterrupted, range(20)) + uninterrupted.finish()
+    
+    first = IoUTracker(max_age=2)
+    finished = run(first, range(6))
+    restored = IoUTracker(max_age=2)
+    restored.load_state(json.loads(json.dumps(first.state_dict())))
+    finished += run(restored, range(6, 20)) + restored.finish()
+    
+    assert [track.to_dict() for track in finished] == [track.to_dict() for track in expected]
+    assert restored.next_id == uninterrupted.next_id
@@ -0,0 +1,124 @@
+import cv2
+import numpy as np
+
+from detector import CLASS_NAMES
+
+class CountingCapture:
+    """Wraps a capture and records which frames are grabbed and which are decoded."""
+    
+    def __init__(self, cap):
+        self.cap = cap
+        self.grabbed = 0
+        self.retrieved = []
+    
+    def grab(self):
+        ok = self.cap.grab()
+        self.grabbed += ok
+        return ok
+    
+    def retrieve(self):
+        self.retrieved.append(self.grabbed - 1)
+        return self.cap.retrieve()
+    
+    def __getattr__(self, name):
+        return getattr(self.cap, name)
+
+def _read_all(processor):
+    processor.cap = CountingCapture(processor.cap)
+    records = []
+    while True:
+        batch = processor.read_batch()
+        if not batch:
+            return records
+        records.extend(batch)
+
+def _frames(video_path):
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            cap.release()
+            return frames
+        frames.append(frame)
+
+def test_skipped_frames_are_grabbed_but_not_decoded(recording, make_processor):
+    with make_processor(recording, frame_stride=3) as processor:
+        records = _read_all(processor)
+        
+        assert processor.cap.grabbed == 60
+        assert processor.cap.retrieved == list(range(0, 60, 3))
+        assert processor.frames_decoded == 20
+    
+    frames = _frames(recording[0])
+    assert [record.frame_number for record in records] == list(range(60))
+    for record in records:
+        if record.frame_number % 3:
+            assert record.frame is None
+        else:
+            assert np.array_equal(record.frame, frames[record.frame_number])
+
+def test_batches_end_after_batch_size_decoded_frames(recording, make_processor):
+    with make_processor(recording, frame_stride=3, batch_size=4) as processor:
+        processor.cap = CountingCapture(processor.cap)
+        
+        records = processor.read_batch()
+        
+        assert [record.frame_number for record in records] == list(range(10))
+        assert processor.cap.retrieved == [0, 3, 6, 9]
+
+def test_reading_stops_after_the_last_scheduled_frame(recording, make_processor):
+    with make_processor(recording, frame_schedule=[5, 17, 18, 40]) as processor:
+        records = _read_all(processor)
+        
+        assert processor.cap.grabbed == 41
+        assert processor.cap.retrieved == [5, 17, 18, 40]
+        assert processor.frames_decoded == 4
+    
+    assert [record.frame_number for record in records if record.frame is not None] == [5, 17, 18, 40]
+
+def _summary(results):
+    """Frame number, decoded flag and stored issue types of each result."""
+    return [(result.frame_number, result.frame is not None, [issue.issue_type for issue in result.issues], result.final)
+            for result in results]
+
+def test_iter_results_yields_every_frame_then_a_final_result(recording, make_processor):
+    with make_processor(recording, frame_stride=2) as processor:
+        results = list(processor.iter_results())
+        stored = processor.db.conn.execute("SELECT COUNT(*) FROM road_issues").fetchone()[0]
+        
+    assert [result.frame_number for result in results] == list(range(60)) + [59]
+    assert [result.final for result in results] == [False] * 60 + [True]
+    assert all((result.frame is not None) == (result.frame_number % 2 == 0) for result in results[:-1])
+    assert results[-1].progress == 100.0
+    # Issues are on the first frame of each non-black brightness level
+    assert [result.frame_number for result in results[:-1] if result.issues] == [10, 20, 30, 40, 50]
+    assert sum(len(result.issues) for result in results) == stored == 5
+
+def test_consumer_stopping_early_finishes_the_run(recording, make_processor):
+    with make_processor(recording) as processor:
+        for result in processor.iter_results():
+            if result.frame_number == 24:
+                break
+        processor.finish()
+        
+        types = [row[0] for row in processor.db.conn.execute("SELECT issue_type FROM road_issues ORDER BY id")]
+        
+    # Issues of frames 10 and 20 may still be queued when the consumer stops, finish() writes them
+    assert types == CLASS_NAMES[1:3]
+
+def test_pipelined_and_sharded_results_match_sequential(recording, make_processor, model_server_address):
+    with make_processor(recording, db_path='sequential.db') as processor:
+        expected = _summary(processor.iter_results())
+        
+    with make_processor(recording, db_path='pipelined.db', pipelined=True) as processor:
+        assert _summary(processor.iter_results()) == expected
+        
+    with make_processor(recording, db_path='sharded.db', workers=2, model_server=model_server_address) as processor:
+        results = _summary(processor.iter_results())
+        
+    # Sharded workers decode the frames, only frames with issues are read again for saving
+    assert [(number, issues, final) for number, _, issues, final in results] == [
+        (number, issues, final) for number, _, issues, final in expected
+    ]
+    assert [number for number, decoded, _, final in results if decoded and not final] == [10, 20, 30, 40, 50]